@@ -222,7 +222,7 @@ class CommandProcessor:
             
             # Import emergency pipeline with fallback
             try:
-                from create_full_emergency_pipeline import execute_full_emergency_pipeline
+                from create_full_emergency_pipeline import EmergencyContext, execute_full_emergency_pipeline
             except ImportError as e:
                 print(f"⚠️ Emergency pipeline not available: {str(e)}")
                 # Fall back to basic text alert
@@ -248,7 +248,7 @@ class CommandProcessor:
             # Execute full emergency pipeline
             print(f"🚨 Executing emergency pipeline for: {incident_type}")
             
-            success = await execute_full_emergency_pipeline(
+            success = await execute_full_emergency_pipeline(EmergencyContext(
                 incident_type=incident_type,
                 street_address="Ubicación por confirmar",  # Will be updated with member data
                 emergency_number="SAMU 131",
@@ -260,7 +260,7 @@ class CommandProcessor:
                 blink_cycles=3,
                 voice_text=f"Emergencia activada. {incident_type} reportada. Contacto de emergencia: SAMU uno tres uno. Reportado por {message.contact_name or 'usuario'}. Por favor manténganse seguros y sigan las instrucciones de las autoridades.",
                 use_member_data=True  # Enable member data lookup
-            )
+            ))
             
             if success:
                 print("✅ SOS emergency pipeline completed successfully")
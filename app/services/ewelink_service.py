@@ -1,17 +1,20 @@
 import time
+import asyncio
 import hashlib
 import hmac
 import base64
 import json
 import httpx
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 from app.config import settings
 from app.models import EWeLinkDevice, DeviceStatus
+from app.services.http_client import client_session
 from app.services.ewelink_oauth_simulator import EWeLinkOAuthSimulator
 from app.services.ewelink_workaround import EWeLinkWorkaround
 
 class EWeLinkService:
-    def __init__(self):
+    def __init__(self, http_client: Optional[httpx.AsyncClient] = None):
+        self.http_client = http_client  # Optional shared keep-alive client (see http_client.get_http_client)
         self.app_id = settings.ewelink_app_id
         self.app_secret = settings.ewelink_app_secret
         self.base_url = settings.ewelink_base_url
@@ -41,6 +44,10 @@ class EWeLinkService:
             password=self.password
         )
     
+    def _http_client(self, **client_kwargs):
+        """Use the injected shared client if available, otherwise a one-off client"""
+        return client_session(self.http_client, **client_kwargs)
+    
     def _generate_signature(self, payload: dict) -> str:
         """Generate signature for eWeLink API authentication"""
         # Sign the JSON payload, not timestamp-based string
@@ -129,7 +136,7 @@ class EWeLinkService:
                 print(f"🔐 OAuth endpoint: {url}")
                 print(f"🔐 OAuth payload keys: {list(payload.keys())}")
                 
-                async with httpx.AsyncClient() as client:
+                async with self._http_client() as client:
                     response = await client.post(url, headers=headers, json=payload)
                     
                     print(f"🔐 Response status: {response.status_code}")
@@ -228,7 +235,7 @@ class EWeLinkService:
                     url = f"{region}/v2/user/login"
                     headers = self._get_auth_headers(payload)
                     
-                    async with httpx.AsyncClient() as client:
+                    async with self._http_client() as client:
                         response = await client.post(url, headers=headers, json=payload)
                         
                         print(f"🔐 Response status: {response.status_code}")
@@ -265,7 +272,7 @@ class EWeLinkService:
             print(f"🔍 Getting devices from: {url}")
             print(f"🔑 Using token: {self.access_token[:20] if self.access_token else 'None'}...")
             
-            async with httpx.AsyncClient() as client:
+            async with self._http_client() as client:
                 response = await client.get(url, headers=headers)
                 
                 print(f"📡 Device API Response Status: {response.status_code}")
@@ -331,6 +338,45 @@ class EWeLinkService:
             self._auth_attempted = True
             return False
 
+    def _command_params(self, command: str) -> Dict[str, Any]:
+        """Map ON/OFF/BLINK commands to device parameters"""
+        params = {}
+        if command == "ON":
+            params = {"switch": "on"}
+        elif command == "OFF":
+            params = {"switch": "off"}
+        elif command == "BLINK":
+            # For blink, we'll turn on, wait, then off (handled by device firmware)
+            # Some devices support pulse mode
+            params = {"pulse": "on", "pulseWidth": 1000}  # 1 second pulse
+            # Fallback to regular switch if pulse not supported
+            if not params:
+                params = {"switch": "on"}
+        return params
+    
+    async def _post_device_command(self, client: httpx.AsyncClient, headers: Dict[str, str], device_id: str, command: str) -> bool:
+        """Send one command to a device over an already open client"""
+        url = f"{self.base_url}/v2/device/thing/status"
+        payload = {
+            "type": 1,
+            "id": device_id,
+            "params": self._command_params(command)
+        }
+        
+        response = await client.post(url, headers=headers, json=payload)
+        
+        if response.status_code == 200:
+            data = response.json()
+            if data.get("error") == 0:
+                print(f"Device {device_id} command {command} successful")
+                return True
+            else:
+                print(f"Device control error: {data.get('msg', 'Unknown error')}")
+                return False
+        else:
+            print(f"Device control failed: {response.status_code} - {response.text}")
+            return False
+    
     async def control_device(self, device_id: str, command: str) -> bool:
         """
         Control a Sonoff device
@@ -340,48 +386,49 @@ class EWeLinkService:
             if not await self._ensure_authenticated():
                 print(f"❌ eWeLink not authenticated - cannot control device {device_id}")
                 return False
-            url = f"{self.base_url}/v2/device/thing/status"
             headers = self._get_auth_headers()
             
-            # Map commands to device parameters
-            params = {}
-            if command == "ON":
-                params = {"switch": "on"}
-            elif command == "OFF":
-                params = {"switch": "off"}
-            elif command == "BLINK":
-                # For blink, we'll turn on, wait, then off (handled by device firmware)
-                # Some devices support pulse mode
-                params = {"pulse": "on", "pulseWidth": 1000}  # 1 second pulse
-                # Fallback to regular switch if pulse not supported
-                if not params:
-                    params = {"switch": "on"}
-            
-            payload = {
-                "type": 1,
-                "id": device_id,
-                "params": params
-            }
-            
-            async with httpx.AsyncClient() as client:
-                response = await client.post(url, headers=headers, json=payload)
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    if data.get("error") == 0:
-                        print(f"Device {device_id} command {command} successful")
-                        return True
-                    else:
-                        print(f"Device control error: {data.get('msg', 'Unknown error')}")
-                        return False
-                else:
-                    print(f"Device control failed: {response.status_code} - {response.text}")
-                    return False
+            async with self._http_client() as client:
+                return await self._post_device_command(client, headers, device_id, command)
                     
         except Exception as e:
             print(f"Device control error: {str(e)}")
             return False
     
+    async def control_device_sequence(self, device_id: str, sequence: List[Tuple[str, float]]) -> List[bool]:
+        """
+        Run a timed command sequence on a Sonoff device, e.g. a blink pattern
+        sequence: [(command, delay_before_seconds), ...]
+        Authenticates and opens the connection once for the whole sequence, and
+        schedules commands against the sequence start so request latency
+        doesn't stretch the pattern. Returns the success of each command
+        """
+        results = [False] * len(sequence)
+        try:
+            if not await self._ensure_authenticated():
+                print(f"❌ eWeLink not authenticated - cannot control device {device_id}")
+                return results
+            headers = self._get_auth_headers()
+            
+            loop = asyncio.get_running_loop()
+            async with self._http_client() as client:
+                due = loop.time()
+                for i, (command, delay) in enumerate(sequence):
+                    due += delay
+                    wait = due - loop.time()
+                    if wait > 0:
+                        await asyncio.sleep(wait)
+                    try:
+                        results[i] = await self._post_device_command(client, headers, device_id, command)
+                    except Exception as e:
+                        print(f"Device control error: {str(e)}")
+            
+            return results
+                    
+        except Exception as e:
+            print(f"Device control sequence error: {str(e)}")
+            return results
+    
     async def get_device_status(self, device_id: str) -> Optional[DeviceStatus]:
         """Get current status of a specific device"""
         try:
@@ -393,7 +440,7 @@ class EWeLinkService:
                 "id": device_id
             }
             
-            async with httpx.AsyncClient() as client:
+            async with self._http_client() as client:
                 response = await client.get(url, headers=headers, params=params)
                 
                 if response.status_code == 200:
@@ -0,0 +1,63 @@
+from contextlib import asynccontextmanager
+from typing import Optional
+import functools
+import httpx
+
+# Shared keep-alive client so repeated WhatsApp/eWeLink calls reuse
+# DNS lookups, TCP connections and TLS sessions instead of paying them per call
+_shared_client: Optional[httpx.AsyncClient] = None
+
+# httpx's own default, for call sites that never set a timeout (eWeLink)
+DEFAULT_TIMEOUT = 5.0
+
+# Client methods that send a request and accept a per-request timeout
+_REQUEST_METHODS = frozenset({"request", "stream", "get", "options", "head", "post", "put", "patch", "delete"})
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Get the process-wide pooled HTTP client (created lazily)
+    """
+    global _shared_client
+    if _shared_client is None or _shared_client.is_closed:
+        _shared_client = httpx.AsyncClient(
+            timeout=60.0,  # Fallback only: client_session applies each call site's own timeout per request
+            limits=httpx.Limits(
+                max_connections=32,
+                max_keepalive_connections=8,
+                keepalive_expiry=60.0
+            )
+        )
+    return _shared_client
+
+async def close_http_client():
+    """Close the shared HTTP client (call on application shutdown)"""
+    global _shared_client
+    if _shared_client is not None and not _shared_client.is_closed:
+        await _shared_client.aclose()
+    _shared_client = None
+
+class _TimeoutBoundClient:
+    """The shared client, with one call site's timeout applied to each request it sends"""
+    
+    def __init__(self, client: httpx.AsyncClient, timeout):
+        self._client = client
+        self._timeout = timeout
+    
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if name in _REQUEST_METHODS:
+            return functools.partial(attr, timeout=self._timeout)
+        return attr
+
+@asynccontextmanager
+async def client_session(shared_client: Optional[httpx.AsyncClient] = None, timeout=DEFAULT_TIMEOUT, **client_kwargs):
+    """
+    Yield the injected shared client (left open for reuse), or a one-off
+    client that is closed on exit when no shared client was injected. Either
+    way requests use the given timeout, not the shared client's own
+    """
+    if shared_client is not None:
+        yield _TimeoutBoundClient(shared_client, timeout)
+    else:
+        async with httpx.AsyncClient(timeout=timeout, **client_kwargs) as client:
+            yield client
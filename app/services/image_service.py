@@ -1,7 +1,8 @@
+import io
 import os
 import uuid
 import urllib.request
-from typing import Optional
+from typing import BinaryIO, Optional
 from PIL import Image
 from app.config import settings
 
@@ -184,12 +185,61 @@ class ImageService:
             print(f"❌ Image processing error: {str(e)}")
             return None
     
+    def process_image_for_whatsapp_bytes(self, image_buffer: BinaryIO, convert_to_webp: bool = True, quality: int = 85) -> Optional[io.BytesIO]:
+        """
+        In-memory variant of process_image_for_whatsapp
+        1. Resize if too large
+        2. Convert to WebP (optional)
+        Returns a new BytesIO (positioned at 0) without touching disk
+        """
+        try:
+            with Image.open(image_buffer) as img:
+                width, height = img.size
+                original_format = img.format or 'PNG'
+                print(f"🖼️ Processing in-memory image for WhatsApp: {width}x{height}, format: {original_format}")
+                
+                # Step 1: Check if image needs resizing
+                needs_resize = width > 1280 or height > 1280
+                if needs_resize:
+                    print(f"📐 Image is {width}x{height}, resizing...")
+                    img.thumbnail((1280, 1280), Image.Resampling.LANCZOS)
+                else:
+                    print(f"📐 Image size {width}x{height} is optimal for WhatsApp")
+                
+                # Already WhatsApp-ready (e.g. rendered directly as WebP): skip re-encoding
+                if not needs_resize and (not convert_to_webp or original_format == 'WEBP'):
+                    image_buffer.seek(0)
+                    processed = io.BytesIO(image_buffer.read())
+                    print(f"✅ Image already optimal, no re-encode: {processed.getbuffer().nbytes} bytes")
+                    return processed
+                
+                # Convert to RGB if necessary (WebP/JPEG don't support all modes)
+                if img.mode in ('RGBA', 'LA', 'P'):
+                    img = img.convert('RGB')
+                
+                # Step 2: Encode straight into a new buffer
+                processed = io.BytesIO()
+                if convert_to_webp:
+                    img.save(processed, format='WebP', quality=quality, optimize=True)
+                else:
+                    img.save(processed, format=original_format)
+            
+            processed.seek(0)
+            print(f"✅ Image processing complete: {processed.getbuffer().nbytes} bytes")
+            return processed
+            
+        except Exception as e:
+            print(f"❌ Image processing error: {str(e)}")
+            return None
+    
     def cleanup_image_file(self, file_path: str):
         """Clean up temporary image files"""
         try:
-            if os.path.exists(file_path):
-                os.remove(file_path)
-                print(f"🧹 Cleaned up image file: {file_path}")
+            # Single unlink syscall instead of stat + unlink
+            os.remove(file_path)
+            print(f"🧹 Cleaned up image file: {file_path}")
+        except FileNotFoundError:
+            pass
         except Exception as e:
             print(f"❌ Image cleanup error: {str(e)}")
     
@@ -150,9 +150,11 @@ class VoiceService:
     def cleanup_audio_file(self, file_path: str):
         """Clean up temporary audio files"""
         try:
-            if os.path.exists(file_path):
-                os.remove(file_path)
-                print(f"🧹 Cleaned up audio file: {file_path}")
+            # Single unlink syscall instead of stat + unlink
+            os.remove(file_path)
+            print(f"🧹 Cleaned up audio file: {file_path}")
+        except FileNotFoundError:
+            pass
         except Exception as e:
             print(f"❌ Cleanup error: {str(e)}")
     
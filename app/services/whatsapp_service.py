@@ -3,12 +3,78 @@ import httpx
 import base64
 import time
 import asyncio
+import weakref
 from typing import Optional, Dict, Any
 from app.config import settings
 from app.models import WhatsAppMessage
+from app.services.http_client import client_session
+
+# Minimum spacing between outgoing WHAPI sends to the same chat. Pacing lives
+# here so only WhatsApp sends wait, not device/voice/image work in callers,
+# and sends to different chats never wait on each other. A chat's lock goes
+# away once no send holds it, and its last send time once the interval has
+# passed, so neither map keeps an entry per chat ever messaged
+SEND_MIN_INTERVAL = 0.3
+_send_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+_last_send_at: Dict[str, float] = {}
+
+class WhatsAppCircuitOpen(Exception):
+    """Raised instead of sending while WHAPI keeps rejecting our credentials"""
+    pass
+
+class WhatsAppCircuitBreaker:
+    """
+    Short-circuits WhatsApp sends after consecutive auth failures (401/403,
+    e.g. an expired token) so callers fail fast instead of paying a full
+    request/timeout - and any media rendering - per send
+    """
+    def __init__(self, failure_threshold: int = 2, reset_timeout: float = 60.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.consecutive_failures = 0
+        self.last_failure_at = 0.0
+    
+    @property
+    def is_open(self) -> bool:
+        """True while the failure threshold is reached and the window hasn't expired"""
+        return (
+            self.consecutive_failures >= self.failure_threshold
+            and time.monotonic() - self.last_failure_at < self.reset_timeout
+        )
+    
+    def record_response(self, status_code: int):
+        """Count auth failures; any successful send closes the circuit"""
+        if status_code in (401, 403):
+            # Failures older than the window don't count as consecutive
+            if time.monotonic() - self.last_failure_at >= self.reset_timeout:
+                self.consecutive_failures = 0
+            self.consecutive_failures += 1
+            self.last_failure_at = time.monotonic()
+            if self.is_open:
+                print(f"🔌 WhatsApp circuit OPEN after {self.consecutive_failures} auth failures - skipping sends for {self.reset_timeout:.0f}s")
+        elif status_code == 200:
+            self.consecutive_failures = 0
+
+# Process-wide breaker shared by every WhatsAppService instance
+whatsapp_circuit = WhatsAppCircuitBreaker()
+
+# Bytes-based image send methods, in default fallback order. The one that
+# last worked is remembered (process-wide) and tried first next time
+IMAGE_SEND_METHODS = ("base64", "n8n", "media")
+_preferred_image_method = IMAGE_SEND_METHODS[0]
+
+# MIME types for image uploads, keyed by file extension
+IMAGE_MIME_TYPES = {
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg', 
+    '.png': 'image/png',
+    '.gif': 'image/gif',
+    '.webp': 'image/webp'
+}
 
 class WhatsAppService:
-    def __init__(self):
+    def __init__(self, http_client: Optional[httpx.AsyncClient] = None):
+        self.http_client = http_client  # Optional shared keep-alive client (see http_client.get_http_client)
         self.base_url = settings.whapi_base_url
         self.token = settings.whapi_token
         self.headers = {
@@ -26,6 +92,28 @@ class WhatsAppService:
         # Initialize Group Manager (lazy loading to avoid circular imports)
         self.group_manager = None
     
+    def _http_client(self, **client_kwargs):
+        """Use the injected shared client if available, otherwise a one-off client"""
+        return client_session(self.http_client, **client_kwargs)
+    
+    async def _wait_for_send_slot(self, chat_id: str):
+        """
+        Space consecutive sends to the same chat by SEND_MIN_INTERVAL to respect WHAPI rate limits
+        Raises WhatsAppCircuitOpen while WHAPI keeps rejecting our credentials
+        """
+        if whatsapp_circuit.is_open:
+            raise WhatsAppCircuitOpen("WhatsApp circuit open after repeated auth failures")
+        
+        lock = _send_locks.setdefault(chat_id, asyncio.Lock())
+        async with lock:
+            now = time.monotonic()
+            for stale_chat in [c for c, sent_at in _last_send_at.items() if now - sent_at >= SEND_MIN_INTERVAL]:
+                del _last_send_at[stale_chat]
+            wait = _last_send_at.get(chat_id, 0.0) + SEND_MIN_INTERVAL - now
+            if wait > 0:
+                await asyncio.sleep(wait)
+            _last_send_at[chat_id] = time.monotonic()
+    
     def parse_whatsapp_webhook(self, payload: Dict[str, Any]) -> Optional[WhatsAppMessage]:
         """
         Parse WhatsApp webhook payload and extract message information
@@ -347,6 +435,7 @@ class WhatsAppService:
         Send a text message via WhatsApp using WHAPI.cloud API
         """
         try:
+            await self._wait_for_send_slot(phone_number)
             url = f"{self.base_url}/messages/text"
             
             # Correct payload format based on WHAPI.cloud documentation
@@ -362,8 +451,9 @@ class WhatsAppService:
             print(f"📤 Headers: {self.headers}")
             
             try:
-                async with httpx.AsyncClient(timeout=30.0) as client:  # Increased timeout for WHAPI
+                async with self._http_client(timeout=30.0) as client:  # Increased timeout for WHAPI
                     response = await client.post(url, headers=self.headers, json=payload)
+                    whatsapp_circuit.record_response(response.status_code)
                     
                     print(f"📤 Response status: {response.status_code}")
                     print(f"📤 Response body: {response.text}")
@@ -393,6 +483,7 @@ class WhatsAppService:
                 return False
             
             file_size = os.path.getsize(audio_file_path)
+            await self._wait_for_send_slot(phone_number)
             url = f"{self.base_url}/messages/voice"
             
             print(f"🎤 Sending voice message (Base64) to {phone_number}")
@@ -417,8 +508,9 @@ class WhatsAppService:
             print(f"🎤 Headers: {self.headers}")
             
             try:
-                async with httpx.AsyncClient(timeout=30.0) as client:
+                async with self._http_client(timeout=30.0) as client:
                     response = await client.post(url, headers=self.headers, json=payload)
+                    whatsapp_circuit.record_response(response.status_code)
                     
                     print(f"🎤 Response status: {response.status_code}")
                     print(f"🎤 Response body: {response.text}")
@@ -448,6 +540,7 @@ class WhatsAppService:
                 return False
             
             file_size = os.path.getsize(audio_file_path)
+            await self._wait_for_send_slot(phone_number)
             url = f"{self.base_url}/messages/voice"
             
             print(f"🎤 Sending voice message (File Upload) to {phone_number}")
@@ -476,8 +569,9 @@ class WhatsAppService:
                 print(f"🎤 Files: media file ({len(files['media'][1])} bytes)")
                 
                 try:
-                    async with httpx.AsyncClient(timeout=30.0) as client:
+                    async with self._http_client(timeout=30.0) as client:
                         response = await client.post(url, headers=headers, data=data, files=files)
+                        whatsapp_circuit.record_response(response.status_code)
                         
                         print(f"🎤 Response status: {response.status_code}")
                         print(f"🎤 Response body: {response.text}")
@@ -512,6 +606,7 @@ class WhatsAppService:
             print(f"   File: {audio_file_path} ({file_size} bytes)")
             
             # Step 1: Upload media file first  
+            await self._wait_for_send_slot(phone_number)
             upload_url = f"{self.base_url}/messages/media"
             
             headers_upload = {
@@ -526,8 +621,9 @@ class WhatsAppService:
                 print(f"🎤 Step 1: Uploading media to {upload_url}")
                 
                 try:
-                    async with httpx.AsyncClient(timeout=30.0) as client:
+                    async with self._http_client(timeout=30.0) as client:
                         upload_response = await client.post(upload_url, headers=headers_upload, files=files)
+                        whatsapp_circuit.record_response(upload_response.status_code)
                         
                         print(f"🎤 Upload Response status: {upload_response.status_code}")
                         print(f"🎤 Upload Response body: {upload_response.text}")
@@ -567,8 +663,9 @@ class WhatsAppService:
             print(f"🎤 Payload: {payload}")
             
             try:
-                async with httpx.AsyncClient(timeout=30.0) as client:
+                async with self._http_client(timeout=30.0) as client:
                     send_response = await client.post(send_url, headers=headers_send, json=payload)
+                    whatsapp_circuit.record_response(send_response.status_code)
                     
                     print(f"🎤 Send Response status: {send_response.status_code}")
                     print(f"🎤 Send Response body: {send_response.text}")
@@ -596,31 +693,37 @@ class WhatsAppService:
                 print(f"❌ Image file not found: {image_file_path}")
                 return False
             
-            file_size = os.path.getsize(image_file_path)
-            url = f"{self.base_url}/messages/image"
-            
-            print(f"📷 Sending image message (Base64) to {phone_number}")
-            print(f"   File: {image_file_path} ({file_size} bytes)")
-            print(f"   Caption: {caption}")
-            print(f"   URL: {url}")
+            print(f"📷 Sending image file: {image_file_path}")
             
-            # Read image file and encode as base64
+            # Read image file
             with open(image_file_path, "rb") as image_file:
                 image_data = image_file.read()
-                image_base64 = base64.b64encode(image_data).decode()
-            
-            print(f"   Base64 length: {len(image_base64)} characters")
             
             # Determine MIME type based on file extension
             file_ext = os.path.splitext(image_file_path)[1].lower()
-            mime_types = {
-                '.jpg': 'image/jpeg',
-                '.jpeg': 'image/jpeg', 
-                '.png': 'image/png',
-                '.gif': 'image/gif',
-                '.webp': 'image/webp'
-            }
-            mime_type = mime_types.get(file_ext, 'image/jpeg')
+            mime_type = IMAGE_MIME_TYPES.get(file_ext, 'image/jpeg')
+            
+            return await self.send_image_message_from_bytes(phone_number, image_data, caption, mime_type)
+                    
+        except Exception as e:
+            print(f"❌ Send image message error (Base64): {str(e)} | File: {image_file_path}")
+            return False
+    
+    async def send_image_message_from_bytes(self, phone_number: str, image_data: bytes, caption: str = "", mime_type: str = "image/webp") -> bool:
+        """
+        Send in-memory image bytes via WhatsApp using WHAPI.cloud API (Base64 method)
+        Avoids writing generated images to disk before upload
+        """
+        try:
+            await self._wait_for_send_slot(phone_number)
+            url = f"{self.base_url}/messages/image"
+            image_base64 = base64.b64encode(image_data).decode()
+            
+            print(f"📷 Sending image message (Base64) to {phone_number}")
+            print(f"   Image: {len(image_data)} bytes ({mime_type})")
+            print(f"   Caption: {caption}")
+            print(f"   URL: {url}")
+            print(f"   Base64 length: {len(image_base64)} characters")
             
             # Payload format for image messages (following WHAPI.cloud pattern)
             payload = {
@@ -635,8 +738,9 @@ class WhatsAppService:
             print(f"📷 Headers: {self.headers}")
             
             try:
-                async with httpx.AsyncClient(timeout=60.0) as client:  # Longer timeout for images
+                async with self._http_client(timeout=60.0) as client:  # Longer timeout for images
                     response = await client.post(url, headers=self.headers, json=payload)
+                    whatsapp_circuit.record_response(response.status_code)
                     
                     print(f"📷 Response status: {response.status_code}")
                     print(f"📷 Response body: {response.text}")
@@ -653,7 +757,7 @@ class WhatsAppService:
                 raise http_err
                     
         except Exception as e:
-            print(f"❌ Send image message error (Base64): {str(e)} | File: {image_file_path}")
+            print(f"❌ Send image message error (Base64): {str(e)} | Bytes: {len(image_data)}")
             return False
     
     async def send_image_message_via_media_endpoint(self, phone_number: str, image_file_path: str, caption: str = "") -> bool:
@@ -665,11 +769,29 @@ class WhatsAppService:
                 print(f"❌ Image file not found: {image_file_path}")
                 return False
             
-            file_size = os.path.getsize(image_file_path)
+            print(f"📷 Sending image file: {image_file_path}")
+            
+            with open(image_file_path, "rb") as image_file:
+                image_data = image_file.read()
+            
+            return await self.send_image_message_via_media_endpoint_from_bytes(
+                phone_number, image_data, caption, filename=os.path.basename(image_file_path)
+            )
+                        
+        except Exception as e:
+            print(f"❌ Send image message error (Media Endpoint): {str(e)} | File: {image_file_path}")
+            return False
+    
+    async def send_image_message_via_media_endpoint_from_bytes(self, phone_number: str, image_data: bytes, caption: str = "", filename: str = "image.webp") -> bool:
+        """
+        Send in-memory image bytes via /messages/media/image endpoint (multipart)
+        """
+        try:
+            await self._wait_for_send_slot(phone_number)
             url = f"{self.base_url}/messages/media/image"
             
             print(f"📷 Sending image message (Media Endpoint) to {phone_number}")
-            print(f"   File: {image_file_path} ({file_size} bytes)")
+            print(f"   Image: {filename} ({len(image_data)} bytes)")
             print(f"   Caption: {caption}")
             print(f"   URL: {url}")
             
@@ -689,33 +811,33 @@ class WhatsAppService:
             print(f"📷 Headers: {headers}")
             
             # Prepare multipart form data
-            with open(image_file_path, "rb") as image_file:
-                files = {
-                    "media": (os.path.basename(image_file_path), image_file.read(), "image/webp")
-                }
-                
-                print(f"📷 Files: media file ({len(files['media'][1])} bytes)")
-                
-                try:
-                    async with httpx.AsyncClient(timeout=60.0) as client:
-                        response = await client.post(url, headers=headers, data=data, files=files)
-                        
-                        print(f"📷 Response status: {response.status_code}")
-                        print(f"📷 Response body: {response.text}")
-                        
-                        if response.status_code == 200:
-                            print(f"✅ Image message sent via Media Endpoint to {phone_number}")
-                            return True
-                        else:
-                            print(f"❌ Failed to send image message via Media Endpoint: {response.status_code}")
-                            return False
-                except Exception as http_err:
-                    print(f"❌ HTTP request failed: {str(http_err)}")
-                    print(f"❌ HTTP error type: {type(http_err)}")
-                    raise http_err
+            files = {
+                "media": (filename, image_data, "image/webp")
+            }
+            
+            print(f"📷 Files: media file ({len(image_data)} bytes)")
+            
+            try:
+                async with self._http_client(timeout=60.0) as client:
+                    response = await client.post(url, headers=headers, data=data, files=files)
+                    whatsapp_circuit.record_response(response.status_code)
+                    
+                    print(f"📷 Response status: {response.status_code}")
+                    print(f"📷 Response body: {response.text}")
+                    
+                    if response.status_code == 200:
+                        print(f"✅ Image message sent via Media Endpoint to {phone_number}")
+                        return True
+                    else:
+                        print(f"❌ Failed to send image message via Media Endpoint: {response.status_code}")
+                        return False
+            except Exception as http_err:
+                print(f"❌ HTTP request failed: {str(http_err)}")
+                print(f"❌ HTTP error type: {type(http_err)}")
+                raise http_err
                         
         except Exception as e:
-            print(f"❌ Send image message error (Media Endpoint): {str(e)} | File: {image_file_path}")
+            print(f"❌ Send image message error (Media Endpoint): {str(e)} | File: {filename}")
             return False
     
     async def send_image_message_n8n_style(self, phone_number: str, image_file_path: str, caption: str = "") -> bool:
@@ -728,13 +850,29 @@ class WhatsAppService:
                 print(f"❌ Image file not found: {image_file_path}")
                 return False
             
-            file_size = os.path.getsize(image_file_path)
+            print(f"📷 Sending image file: {image_file_path}")
+            
+            # Read file as binary data (n8n style)
+            with open(image_file_path, "rb") as image_file:
+                file_data = image_file.read()
             
+            return await self.send_image_message_n8n_style_from_bytes(phone_number, file_data, caption)
+                        
+        except Exception as e:
+            print(f"❌ Send image message error (n8n style): {str(e)} | File: {image_file_path}")
+            return False
+    
+    async def send_image_message_n8n_style_from_bytes(self, phone_number: str, image_data: bytes, caption: str = "") -> bool:
+        """
+        Send in-memory image bytes n8n-style: /messages/media/image?to=PHONE with binary body
+        """
+        try:
             # n8n-style URL with query parameters
+            await self._wait_for_send_slot(phone_number)
             url = f"{self.base_url}/messages/media/image"
             
             print(f"📷 Sending image message (n8n style) to {phone_number}")
-            print(f"   File: {image_file_path} ({file_size} bytes)")
+            print(f"   Image: {len(image_data)} bytes")
             print(f"   Caption: {caption}")
             print(f"   URL: {url}")
             
@@ -753,41 +891,61 @@ class WhatsAppService:
             
             print(f"📷 Params: {params}")
             print(f"📷 Headers: {headers}")
+            print(f"📷 Binary data size: {len(image_data)} bytes")
             
-            # Read file as binary data (n8n style)
-            with open(image_file_path, "rb") as image_file:
-                file_data = image_file.read()
-                
-                print(f"📷 Binary data size: {len(file_data)} bytes")
-                
-                try:
-                    async with httpx.AsyncClient(timeout=60.0) as client:
-                        # Send binary data as body with query parameters (n8n approach)
-                        response = await client.post(
-                            url, 
-                            headers=headers, 
-                            params=params,
-                            content=file_data
-                        )
-                        
-                        print(f"📷 Response status: {response.status_code}")
-                        print(f"📷 Response body: {response.text}")
-                        
-                        if response.status_code == 200:
-                            print(f"✅ Image message sent via n8n style to {phone_number}")
-                            return True
-                        else:
-                            print(f"❌ Failed to send image message via n8n style: {response.status_code}")
-                            return False
-                except Exception as http_err:
-                    print(f"❌ HTTP request failed: {str(http_err)}")
-                    print(f"❌ HTTP error type: {type(http_err)}")
-                    raise http_err
+            try:
+                async with self._http_client(timeout=60.0) as client:
+                    # Send binary data as body with query parameters (n8n approach)
+                    response = await client.post(
+                        url, 
+                        headers=headers, 
+                        params=params,
+                        content=image_data
+                    )
+                    whatsapp_circuit.record_response(response.status_code)
+                    
+                    print(f"📷 Response status: {response.status_code}")
+                    print(f"📷 Response body: {response.text}")
+                    
+                    if response.status_code == 200:
+                        print(f"✅ Image message sent via n8n style to {phone_number}")
+                        return True
+                    else:
+                        print(f"❌ Failed to send image message via n8n style: {response.status_code}")
+                        return False
+            except Exception as http_err:
+                print(f"❌ HTTP request failed: {str(http_err)}")
+                print(f"❌ HTTP error type: {type(http_err)}")
+                raise http_err
                         
         except Exception as e:
-            print(f"❌ Send image message error (n8n style): {str(e)} | File: {image_file_path}")
+            print(f"❌ Send image message error (n8n style): {str(e)} | Bytes: {len(image_data)}")
             return False
     
+    async def send_image_message_from_bytes_with_fallback(self, phone_number: str, image_data: bytes, caption: str = "", mime_type: str = "image/webp", filename: str = "image.webp") -> bool:
+        """
+        Send in-memory image bytes trying each WHAPI image endpoint in turn,
+        starting with the method that last succeeded so a consistently
+        failing endpoint doesn't cost a request (and timeout) on every send
+        """
+        global _preferred_image_method
+        senders = {
+            "base64": lambda: self.send_image_message_from_bytes(phone_number, image_data, caption, mime_type=mime_type),
+            "n8n": lambda: self.send_image_message_n8n_style_from_bytes(phone_number, image_data, caption),
+            "media": lambda: self.send_image_message_via_media_endpoint_from_bytes(phone_number, image_data, caption, filename=filename),
+        }
+        order = [_preferred_image_method] + [m for m in IMAGE_SEND_METHODS if m != _preferred_image_method]
+        
+        for method in order:
+            if await senders[method]():
+                if method != _preferred_image_method:
+                    print(f"📷 Image method '{method}' worked, preferring it from now on")
+                    _preferred_image_method = method
+                return True
+            print(f"📷 Image method '{method}' failed, trying next...")
+        
+        return False
+    
     async def send_gif_message(self, phone_number: str, gif_file_path: str, caption: str = "") -> bool:
         """
         Send an animated GIF message via WhatsApp using WHAPI.cloud API
@@ -798,6 +956,7 @@ class WhatsAppService:
                 return False
             
             file_size = os.path.getsize(gif_file_path)
+            await self._wait_for_send_slot(phone_number)
             url = f"{self.base_url}/messages/gif"
             
             print(f"🎬 Sending GIF message (Base64) to {phone_number}")
@@ -825,8 +984,9 @@ class WhatsAppService:
             print(f"🎬 Headers: {self.headers}")
             
             try:
-                async with httpx.AsyncClient(timeout=60.0) as client:  # Longer timeout for GIFs
+                async with self._http_client(timeout=60.0) as client:  # Longer timeout for GIFs
                     response = await client.post(url, headers=self.headers, json=payload)
+                    whatsapp_circuit.record_response(response.status_code)
                     
                     print(f"🎬 Response status: {response.status_code}")
                     print(f"🎬 Response body: {response.text}")
@@ -853,7 +1013,7 @@ class WhatsAppService:
         try:
             url = f"{self.base_url}/account"
             
-            async with httpx.AsyncClient() as client:
+            async with self._http_client() as client:
                 response = await client.get(url, headers=self.headers)
                 
                 if response.status_code == 200:
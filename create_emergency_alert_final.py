@@ -9,6 +9,8 @@ import os
 from datetime import datetime
 import random
 import math
+import io
+from typing import BinaryIO, Optional
 
 def create_emergency_alert(
     # === REQUIRED DYNAMIC PARAMETERS ===
@@ -38,7 +40,11 @@ def create_emergency_alert(
     card_style: str = "modern",          
     border_style: str = "elegant",
     show_night_sky: bool = True,         # Stars and moon at top
-    show_background_city: bool = True    # Minimalistic city lines behind text
+    show_background_city: bool = True,   # Minimalistic city lines behind text
+    
+    # === OUTPUT PARAMETERS ===
+    output: BinaryIO = None,             # Write into this buffer instead of a file on disk
+    output_format: str = None            # "webp" encodes WhatsApp-ready WebP in one pass (default: PNG buffer / JPEG file)
 ):
     """
     FINAL PRODUCTION VERSION - Emergency Alert Generator
@@ -49,6 +55,9 @@ def create_emergency_alert(
     - Perfect spacing and readability
     - Customizable for any emergency type
     - Ready for WhatsApp integration
+    
+    Returns the saved file path, or the `output` buffer when one is given,
+    and None if the image could not be written
     """
     
     # Increased dimensions to ensure nothing gets cut off
@@ -282,14 +291,51 @@ def create_emergency_alert(
     text_x = (width - emergency_width) // 2
     draw_elegant_text(draw, emergency_text, text_x, y + 15, subtitle_font, colors['white'])
     
+    # WebP goes straight to WhatsApp, skipping a PNG/JPEG encode + WebP re-encode
+    if output_format == "webp":
+        save_kwargs = {'format': 'WEBP', 'quality': 85, 'method': 4}
+        extension = "webp"
+    elif output is not None:
+        save_kwargs = {'format': 'PNG'}
+        extension = "png"
+    else:
+        save_kwargs = {'format': 'JPEG', 'quality': 98, 'optimize': True}
+        extension = "jpg"
+    
+    # Save image straight into the caller's buffer (no disk round-trip)
+    if output is not None:
+        try:
+            image.save(output, **save_kwargs)
+        except (OSError, ValueError) as e:
+            print(f"❌ Could not encode emergency alert: {str(e)}")
+            return None
+        return output
+    
     # Save image
     timestamp_file = datetime.now().strftime("%Y%m%d_%H%M%S")
-    output_path = f"emergency_alert_{timestamp_file}.jpg"
+    output_path = f"emergency_alert_{timestamp_file}.{extension}"
     
-    image.save(output_path, format='JPEG', quality=98, optimize=True)
+    try:
+        image.save(output_path, **save_kwargs)
+    except (OSError, ValueError) as e:
+        print(f"❌ Could not save emergency alert: {str(e)}")
+        return None
     
     return output_path
 
+# Render-pool entry points: they live here, not in the pipeline, so a worker
+# process only imports this module (PIL) and never the whole pipeline
+def render_emergency_alert_bytes(**alert_kwargs) -> Optional[bytes]:
+    """Render the emergency alert image in a worker process and return the encoded bytes (None on failure)"""
+    image_buffer = io.BytesIO()
+    if create_emergency_alert(output=image_buffer, **alert_kwargs) is None:
+        return None
+    return image_buffer.getvalue()
+
+def warm_render_worker() -> bool:
+    """No-op job that makes the pool start a worker (with the renderer already imported)"""
+    return True
+
 def draw_cute_night_sky(draw, width, sky_height):
     """
     Draw a cute night sky with stars and moon at the top
@@ -385,7 +431,7 @@ def test_emergency_alert_production():
         
         image_path = create_emergency_alert(**test_case)
         
-        if os.path.exists(image_path):
+        if image_path:
             file_size = os.path.getsize(image_path)
             print(f"✅ FINAL Static Image created: {os.path.basename(image_path)}")
             print(f"📊 Size: {file_size} bytes")
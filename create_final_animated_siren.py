@@ -9,6 +9,7 @@ import os
 from datetime import datetime
 import random
 import math
+from typing import BinaryIO
 
 def create_animated_emergency_alert_gif(
     # === REQUIRED DYNAMIC PARAMETERS ===
@@ -28,6 +29,7 @@ def create_animated_emergency_alert_gif(
     # === ANIMATION PARAMETERS ===
     num_frames: int = 12,           # Number of animation frames
     frame_duration: int = 150,      # Duration per frame in ms
+    palette_colors: int = 64,       # Shared GIF palette size (smaller = faster encode, smaller file)
     
     # === VISUAL CUSTOMIZATION PARAMETERS ===
     primary_color: str = "#1E3A8A",
@@ -39,13 +41,19 @@ def create_animated_emergency_alert_gif(
     # === LAYOUT PARAMETERS ===
     show_timestamp: bool = False,
     show_verification: bool = False,
-    show_night_sky: bool = True
+    show_night_sky: bool = True,
+    
+    # === OUTPUT PARAMETERS ===
+    output: BinaryIO = None         # Write GIF into this buffer instead of a file on disk
 ):
     """
     Create animated emergency alert with spinning siren
     
     Creates a GIF with spinning modern siren animation while keeping
     all other elements static and professional
+    
+    Returns the saved file path, or the `output` buffer when one is given,
+    and None if the GIF could not be written
     """
     
     # Dimensions
@@ -286,19 +294,33 @@ def create_animated_emergency_alert_gif(
         # Add frame to list
         frames.append(image)
     
-    # Save as animated GIF
-    timestamp_file = datetime.now().strftime("%Y%m%d_%H%M%S")
-    output_path = f"animated_emergency_alert_{timestamp_file}.gif"
+    # Save animated GIF straight into the caller's buffer (no disk round-trip)
+    if output is None:
+        timestamp_file = datetime.now().strftime("%Y%m%d_%H%M%S")
+        output_path = f"animated_emergency_alert_{timestamp_file}.gif"
+    else:
+        output_path = output
+    
+    # Quantize every frame against one shared palette built from the first
+    # frame; otherwise the GIF writer quantizes each RGB frame on its own
+    # (slow, and every frame then carries its own local palette)
+    palette_frame = frames[0].quantize(colors=palette_colors, method=Image.Quantize.FASTOCTREE, dither=Image.Dither.NONE)
+    frames = [palette_frame] + [frame.quantize(palette=palette_frame, dither=Image.Dither.NONE) for frame in frames[1:]]
     
     # Save animated GIF
-    frames[0].save(
-        output_path,
-        save_all=True,
-        append_images=frames[1:],
-        duration=frame_duration,
-        loop=0,  # Infinite loop
-        format='GIF'
-    )
+    try:
+        frames[0].save(
+            output_path,
+            save_all=True,
+            append_images=frames[1:],
+            duration=frame_duration,
+            loop=0,  # Infinite loop
+            optimize=True,
+            format='GIF'
+        )
+    except (OSError, ValueError) as e:
+        print(f"❌ Could not save animated emergency alert: {str(e)}")
+        return None
     
     return output_path
 
@@ -433,7 +455,7 @@ def test_final_animated_siren():
         
         gif_path = create_animated_emergency_alert_gif(**test_case)
         
-        if os.path.exists(gif_path):
+        if gif_path:
             file_size = os.path.getsize(gif_path)
             print(f"✅ FINAL Animated GIF created: {os.path.basename(gif_path)}")
             print(f"📊 Size: {file_size} bytes")
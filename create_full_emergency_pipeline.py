@@ -2,628 +2,1158 @@
 """
 Complete Emergency Alert Pipeline
 Integrates all emergency response components in proper sequence
+
+Fully type-annotated so it can optionally be AOT-compiled in place with
+mypyc (`mypyc create_full_emergency_pipeline.py`); callers need no changes.
 """
 
 import asyncio
+import atexit
+import contextlib
+import dataclasses
+import functools
+import io
+import logging
+import logging.handlers
+import multiprocessing
 import os
+import queue
+import random
+import sys
 import time
+import weakref
 import json
 import aiohttp
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from typing import Callable, Optional
+
+# orjson (de)serializes the OpenAI payloads several times faster than the
+# stdlib; fall back to json when it isn't installed
+try:
+    import orjson
+    _json_dumps = orjson.dumps
+    _json_loads = orjson.loads
+except ImportError:
+    def _json_dumps(obj) -> bytes:
+        return json.dumps(obj, ensure_ascii=False).encode()
+    _json_loads = json.loads
+
+# Import services and the renderer at module load so the first emergency
+# doesn't pay the import cost (PIL alone pulls in a lot of submodules).
+# Missing optional pieces become None and their step is skipped/failed.
+try:
+    from app.services.whatsapp_service import WhatsAppService, whatsapp_circuit
+    from app.services.ewelink_service import EWeLinkService
+    from app.services.member_lookup_service import MemberLookupService
+    from app.services.http_client import get_http_client
+except ImportError as e:
+    print(f"❌ Error importando servicios básicos: {str(e)}")
+    WhatsAppService = whatsapp_circuit = EWeLinkService = MemberLookupService = get_http_client = None
+
+try:
+    from app.services.image_service import ImageService
+    from create_emergency_alert_final import (  # Also warms up PIL
+        create_emergency_alert, render_emergency_alert_bytes, warm_render_worker,
+    )
+except ImportError as e:
+    print(f"⚠️ Generación de imagen no disponible: {str(e)}")
+    ImageService = create_emergency_alert = render_emergency_alert_bytes = warm_render_worker = None
+
+try:
+    from app.services.voice_service import VoiceService
+except ImportError as e:
+    print(f"⚠️ Servicio de voz no disponible: {str(e)}")
+    VoiceService = None
+
+try:
+    from app.services.audit_service import AuditService
+except ImportError as e:
+    print(f"⚠️ Servicio de auditoría no disponible: {str(e)}")
+    AuditService = None
 
-async def execute_full_emergency_pipeline(
-    incident_type: str = "EMERGENCIA GENERAL",
-    street_address: str = "Ubicación por confirmar", 
-    emergency_number: str = "SAMU 131",
-    sender_phone: str = "",
-    sender_name: str = "Usuario",
-    group_chat_id: str = "",
-    group_name: str = "Grupo de Emergencia",
-    device_id: str = "10011eafd1",
-    blink_cycles: int = 3,
-    voice_text: str = None,
+# Non-blocking pipeline logger: the event loop only enqueues records and a
+# QueueListener thread does the actual (possibly slow) stdout writes
+logger = logging.getLogger("emergency_pipeline")
+if not logger.handlers:
+    _stdout_handler = logging.StreamHandler(sys.stdout)
+    _stdout_handler.setFormatter(logging.Formatter("%(message)s"))
+    _log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    _log_listener = logging.handlers.QueueListener(_log_queue, _stdout_handler)
+    _log_listener.start()
+    atexit.register(_log_listener.stop)  # Drains queued records on exit
+    logger.addHandler(logging.handlers.QueueHandler(_log_queue))
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+_PIPELINE_BANNER = "🚨" + "=" * 80
+_SUMMARY_BANNER = "🏆" + "=" * 80
+
+# Full banner blocks, emitted as one log record each
+_PIPELINE_HEADER = f"{_PIPELINE_BANNER}\n🚨 INICIANDO PIPELINE COMPLETO DE EMERGENCIA\n{_PIPELINE_BANNER}"
+_SUMMARY_HEADER = f"\n{_SUMMARY_BANNER}\n🏆 RESUMEN DEL PIPELINE DE EMERGENCIA\n{_SUMMARY_BANNER}"
+
+# Fallback message templates, parsed once and filled with format_map
+_SUMMARY_TPL = """🚨 EMERGENCIA ACTIVADA 🚨
+
+📋 TIPO: {incident_type}
+📍 UBICACIÓN: {street_address}
+👤 REPORTADO POR: {sender_name}
+📞 CONTACTO: {sender_phone}{member_details}
+
+⏰ HORA: {hora}
+📅 FECHA: {fecha}
+
+⚠️ MANTÉNGANSE SEGUROS
+📢 SIGAN INSTRUCCIONES OFICIALES"""
+
+# Invariant pieces of the fallback summary's member/contact block
+_DEFAULT_EMERGENCY_NUMBERS = "\n\n🚑 SAMU: 131\n🚒 BOMBEROS: 132\n👮 CARABINEROS: 133"
+_GROUP_EMERGENCY_NUMBERS_TPL = "\n\n🚑 SAMU: {samu}\n🚒 BOMBEROS: {bomberos}\n👮 CARABINEROS: {carabineros}"
+_EVACUATION_LINE = "\n🚨 REQUIERE ASISTENCIA EVACUACIÓN"
+
+_VOICE_TPL = (
+    "Alerta de emergencia. {incident_type} reportada en {street_address}. "
+    "Contacto de emergencia: {emergency_number}. Reportado por {sender_name}. "
+    "Por favor, manténganse seguros y sigan las instrucciones de las autoridades."
+)
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class EmergencyContext:
+    """Everything the pipeline needs about one emergency, passed as a single object"""
+    incident_type: str = "EMERGENCIA GENERAL"
+    street_address: str = "Ubicación por confirmar"
+    emergency_number: str = "SAMU 131"
+    sender_phone: str = ""
+    sender_name: str = "Usuario"
+    group_chat_id: str = ""
+    group_name: str = "Grupo de Emergencia"
+    device_id: str = "10011eafd1"
+    blink_cycles: int = 3
+    voice_text: Optional[str] = None
     use_member_data: bool = True
-):
+    
+    @property
+    def fallback_voice_text(self) -> str:
+        """Template voice message, only built when AI generation fails"""
+        return _VOICE_TPL.format_map({
+            'incident_type': self.incident_type,
+            'street_address': self.street_address,
+            'emergency_number': self.emergency_number,
+            'sender_name': self.sender_name,
+        })
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class MemberView:
+    """Member lookup result normalized once, so the steps read attributes instead of dict.get chains"""
+    name: str
+    full_address: str
+    emergency_contact: str
+    has_medical: bool
+    medical_info: str
+    blood_type: str
+    medical_conditions: tuple[str, ...]
+    allergies: tuple[str, ...]
+    evacuation: bool
+    special_needs: tuple[str, ...]
+    is_high_priority: bool
+    total_members: object
+    samu: str
+    bomberos: str
+    carabineros: str
+    group_contact: str
+    coordinator: str
+    raw: dict
+    
+    @classmethod
+    def from_dict(cls, member_data: dict) -> "MemberView":
+        """Build the view from a MemberLookupService result, applying every default in one place"""
+        contacts = member_data.get('group_emergency_contacts') or {}
+        return cls(
+            name=member_data.get('name', ''),
+            full_address=member_data.get('full_address', ''),
+            emergency_contact=member_data.get('emergency_contact') or "No registrado",
+            has_medical=bool(member_data.get('has_medical_conditions')),
+            medical_info=member_data.get('medical_info', ''),
+            blood_type=member_data.get('blood_type', ''),
+            medical_conditions=tuple(member_data.get('medical_conditions') or ()),
+            allergies=tuple(member_data.get('allergies') or ()),
+            evacuation=bool(member_data.get('evacuation_assistance')),
+            special_needs=tuple(member_data.get('special_needs') or ()),
+            is_high_priority=bool(member_data.get('is_high_priority')),
+            total_members=member_data.get('total_members', 'Unknown'),
+            samu=contacts.get('samu', '131'),
+            bomberos=contacts.get('bomberos', '132'),
+            carabineros=contacts.get('carabineros', '133'),
+            group_contact=contacts.get('group_emergency_contact', ''),
+            coordinator=contacts.get('emergency_coordinator', ''),
+            raw=member_data,
+        )
+
+def _build_fallback_summary(ctx: EmergencyContext, member: Optional[MemberView], now: datetime) -> str:
+    """Template text summary (with member data when available), used when AI generation fails"""
+    parts: list[str] = []
+    if member is not None:
+        if member.has_medical:
+            parts.append(f"\n🩺 INFO MÉDICA: {member.medical_info}")
+        if member.evacuation:
+            parts.append(_EVACUATION_LINE)
+        if member.emergency_contact != "No registrado":
+            parts.append(f"\n📞 CONTACTO EMERGENCIA: {member.emergency_contact}")
+        
+        # Group numbers (the view already defaults them to the national ones)
+        parts.append(_GROUP_EMERGENCY_NUMBERS_TPL.format(
+            samu=member.samu,
+            bomberos=member.bomberos,
+            carabineros=member.carabineros,
+        ))
+        if member.group_contact:
+            parts.append(f"\n📞 COORDINADOR GRUPO: {member.group_contact}")
+    else:
+        parts.append(_DEFAULT_EMERGENCY_NUMBERS)
+    
+    return _SUMMARY_TPL.format_map({
+        'incident_type': ctx.incident_type,
+        'street_address': ctx.street_address,
+        'sender_name': ctx.sender_name,
+        'sender_phone': ctx.sender_phone,
+        'member_details': "".join(parts),
+        'hora': f"{now:%H:%M:%S}",
+        'fecha': f"{now:%d/%m/%Y}",
+    })
+
+@dataclasses.dataclass(slots=True)
+class PipelineResult:
+    """Pipeline outcome with per-step timings; truthy when the pipeline succeeded"""
+    success: bool
+    steps: dict[str, dict] = dataclasses.field(default_factory=dict)
+    total_ns: int = 0
+    
+    def __bool__(self) -> bool:
+        return self.success
+
+@contextlib.contextmanager
+def _temp_artifact(path: str):
+    """Yield a temporary artifact path and always unlink it afterwards (no exists() pre-check)"""
+    try:
+        yield path
+    finally:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+def _discard_voice_file(task: asyncio.Task) -> None:
+    """Done callback for a voice task whose file won't be sent: remove the file it produced"""
+    if task.cancelled() or task.exception() is not None:
+        return
+    with _temp_artifact(task.result()):
+        logger.info(f"🗑️ Archivo de voz descartado: {task.result()}")
+
+# Service singletons: built once per process (on first use, so construction
+# errors surface in the pipeline instead of at import) and reused across
+# emergencies. WhatsApp and eWeLink share one keep-alive HTTP client, and
+# eWeLink keeps its auth token between runs
+@functools.lru_cache(maxsize=1)
+def _get_whatsapp_service() -> "WhatsAppService":
+    return WhatsAppService(http_client=get_http_client())
+
+@functools.lru_cache(maxsize=1)
+def _get_ewelink_service() -> "EWeLinkService":
+    return EWeLinkService(http_client=get_http_client())
+
+@functools.lru_cache(maxsize=1)
+def _get_member_lookup_service() -> "MemberLookupService":
+    return MemberLookupService()
+
+@functools.lru_cache(maxsize=1)
+def _get_image_service() -> "ImageService":
+    return ImageService()
+
+@functools.lru_cache(maxsize=1)
+def _get_voice_service() -> "VoiceService":
+    return VoiceService()
+
+@functools.lru_cache(maxsize=1)
+def _get_audit_service() -> "AuditService":
+    return AuditService()
+
+# Audit writes in flight; holding references keeps the tasks from being
+# garbage collected before they finish
+_pending_audits: set = set()
+
+def _on_audit_done(task: asyncio.Task) -> None:
+    """Report the outcome of a background audit write"""
+    _pending_audits.discard(task)
+    if task.cancelled():
+        return
+    if task.exception() is not None:
+        logger.warning(f"⚠️ Could not log emergency event to audit: {str(task.exception())}")
+    else:
+        logger.info(f"✅ Emergency event logged to audit system")
+
+async def drain_pending_audits() -> None:
+    """Wait for background audit writes to finish (call on application shutdown)"""
+    if _pending_audits:
+        await asyncio.shield(asyncio.gather(*_pending_audits, return_exceptions=True))
+
+# Worker processes for CPU-bound PIL rendering so image generation never
+# blocks the event loop (eWeLink, WhatsApp and OpenAI calls keep running).
+# Workers come from a forkserver (spawn where unavailable), never a fork of
+# this process: the log listener thread and the aiohttp sessions may hold
+# locks mid-fork. The server preloads only the renderer module, so workers
+# neither re-import this pipeline nor run __main__.
+_RENDER_WORKERS = 2
+if "forkserver" in multiprocessing.get_all_start_methods():
+    _RENDER_MP_CONTEXT = multiprocessing.get_context("forkserver")
+    _RENDER_MP_CONTEXT.set_forkserver_preload(["create_emergency_alert_final"])
+else:
+    _RENDER_MP_CONTEXT = multiprocessing.get_context("spawn")
+_CPU_POOL = ProcessPoolExecutor(max_workers=_RENDER_WORKERS, mp_context=_RENDER_MP_CONTEXT)
+
+async def warm_render_pool() -> None:
+    """Start the render worker processes ahead of the first emergency (call on application startup)"""
+    if warm_render_worker is None:
+        return
+    loop = asyncio.get_running_loop()
+    await asyncio.gather(*(loop.run_in_executor(_CPU_POOL, warm_render_worker) for _ in range(_RENDER_WORKERS)))
+
+# Keep-alive session shared by the OpenAI calls so the second request reuses
+# the already negotiated TCP/TLS connection to api.openai.com
+_openai_session: Optional[aiohttp.ClientSession] = None
+
+async def _get_openai_session() -> aiohttp.ClientSession:
+    """Get the shared OpenAI session (created lazily inside the running loop)"""
+    global _openai_session
+    if _openai_session is None or _openai_session.closed:
+        _openai_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=20, ttl_dns_cache=300, keepalive_timeout=60)
+        )
+    return _openai_session
+
+async def close_openai_session() -> None:
+    """Close the shared OpenAI session (call on application shutdown)"""
+    global _openai_session
+    if _openai_session is not None and not _openai_session.closed:
+        await _openai_session.close()
+    _openai_session = None
+
+# Short-lived LRU caches of generated messages: repeat alerts for the same
+# incident/location within a couple of minutes skip the OpenAI round trip.
+# Text-only and text+voice replies come from different prompts, so they are
+# cached separately
+_MSG_CACHE_TTL = 120.0
+_MSG_CACHE_MAX = 256
+_text_msg_cache: "OrderedDict[tuple, tuple[float, str]]" = OrderedDict()
+_bundle_cache: "OrderedDict[tuple, tuple[float, dict[str, str]]]" = OrderedDict()
+
+def _cache_get(cache: OrderedDict, key: tuple, ttl: float = _MSG_CACHE_TTL):
+    """Return a fresh cached value (refreshing its LRU position) or None"""
+    entry = cache.get(key)
+    if entry is None:
+        return None
+    if time.monotonic() - entry[0] >= ttl:
+        del cache[key]
+        return None
+    cache.move_to_end(key)
+    return entry[1]
+
+def _cache_put(cache: OrderedDict, key: tuple, value, max_size: int = _MSG_CACHE_MAX) -> None:
+    """Store a value, evicting the least recently used entries past max_size"""
+    cache[key] = (time.monotonic(), value)
+    cache.move_to_end(key)
+    while len(cache) > max_size:
+        cache.popitem(last=False)
+
+# Member emergency data per (phone, group) is stable for minutes at a time,
+# so repeat alerts skip the database lookup
+_MEMBER_CACHE_TTL = 300.0
+_MEMBER_CACHE_MAX = 1024
+_member_cache: "OrderedDict[tuple, tuple[float, dict]]" = OrderedDict()
+
+async def _member_cache_get(member_lookup, sender_phone: str, group_chat_id: str, group_name: str) -> Optional[dict]:
+    """Cached get_member_emergency_data; misses (None) and errors are not cached"""
+    key = (sender_phone, group_chat_id)
+    member_data = _cache_get(_member_cache, key, ttl=_MEMBER_CACHE_TTL)
+    if member_data is not None:
+        logger.info(f"♻️ Datos del miembro desde caché")
+        return member_data
+    
+    try:
+        member_data = await member_lookup.get_member_emergency_data(sender_phone, group_chat_id, group_name)
+    except Exception:
+        _member_cache.pop(key, None)
+        raise
+    if member_data:
+        _cache_put(_member_cache, key, member_data, max_size=_MEMBER_CACHE_MAX)
+    return member_data
+
+# Invariant instructions live in the system messages so each request only
+# carries the incident facts, and the identical prefix can hit OpenAI's
+# prompt cache
+_TEXT_SYSTEM_PROMPT = """You are a professional emergency response AI assistant for a community alert network in Chile. Generate a professional, urgent, and helpful emergency alert message in Spanish from the emergency details you are given.
+
+REQUIREMENTS:
+1. Start with 🚨 EMERGENCIA ACTIVADA 🚨
+2. Use appropriate emojis for the incident type
+3. Include specific safety instructions based on the emergency type
+4. Keep it under 350 words
+5. Use urgent but professional tone
+6. Include all provided details
+7. End with community safety reminder
+8. Format for WhatsApp readability
+9. If member has medical conditions or special needs, highlight this prominently
+10. If evacuation assistance is needed, emphasize this critically
+
+INCIDENT-SPECIFIC INSTRUCTIONS:
+- INCENDIO: Fire safety, evacuation routes, smoke precautions
+- EMERGENCIA MÉDICA: Medical emergency protocols, space for ambulances, mention medical history if available
+- ACCIDENTE: Traffic safety, avoid area, help emergency services
+- TERREMOTO: Earthquake safety, aftershock warnings, safe areas
+- EMERGENCIA GENERAL: General emergency protocols
+
+SPECIAL INSTRUCTIONS:
+- If member has medical conditions, include "🩺 ATENCIÓN MÉDICA: [conditions]"
+- If evacuation assistance needed, include "🚨 REQUIERE ASISTENCIA PARA EVACUACIÓN"
+- If high priority member, emphasize urgency
+- Include emergency contact if available and different from reporter
+- ALWAYS include all emergency services: SAMU, BOMBEROS, CARABINEROS with their numbers
+- Include group emergency contact and coordinator if configured
+- Format emergency numbers clearly with emojis (🚑 🚒 👮 📞)"""
+
+_VOICE_SYSTEM_PROMPT = """You are a professional emergency voice system. Generate a clear, urgent voice message in Spanish for an emergency text-to-speech audio broadcast from the emergency details you are given. It will be spoken aloud to the community.
+
+VOICE MESSAGE REQUIREMENTS:
+1. Clear, calm but urgent tone suitable for TTS
+2. 30-60 seconds when spoken (around 100-200 words)
+3. Include specific safety instructions for the incident type
+4. Easy to understand when spoken aloud
+5. Include emergency contact number clearly
+6. End with safety reminder
+7. Use simple, clear Spanish suitable for audio
+
+INCIDENT-SPECIFIC VOICE INSTRUCTIONS:
+- INCENDIO: Clear evacuation instructions, avoid smoke
+- EMERGENCIA MÉDICA: Make space for ambulances, CPR if needed
+- ACCIDENTE: Traffic warnings, alternative routes
+- TERREMOTO: Drop-cover-hold, aftershock warnings
+- EMERGENCIA GENERAL: General safety protocols"""
+
+# Text and voice in one reply: the text comes first so it can be sent as soon
+# as the separator line streams in, while the voice script is still written
+_BUNDLE_SEPARATOR = "===VOZ==="
+_BUNDLE_SYSTEM_PROMPT = f"""You write two versions of the same emergency alert. Reply with the WhatsApp text message first, then a line containing only {_BUNDLE_SEPARATOR}, then the voice message. Nothing else.
+
+=== WHATSAPP TEXT MESSAGE ===
+{_TEXT_SYSTEM_PROMPT}
+
+=== VOICE MESSAGE (plain text for TTS: no formatting, no emojis) ===
+{_VOICE_SYSTEM_PROMPT}"""
+
+_OPENAI_CHAT_URL = "https://api.openai.com/v1/chat/completions"
+_OPENAI_TIMEOUT = aiohttp.ClientTimeout(total=8, connect=2)
+# Streamed replies are long-lived; bound the gap between chunks instead
+_OPENAI_STREAM_TIMEOUT = aiohttp.ClientTimeout(total=None, connect=2, sock_read=8)
+# Transient statuses worth retrying; 400/401/403 etc. fail immediately
+_OPENAI_RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+async def _post_openai_chat(headers: dict, payload: dict, attempts: int = 3) -> dict:
+    """
+    POST a chat completion, retrying transient failures (429/5xx, network
+    errors, timeouts) with exponential backoff and full jitter
     """
-    Execute complete emergency response pipeline:
+    session = await _get_openai_session()
+    for attempt in range(attempts):
+        try:
+            async with session.post(_OPENAI_CHAT_URL, headers=headers, data=_json_dumps(payload), timeout=_OPENAI_TIMEOUT) as response:
+                if response.status == 200:
+                    return _json_loads(await response.read())
+                error_text = await response.text()
+                if response.status not in _OPENAI_RETRY_STATUSES or attempt == attempts - 1:
+                    raise Exception(f"OpenAI API error {response.status}: {error_text}")
+                logger.warning(f"⚠️ OpenAI API error {response.status} (intento {attempt + 1}/{attempts})")
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            if attempt == attempts - 1:
+                raise
+            logger.warning(f"⚠️ OpenAI request failed: {type(e).__name__} (intento {attempt + 1}/{attempts})")
+        
+        await asyncio.sleep(min(2 ** attempt, 4) * random.random())
+
+async def _stream_openai_chat(headers: dict, payload: dict, attempts: int = 3):
+    """
+    Stream a chat completion, yielding content deltas as they arrive. Failures
+    before the first chunk are retried like _post_openai_chat; once content has
+    been yielded an error is raised instead, since a retry would repeat it
+    """
+    session = await _get_openai_session()
+    for attempt in range(attempts):
+        started = False
+        try:
+            async with session.post(_OPENAI_CHAT_URL, headers=headers, data=_json_dumps({**payload, "stream": True}), timeout=_OPENAI_STREAM_TIMEOUT) as response:
+                if response.status == 200:
+                    # Server-sent events: one "data: {...}" line per chunk
+                    async for raw_line in response.content:
+                        line = raw_line.strip()
+                        if not line.startswith(b"data: "):
+                            continue
+                        if line == b"data: [DONE]":
+                            return
+                        delta = _json_loads(line[6:])['choices'][0]['delta'].get('content')
+                        if delta:
+                            started = True
+                            yield delta
+                    return
+                error_text = await response.text()
+                if response.status not in _OPENAI_RETRY_STATUSES or attempt == attempts - 1:
+                    raise Exception(f"OpenAI API error {response.status}: {error_text}")
+                logger.warning(f"⚠️ OpenAI API error {response.status} (intento {attempt + 1}/{attempts})")
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            if started or attempt == attempts - 1:
+                raise
+            logger.warning(f"⚠️ OpenAI request failed: {type(e).__name__} (intento {attempt + 1}/{attempts})")
+        
+        await asyncio.sleep(min(2 ** attempt, 4) * random.random())
+
+# Bulkhead: cap concurrent pipelines so a burst of alerts can't stampede the
+# provider rate limits, and serialize alerts for the same group. Each running
+# or waiting alert holds its group's lock, so a weak mapping drops the entry
+# once the last alert for that group is done (no lock per group ever seen)
+_PIPELINE_MAX_CONCURRENCY = 8
+_pipeline_sem = asyncio.Semaphore(_PIPELINE_MAX_CONCURRENCY)
+_group_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+async def execute_full_emergency_pipeline(ctx: EmergencyContext) -> PipelineResult:
+    """
+    Execute complete emergency response pipeline for the given EmergencyContext:
     1. Device blink sequence (ending OFF)
     2. Text summary (FAST - immediate alert)
     3. Emergency alert image (dynamic with real data)
     4. Voice message (OpenAI TTS - slower)
     5. Animated emergency GIF (dynamic with real data)
+    
+    Returns a PipelineResult (truthy on success) with per-step timings.
+    
+    Alerts for the same group run one after another, and at most
+    _PIPELINE_MAX_CONCURRENCY pipelines hit OpenAI/WhatsApp/eWeLink at once.
     """
+    group_lock = _group_locks.setdefault(ctx.group_chat_id, asyncio.Lock())
+    if group_lock.locked():
+        logger.info(f"⏳ Otra alerta en curso para {ctx.group_name}, esperando turno...")
     
-    print("🚨" + "="*80)
-    print("🚨 INICIANDO PIPELINE COMPLETO DE EMERGENCIA")
-    print("🚨" + "="*80)
+    # Group lock first, so queued alerts for a busy group don't hold a global slot
+    async with group_lock, _pipeline_sem:
+        return await _run_emergency_pipeline(ctx)
+
+async def _run_emergency_pipeline(ctx: EmergencyContext) -> PipelineResult:
+    """Pipeline body (see execute_full_emergency_pipeline)"""
+    pipeline_t0 = time.perf_counter_ns()
+    # One wall-clock reading shared by the prompt and the fallback summary, so
+    # every message reports the same time (and HORA/FECHA can't straddle midnight)
+    started_at = datetime.now()
+    logger.info(_PIPELINE_HEADER)
     
-    success_steps = []
-    failed_steps = []
+    success_steps: list[str] = []
+    failed_steps: list[str] = []
+    step_results: dict[str, dict] = {}
+    
+    def _record_step(name: str, ok: bool, t0: int) -> None:
+        """Track a finished step and how long it took"""
+        (success_steps if ok else failed_steps).append(name)
+        step_results[name] = {'ok': ok, 'ns': time.perf_counter_ns() - t0}
     
     # Initialize services
+    if WhatsAppService is None:
+        logger.error(f"❌ Servicios básicos no disponibles")
+        return PipelineResult(False, total_ns=time.perf_counter_ns() - pipeline_t0)
+    
     try:
-        from app.services.whatsapp_service import WhatsAppService
-        from app.services.ewelink_service import EWeLinkService
-        from app.services.member_lookup_service import MemberLookupService
+        # Process-wide instances, built on the first emergency and reused
+        whatsapp_service = _get_whatsapp_service()
+        ewelink_service = _get_ewelink_service()
+        member_lookup = _get_member_lookup_service()
         
-        whatsapp_service = WhatsAppService()
-        ewelink_service = EWeLinkService()
-        member_lookup = MemberLookupService()
-        
-        print(f"✅ Servicios básicos inicializados")
+        logger.info(f"✅ Servicios básicos inicializados")
     except Exception as e:
-        print(f"❌ Error inicializando servicios básicos: {str(e)}")
-        return False
+        logger.error(f"❌ Error inicializando servicios básicos: {str(e)}")
+        return PipelineResult(False, total_ns=time.perf_counter_ns() - pipeline_t0)
+    
+    # === STEP 1: DEVICE BLINK SEQUENCE (ENDING OFF) ===
+    # Only needs the device id, so the physical alert starts right away and
+    # the member lookup / OpenAI generation run during its ~3s of sleeps
+    async def _blink_step():
+        logger.info(f"\n🔴 PASO 1: SECUENCIA DE PARPADEO DEL DISPOSITIVO")
+        t0 = time.perf_counter_ns()
+        try:
+            # ON, then blink_cycles x (OFF, ON) and a final OFF, sent over one
+            # authenticated connection with the gaps timed by the service
+            sequence = [("ON", 0.0)]
+            for cycle in range(ctx.blink_cycles):
+                sequence += [("OFF", 1.0 if cycle == 0 else 0.5), ("ON", 0.5)]
+            sequence.append(("OFF", 0.5))
+            
+            logger.info(f"🔄 Enviando secuencia de parpadeo: {ctx.blink_cycles} ciclos, {len(sequence)} comandos")
+            blink_results = await ewelink_service.control_device_sequence(ctx.device_id, sequence)
+            if not blink_results[0]:
+                logger.warning(f"⚠️ Advertencia: No se pudo encender el dispositivo inicialmente")
+            
+            # Final state: OFF
+            final_off_result = blink_results[-1]
+        
+            if final_off_result:
+                logger.info(f"✅ Secuencia de parpadeo completada - dispositivo APAGADO")
+                _record_step("Device Blink Sequence", True, t0)
+            else:
+                logger.warning(f"⚠️ Parpadeo completado pero el estado final podría no ser correcto")
+                _record_step("Device Blink Sequence (partial)", True, t0)
+            
+        except Exception as e:
+            logger.error(f"❌ Error en secuencia de parpadeo: {str(e)}")
+            _record_step("Device Blink Sequence", False, t0)
+    
+    blink_task = asyncio.create_task(_blink_step())
     
     # Get comprehensive member data if available
-    member_data = None
-    if use_member_data and sender_phone and group_chat_id:
+    member: Optional[MemberView] = None
+    if ctx.use_member_data and ctx.sender_phone and ctx.group_chat_id:
         try:
-            print(f"🔍 Obteniendo datos del miembro desde base de datos...")
-            member_data = await member_lookup.get_member_emergency_data(
-                sender_phone, group_chat_id, group_name
+            logger.info(f"🔍 Obteniendo datos del miembro desde base de datos...")
+            member_data = await _member_cache_get(
+                member_lookup, ctx.sender_phone, ctx.group_chat_id, ctx.group_name
             )
             
             if member_data:
-                # Update variables with rich member data
-                sender_name = member_data.get("name", sender_name)
-                street_address = member_data.get("full_address", street_address)
+                member = MemberView.from_dict(member_data)
                 
-                print(f"✅ Datos del miembro obtenidos:")
-                print(f"   👤 Nombre: {sender_name}")
-                print(f"   📍 Dirección: {street_address}")
-                print(f"   🩺 Info médica: {member_data.get('has_medical_conditions')}")
-                print(f"   🚨 Alta prioridad: {member_data.get('is_high_priority')}")
+                # Update context with rich member data
+                ctx = dataclasses.replace(
+                    ctx,
+                    sender_name=member.name or ctx.sender_name,
+                    street_address=member.full_address or ctx.street_address
+                )
+                
+                logger.info(f"✅ Datos del miembro obtenidos:")
+                logger.info(f"   👤 Nombre: {ctx.sender_name}")
+                logger.info(f"   📍 Dirección: {ctx.street_address}")
+                logger.info(f"   🩺 Info médica: {member.has_medical}")
+                logger.info(f"   🚨 Alta prioridad: {member.is_high_priority}")
             
         except Exception as e:
-            print(f"⚠️ No se pudieron obtener datos del miembro: {str(e)}")
-            print(f"📝 Continuando con datos básicos del mensaje")
+            logger.warning(f"⚠️ No se pudieron obtener datos del miembro: {str(e)}")
+            logger.info(f"📝 Continuando con datos básicos del mensaje")
     
-    print(f"\n🎯 INFORMACIÓN DE EMERGENCIA:")
-    print(f"   🚨 Tipo: {incident_type}")
-    print(f"   📍 Ubicación: {street_address}")
-    print(f"   📞 Emergencia: {emergency_number}")
-    print(f"   👤 Reportado por: {sender_name} ({sender_phone})")
-    print(f"   🏘️ Grupo: {group_name}")
-    print(f"   🔌 Dispositivo: {device_id}")
+    logger.info(f"\n🎯 INFORMACIÓN DE EMERGENCIA:")
+    logger.info(f"   🚨 Tipo: {ctx.incident_type}")
+    logger.info(f"   📍 Ubicación: {ctx.street_address}")
+    logger.info(f"   📞 Emergencia: {ctx.emergency_number}")
+    logger.info(f"   👤 Reportado por: {ctx.sender_name} ({ctx.sender_phone})")
+    logger.info(f"   🏘️ Grupo: {ctx.group_name}")
+    logger.info(f"   🔌 Dispositivo: {ctx.device_id}")
     
-    # === STEP 1: DEVICE BLINK SEQUENCE (ENDING OFF) ===
-    print(f"\n🔴 PASO 1: SECUENCIA DE PARPADEO DEL DISPOSITIVO")
-    try:
-        # Turn device ON first
-        print(f"🔄 Encendiendo dispositivo...")
-        turn_on_result = await ewelink_service.control_device(device_id, "ON")
-        if not turn_on_result:
-            print(f"⚠️ Advertencia: No se pudo encender el dispositivo inicialmente")
+    # One streamed OpenAI call writes both the text summary and the voice script
+    # (unless the caller supplied the voice text). The text is handed over as
+    # soon as its part has streamed in; step 2 only awaits msg_task
+    message_kwargs = dict(
+        incident_type=ctx.incident_type,
+        street_address=ctx.street_address,
+        sender_name=ctx.sender_name,
+        sender_phone=ctx.sender_phone,
+        emergency_number=ctx.emergency_number,
+        group_name=ctx.group_name,
+        member=member,
+        current_time=started_at
+    )
+    bundle_task: Optional[asyncio.Task] = None
+    logger.info(f"🤖 Generating intelligent emergency message with OpenAI...")
+    if ctx.voice_text is None:
+        text_ready: asyncio.Future = asyncio.get_running_loop().create_future()
+        bundle_task = asyncio.create_task(generate_intelligent_emergency_bundle(
+            **message_kwargs, on_text=text_ready.set_result
+        ))
         
-        await asyncio.sleep(1)
+        async def _bundle_text() -> str:
+            await asyncio.wait((text_ready, bundle_task), return_when=asyncio.FIRST_COMPLETED)
+            if text_ready.done():
+                return text_ready.result()
+            return bundle_task.result()["text_message"]  # Raises the generation error
         
-        # Blink cycles
-        for cycle in range(1, blink_cycles + 1):
-            print(f"🔄 Ciclo de parpadeo {cycle}/{blink_cycles}")
-            
-            # OFF
-            await ewelink_service.control_device(device_id, "OFF")
-            await asyncio.sleep(0.5)
-            
-            # ON
-            await ewelink_service.control_device(device_id, "ON")
-            await asyncio.sleep(0.5)
+        msg_task = asyncio.create_task(_bundle_text())
+    else:
+        msg_task = asyncio.create_task(generate_intelligent_emergency_message(**message_kwargs))
+    
+    # The voice message (OpenAI text + TTS) is the slowest step and depends on
+    # nothing sent before it, so generate it in the background while the
+    # device blinks and the text/image go out; step 4 only has to send it
+    async def _prepare_voice():
+        if VoiceService is None:
+            raise Exception("Servicio de voz no disponible")
+        voice_service = _get_voice_service()
         
-        # Final state: OFF
-        print(f"🔴 Estado final: APAGANDO dispositivo")
-        final_off_result = await ewelink_service.control_device(device_id, "OFF")
+        voice_text: Optional[str] = ctx.voice_text
+        if bundle_task is not None:
+            # Intelligent voice message from the shared OpenAI reply
+            try:
+                voice_text = (await bundle_task)["voice_message"]
+                logger.info(f"✅ AI-generated voice message created")
+            except Exception as ai_error:
+                logger.warning(f"⚠️ AI voice generation failed: {str(ai_error)}")
+                logger.info(f"📝 Using fallback voice message...")
+                voice_text = ctx.fallback_voice_text
         
-        if final_off_result:
-            print(f"✅ Secuencia de parpadeo completada - dispositivo APAGADO")
-            success_steps.append("Device Blink Sequence")
-        else:
-            print(f"⚠️ Parpadeo completado pero el estado final podría no ser correcto")
-            success_steps.append("Device Blink Sequence (partial)")
-            
-    except Exception as e:
-        print(f"❌ Error en secuencia de parpadeo: {str(e)}")
-        failed_steps.append("Device Blink Sequence")
-    
-    await asyncio.sleep(2)
+        logger.info(f"🎙️ Generando mensaje de voz...")
+        
+        # Generate voice file
+        voice_file = await voice_service.generate_voice_message(voice_text, voice="nova")
+        if not voice_file:
+            raise Exception("No se pudo generar el archivo de voz")
+        
+        logger.info(f"✅ Archivo de voz creado: {voice_file}")
+        return voice_file
     
-    # === STEP 2: TEXT SUMMARY (FAST) ===
-    print(f"\n📱 PASO 2: RESUMEN DE TEXTO")
+    voice_task = asyncio.create_task(_prepare_voice())
     
-    try:
-        # Generate intelligent emergency message using OpenAI
-        print(f"🤖 Generating intelligent emergency message with OpenAI...")
+    # Render the alert image in the worker pool now too, so it is ready by the
+    # time the text summary is out (skipped while WhatsApp is known to be down)
+    render_future: Optional[asyncio.Future] = None
+    if create_emergency_alert is not None and not whatsapp_circuit.is_open:
+        logger.info(f"🖼️ Generating emergency alert image with dynamic data...")
+        logger.info(f"📊 Parameters: incident_type='{ctx.incident_type}', sender_name='{ctx.sender_name}', sender_phone='{ctx.sender_phone}'")
         
+        # Create emergency alert with member data if available, rendered in a
+        # worker process straight into memory so nothing touches the disk
+        render_future = asyncio.get_running_loop().run_in_executor(_CPU_POOL, functools.partial(
+            render_emergency_alert_bytes,
+            street_address=ctx.street_address,
+            phone_number=ctx.sender_phone,
+            contact_name=ctx.sender_name,
+            incident_type=ctx.incident_type,
+            chat_group_name=ctx.group_name,
+            alert_title="EMERGENCIA",
+            emergency_number=ctx.emergency_number,
+            show_night_sky=True,
+            show_background_city=True,
+            member_data=member.raw if member else None,  # Pass member data for enhanced content
+            output_format="webp"  # Encode WebP once in the renderer
+        ))
+    
+    # Remaining steps are independent of each other: the text summary goes out
+    # while the device is still blinking, then image and voice overlap with it
+    async def _text_summary_step():
+        logger.info(f"\n📱 PASO 2: RESUMEN DE TEXTO")
+        t0 = time.perf_counter_ns()
+    
         try:
-            # Try to generate AI-enhanced message with member data
-            text_summary = await generate_intelligent_emergency_message(
-                incident_type=incident_type,
-                street_address=street_address,
-                sender_name=sender_name,
-                sender_phone=sender_phone,
-                emergency_number=emergency_number,
-                group_name=group_name,
-                member_data=member_data
-            )
-            print(f"✅ AI-generated emergency message created")
-        except Exception as ai_error:
-            print(f"⚠️ AI message generation failed: {str(ai_error)}")
-            print(f"📝 Using fallback template message...")
-            
-            # Fallback to template message with member data if available
-            medical_info = ""
-            if member_data and member_data.get('has_medical_conditions'):
-                medical_info = f"\n🩺 INFO MÉDICA: {member_data.get('medical_info', '')}"
-            
-            evacuation_info = ""
-            if member_data and member_data.get('evacuation_assistance'):
-                evacuation_info = f"\n🚨 REQUIERE ASISTENCIA EVACUACIÓN"
-            
-            emergency_contact = ""
-            if member_data and member_data.get('emergency_contact') != "No registrado":
-                emergency_contact = f"\n📞 CONTACTO EMERGENCIA: {member_data.get('emergency_contact')}"
-            
-            # Get emergency numbers from member data
-            emergency_numbers = ""
-            if member_data and member_data.get('group_emergency_contacts'):
-                contacts = member_data['group_emergency_contacts']
-                emergency_numbers = f"""
-
-🚑 SAMU: {contacts.get('samu', '131')}
-🚒 BOMBEROS: {contacts.get('bomberos', '132')}
-👮 CARABINEROS: {contacts.get('carabineros', '133')}"""
-                
-                if contacts.get('group_emergency_contact'):
-                    emergency_numbers += f"\n📞 COORDINADOR GRUPO: {contacts['group_emergency_contact']}"
-            else:
-                emergency_numbers = f"""
-
-🚑 SAMU: 131
-🚒 BOMBEROS: 132
-👮 CARABINEROS: 133"""
+            try:
+                # AI-enhanced message with member data, generated in the background
+                text_summary = await msg_task
+                logger.info(f"✅ AI-generated emergency message created")
+            except Exception as ai_error:
+                logger.warning(f"⚠️ AI message generation failed: {str(ai_error)}")
+                logger.info(f"📝 Using fallback template message...")
             
-            text_summary = f"""🚨 EMERGENCIA ACTIVADA 🚨
-
-📋 TIPO: {incident_type}
-📍 UBICACIÓN: {street_address}
-👤 REPORTADO POR: {sender_name}
-📞 CONTACTO: {sender_phone}{medical_info}{evacuation_info}{emergency_contact}{emergency_numbers}
-
-⏰ HORA: {datetime.now().strftime('%H:%M:%S')}
-📅 FECHA: {datetime.now().strftime('%d/%m/%Y')}
-
-⚠️ MANTÉNGANSE SEGUROS
-📢 SIGAN INSTRUCCIONES OFICIALES"""
+                # Fallback to template message with member data if available
+                text_summary = _build_fallback_summary(ctx, member, started_at)
         
-        print(f"📤 Enviando resumen de texto al grupo...")
-        text_success = await whatsapp_service.send_text_message(group_chat_id, text_summary)
+            logger.info(f"📤 Enviando resumen de texto al grupo...")
+            text_success = await whatsapp_service.send_text_message(ctx.group_chat_id, text_summary)
         
-        if text_success:
-            print(f"✅ Resumen de texto enviado al grupo")
-            success_steps.append("Text Summary")
-        else:
-            raise Exception("Falló el envío del resumen de texto")
+            if text_success:
+                logger.info(f"✅ Resumen de texto enviado al grupo")
+                _record_step("Text Summary", True, t0)
+            else:
+                raise Exception("Falló el envío del resumen de texto")
             
-    except Exception as e:
-        print(f"❌ Error enviando resumen de texto: {str(e)}")
-        failed_steps.append("Text Summary")
-    
-    await asyncio.sleep(2)
-    
-    # === STEP 3: EMERGENCY ALERT IMAGE ===
-    print(f"\n📷 PASO 3: IMAGEN DE ALERTA DE EMERGENCIA")
+        except Exception as e:
+            logger.error(f"❌ Error enviando resumen de texto: {str(e)}")
+            _record_step("Text Summary", False, t0)
+
+    async def _image_step():
+        logger.info(f"\n📷 PASO 3: IMAGEN DE ALERTA DE EMERGENCIA")
+        t0 = time.perf_counter_ns()
     
-    try:
-        # Generate dynamic emergency alert image with placeholder data
-        from create_emergency_alert_final import create_emergency_alert
-        
-        print(f"🖼️ Generating emergency alert image with dynamic data...")
-        print(f"📊 Parameters: incident_type='{incident_type}', sender_name='{sender_name}', sender_phone='{sender_phone}'")
+        try:
+            # WhatsApp is rejecting our credentials: the image can't be delivered
+            if whatsapp_circuit.is_open:
+                if render_future is not None:
+                    render_future.cancel()
+                raise Exception("WhatsApp no disponible (circuito abierto)")
+            if render_future is None or ImageService is None:
+                raise Exception("Generación de imagen no disponible")
         
-        # Create emergency alert with member data if available
-        image_path = create_emergency_alert(
-            street_address=street_address,
-            phone_number=sender_phone,
-            contact_name=sender_name,
-            incident_type=incident_type,
-            chat_group_name=group_name,
-            alert_title="EMERGENCIA",
-            emergency_number=emergency_number,
-            show_night_sky=True,
-            show_background_city=True,
-            member_data=member_data  # Pass member data for enhanced content
-        )
+            # Rendered in the background while the text summary went out
+            image_bytes = await render_future
+            if not image_bytes:
+                raise Exception("No se pudo generar la imagen de emergencia")
+            image_buffer = io.BytesIO(image_bytes)
         
-        print(f"🖼️ Generated image path: {image_path}")
+            logger.info(f"✅ Emergency alert image generated in memory ({image_buffer.getbuffer().nbytes} bytes)")
         
-        if os.path.exists(image_path):
-            print(f"✅ Emergency alert image generated: {image_path}")
-            
             # Process image for WhatsApp
-            from app.services.image_service import ImageService
-            image_service = ImageService()
+            image_service = _get_image_service()
+        
+            logger.info(f"🔄 Processing image for WhatsApp...")
+            # PIL decode/resize is CPU work too: keep it off the event loop
+            processed_image = await asyncio.to_thread(image_service.process_image_for_whatsapp_bytes, image_buffer, convert_to_webp=False)
+        
+            if processed_image:
+                logger.info(f"📤 Sending emergency alert image...")
+                image_caption = f"🚨 EMERGENCIA: {ctx.incident_type} - {ctx.street_address}"
+                image_data = processed_image.getvalue()
             
-            print(f"🔄 Processing image for WhatsApp...")
-            processed_image = image_service.process_image_for_whatsapp(image_path, convert_to_webp=True)
+                # Base64 / n8n-style / multipart, starting with the last method that worked
+                image_success = await whatsapp_service.send_image_message_from_bytes_with_fallback(
+                    ctx.group_chat_id, image_data, image_caption, mime_type="image/webp", filename="emergency_alert.webp"
+                )
             
-            if processed_image:
-                print(f"📤 Sending emergency alert image...")
-                image_caption = f"🚨 EMERGENCIA: {incident_type} - {street_address}"
-                
-                # Try multiple image sending methods
-                print(f"📤 Trying image sending methods...")
-                
-                # Method 1: Base64 JSON (most reliable)
-                image_success = await whatsapp_service.send_image_message(group_chat_id, processed_image, image_caption)
-                
-                if not image_success:
-                    print(f"📤 Base64 failed, trying n8n style...")
-                    image_success = await whatsapp_service.send_image_message_n8n_style(group_chat_id, processed_image, image_caption)
-                
-                if not image_success:
-                    print(f"📤 n8n style failed, trying multipart...")
-                    image_success = await whatsapp_service.send_image_message_via_media_endpoint(group_chat_id, processed_image, image_caption)
-                
-                # Cleanup processed image if different from original
-                if processed_image != image_path:
-                    image_service.cleanup_image_file(processed_image)
-                
-                # Cleanup original generated image
-                if os.path.exists(image_path):
-                    os.remove(image_path)
-                    print(f"🧹 Cleaned up generated image: {image_path}")
-                
                 if image_success:
-                    print(f"✅ Imagen de emergencia enviada al grupo")
-                    success_steps.append("Emergency Alert Image")
+                    logger.info(f"✅ Imagen de emergencia enviada al grupo")
+                    _record_step("Emergency Alert Image", True, t0)
                 else:
                     raise Exception("Falló el envío de la imagen de emergencia")
             else:
                 raise Exception("No se pudo procesar la imagen")
-        else:
-            raise Exception("No se pudo generar la imagen de emergencia")
             
-    except Exception as e:
-        print(f"❌ Error enviando imagen de emergencia: {str(e)}")
-        print(f"⚠️ Continuando sin imagen...")
-        failed_steps.append("Emergency Alert Image")
-    
-    await asyncio.sleep(2)
-    
-    # === STEP 4: VOICE MESSAGE (SLOWER) ===
-    print(f"\n🎤 PASO 4: MENSAJE DE VOZ")
+        except Exception as e:
+            logger.error(f"❌ Error enviando imagen de emergencia: {str(e)}")
+            logger.warning(f"⚠️ Continuando sin imagen...")
+            _record_step("Emergency Alert Image", False, t0)
+
+    async def _voice_step():
+        logger.info(f"\n🎤 PASO 4: MENSAJE DE VOZ")
+        t0 = time.perf_counter_ns()
     
-    try:
-        # Try to import voice service
-        from app.services.voice_service import VoiceService
-        voice_service = VoiceService()
-        
-        if voice_text is None:
-            # Generate intelligent voice message
-            try:
-                print(f"🤖 Generating intelligent voice message with OpenAI...")
-                voice_text = await generate_intelligent_voice_message(
-                    incident_type=incident_type,
-                    street_address=street_address,
-                    sender_name=sender_name,
-                    emergency_number=emergency_number
-                )
-                print(f"✅ AI-generated voice message created")
-            except Exception as ai_error:
-                print(f"⚠️ AI voice generation failed: {str(ai_error)}")
-                print(f"📝 Using fallback voice message...")
-                voice_text = f"Alerta de emergencia. {incident_type} reportada en {street_address}. Contacto de emergencia: {emergency_number}. Reportado por {sender_name}. Por favor, manténganse seguros y sigan las instrucciones de las autoridades."
-        
-        print(f"🎙️ Generando mensaje de voz...")
-        
-        # Generate voice file
-        voice_file = await voice_service.generate_voice_message(voice_text, voice="nova")
-        if not voice_file:
-            raise Exception("No se pudo generar el archivo de voz")
-        
-        print(f"✅ Archivo de voz creado: {voice_file}")
+        try:
+            if whatsapp_circuit.is_open:
+                # Don't wait for TTS that can't be delivered; nothing resends
+                # voice messages later, so a generated file is deleted too (also
+                # when TTS finishes despite the cancel)
+                voice_task.add_done_callback(_discard_voice_file)
+                voice_task.cancel()
+                raise Exception("WhatsApp no disponible (circuito abierto)")
         
-        # Send voice message to group
-        print(f"📤 Enviando mensaje de voz al grupo...")
-        voice_success = await whatsapp_service.send_voice_message(group_chat_id, voice_file)
+            # Voice text + TTS were generated in the background during steps 1-3
+            voice_file = await voice_task
         
-        # Cleanup
-        voice_service.cleanup_audio_file(voice_file)
+            # The temp audio file is removed even if sending raises
+            with _temp_artifact(voice_file):
+                # Send voice message to group
+                logger.info(f"📤 Enviando mensaje de voz al grupo...")
+                voice_success = await whatsapp_service.send_voice_message(ctx.group_chat_id, voice_file)
         
-        if voice_success:
-            print(f"✅ Mensaje de voz enviado al grupo")
-            success_steps.append("Voice Message")
-        else:
-            raise Exception("Falló el envío del mensaje de voz")
+            if voice_success:
+                logger.info(f"✅ Mensaje de voz enviado al grupo")
+                _record_step("Voice Message", True, t0)
+            else:
+                raise Exception("Falló el envío del mensaje de voz")
             
-    except Exception as e:
-        print(f"❌ Error enviando mensaje de voz: {str(e)}")
-        print(f"⚠️ Continuando sin mensaje de voz...")
-        failed_steps.append("Voice Message")
+        except Exception as e:
+            logger.error(f"❌ Error enviando mensaje de voz: {str(e)}")
+            logger.warning(f"⚠️ Continuando sin mensaje de voz...")
+            _record_step("Voice Message", False, t0)
+
+    # === STEP 2: TEXT SUMMARY (FAST) while the device is still blinking ===
+    await _text_summary_step()
+    
+    # === STEP 3: EMERGENCY ALERT IMAGE + STEP 4: VOICE MESSAGE ===
+    # Independent I/O-bound steps: wall time is the slowest step, not the sum
+    results = await asyncio.gather(blink_task, _image_step(), _voice_step(), return_exceptions=True)
+    for result in results:
+        if isinstance(result, Exception):
+            logger.error(f"❌ Error inesperado en paso del pipeline: {str(result)}")
     
     # GIF step removed - emergency pipeline now ends with voice message
     # === AUDIT LOGGING ===
     try:
-        from app.services.audit_service import AuditService
-        audit_service = AuditService()
+        if AuditService is None:
+            raise Exception("Servicio de auditoría no disponible")
+        audit_service = _get_audit_service()
         
-        await audit_service.log_emergency_event(
-            incident_type=incident_type,
-            group_chat_id=group_chat_id,
-            group_name=group_name,
-            reporter_phone=sender_phone,
-            reporter_name=sender_name,
+        # Fire-and-forget: the audit write is non-fatal, so it shouldn't hold
+        # up the summary or the caller's result
+        audit_task = asyncio.create_task(audit_service.log_emergency_event(
+            incident_type=ctx.incident_type,
+            group_chat_id=ctx.group_chat_id,
+            group_name=ctx.group_name,
+            reporter_phone=ctx.sender_phone,
+            reporter_name=ctx.sender_name,
             actions_taken=success_steps,
             success_rate=(len(success_steps) / (len(success_steps) + len(failed_steps))) * 100 if (len(success_steps) + len(failed_steps)) > 0 else 0,
-            member_data_used=use_member_data and member_data is not None,
+            member_data_used=ctx.use_member_data and member is not None,
             additional_info={
                 "failed_steps": failed_steps,
-                "device_id": device_id,
-                "blink_cycles": blink_cycles
+                "device_id": ctx.device_id,
+                "blink_cycles": ctx.blink_cycles
             }
-        )
-        print(f"✅ Emergency event logged to audit system")
+        ))
+        _pending_audits.add(audit_task)
+        audit_task.add_done_callback(_on_audit_done)
+        logger.info(f"📝 Emergency event queued for audit system")
     except Exception as e:
-        print(f"⚠️ Could not log emergency event to audit: {str(e)}")
+        logger.warning(f"⚠️ Could not log emergency event to audit: {str(e)}")
     
     # === PIPELINE SUMMARY ===
-    print(f"\n🏆" + "="*80)
-    print(f"🏆 RESUMEN DEL PIPELINE DE EMERGENCIA")
-    print(f"🏆" + "="*80)
+    logger.info(_SUMMARY_HEADER)
     
-    total_steps = len(success_steps) + len(failed_steps)
-    success_rate = (len(success_steps) / total_steps) * 100 if total_steps > 0 else 0
+    total_steps: int = len(success_steps) + len(failed_steps)
+    success_rate: float = (len(success_steps) / total_steps) * 100 if total_steps > 0 else 0
     
-    print(f"\n📊 ESTADÍSTICAS:")
-    print(f"   ✅ Pasos exitosos: {len(success_steps)}")
-    print(f"   ❌ Pasos fallidos: {len(failed_steps)}")
-    print(f"   📈 Tasa de éxito: {success_rate:.1f}%")
+    logger.info(f"\n📊 ESTADÍSTICAS:")
+    logger.info(f"   ✅ Pasos exitosos: {len(success_steps)}")
+    logger.info(f"   ❌ Pasos fallidos: {len(failed_steps)}")
+    logger.info(f"   📈 Tasa de éxito: {success_rate:.1f}%")
     
     if success_steps:
-        print(f"\n✅ PASOS COMPLETADOS:")
+        logger.info(f"\n✅ PASOS COMPLETADOS:")
         for step in success_steps:
-            print(f"   ✓ {step}")
+            logger.info(f"   ✓ {step} ({step_results[step]['ns'] / 1e6:.0f} ms)")
     
     if failed_steps:
-        print(f"\n❌ PASOS FALLIDOS:")
+        logger.info(f"\n❌ PASOS FALLIDOS:")
         for step in failed_steps:
-            print(f"   ✗ {step}")
+            logger.info(f"   ✗ {step} ({step_results[step]['ns'] / 1e6:.0f} ms)")
     
-    print(f"\n🎯 DESTINATARIO: {group_name} ({group_chat_id})")
-    print(f"👤 REPORTADO POR: {sender_name} ({sender_phone})")
-    print(f"🚨 TIPO: {incident_type}")
-    print(f"📍 UBICACIÓN: {street_address}")
+    logger.info(f"\n🎯 DESTINATARIO: {ctx.group_name} ({ctx.group_chat_id})")
+    logger.info(f"👤 REPORTADO POR: {ctx.sender_name} ({ctx.sender_phone})")
+    logger.info(f"🚨 TIPO: {ctx.incident_type}")
+    logger.info(f"📍 UBICACIÓN: {ctx.street_address}")
     
     # Overall success if at least 3 out of 4 steps completed (GIF removed)
-    overall_success = len(success_steps) >= 3
+    overall_success: bool = len(success_steps) >= 3
     
     if overall_success:
-        print(f"\n🏆 PIPELINE COMPLETADO EXITOSAMENTE")
-        print(f"🚨 Sistema de emergencia activado correctamente")
+        logger.info(f"\n🏆 PIPELINE COMPLETADO EXITOSAMENTE")
+        logger.info(f"🚨 Sistema de emergencia activado correctamente")
     else:
-        print(f"\n⚠️ PIPELINE COMPLETADO CON LIMITACIONES")
-        print(f"🚨 Algunos componentes fallaron - revisar logs")
+        logger.info(f"\n⚠️ PIPELINE COMPLETADO CON LIMITACIONES")
+        logger.info(f"🚨 Algunos componentes fallaron - revisar logs")
     
-    return overall_success
+    total_ns: int = time.perf_counter_ns() - pipeline_t0
+    logger.info(f"⏱️ TIEMPO TOTAL: {total_ns / 1e6:.0f} ms")
+    # Structured record for metrics ingestion (step latencies in ns)
+    logger.info("pipeline_complete", extra={
+        'pipeline_success': overall_success,
+        'pipeline_steps': step_results,
+        'pipeline_total_ns': total_ns,
+    })
+    
+    return PipelineResult(overall_success, step_results, total_ns)
 
-async def generate_intelligent_emergency_message(
+def _emergency_details_prompt(
     incident_type: str,
     street_address: str,
     sender_name: str,
     sender_phone: str,
     emergency_number: str,
     group_name: str,
-    member_data: dict = None
+    member: Optional[MemberView] = None,
+    current_time: Optional[datetime] = None
 ) -> str:
-    """
-    Generate intelligent, context-aware emergency message using OpenAI
-    """
-    
-    # Get OpenAI API key
-    openai_api_key = os.getenv("OPENAI_API_KEY")
-    if not openai_api_key:
-        raise Exception("OpenAI API key not configured")
-    
-    # Create intelligent prompt based on incident type
-    current_time = datetime.now()
+    """Emergency details block shared by the OpenAI user prompts"""
+    if current_time is None:
+        current_time = datetime.now()
     
     # Add member data to prompt if available
     member_info = ""
-    if member_data:
-        contacts = member_data.get('group_emergency_contacts', {})
+    if member is not None:
         member_info = f"""
 MEMBER DATABASE INFO:
-- Full Name: {member_data.get('name', 'N/A')}
-- Complete Address: {member_data.get('full_address', 'N/A')}
-- Emergency Contact: {member_data.get('emergency_contact', 'N/A')}
-- Medical Info: {member_data.get('medical_info', 'N/A')}
-- Blood Type: {member_data.get('blood_type', 'N/A')}
-- Medical Conditions: {', '.join(member_data.get('medical_conditions', []))}
-- Allergies: {', '.join(member_data.get('allergies', []))}
-- Evacuation Assistance Needed: {member_data.get('evacuation_assistance', False)}
-- Special Needs: {', '.join(member_data.get('special_needs', []))}
-- Is High Priority: {member_data.get('is_high_priority', False)}
-- Total Group Members: {member_data.get('total_members', 'Unknown')}
+- Full Name: {member.name or 'N/A'}
+- Complete Address: {member.full_address or 'N/A'}
+- Emergency Contact: {member.emergency_contact}
+- Medical Info: {member.medical_info or 'N/A'}
+- Blood Type: {member.blood_type or 'N/A'}
+- Medical Conditions: {', '.join(member.medical_conditions)}
+- Allergies: {', '.join(member.allergies)}
+- Evacuation Assistance Needed: {member.evacuation}
+- Special Needs: {', '.join(member.special_needs)}
+- Is High Priority: {member.is_high_priority}
+- Total Group Members: {member.total_members}
 
 GROUP EMERGENCY CONTACTS:
-- SAMU: {contacts.get('samu', '131')}
-- BOMBEROS: {contacts.get('bomberos', '132')}
-- CARABINEROS: {contacts.get('carabineros', '133')}
-- Group Emergency Contact: {contacts.get('group_emergency_contact', 'Not configured')}
-- Emergency Coordinator: {contacts.get('emergency_coordinator', 'Not configured')}"""
+- SAMU: {member.samu}
+- BOMBEROS: {member.bomberos}
+- CARABINEROS: {member.carabineros}
+- Group Emergency Contact: {member.group_contact or 'Not configured'}
+- Emergency Coordinator: {member.coordinator or 'Not configured'}"""
     
-    prompt = f"""You are an emergency response system AI for a community alert network in Chile. Generate a professional, urgent, and helpful emergency alert message in Spanish.
-
-EMERGENCY DETAILS:
+    return f"""EMERGENCY DETAILS:
 - Incident Type: {incident_type}
 - Location: {street_address}  
 - Reported by: {sender_name}
 - Contact: {sender_phone}
 - Emergency Services: {emergency_number}
 - Community Group: {group_name}
-- Time: {current_time.strftime('%H:%M:%S')}
-- Date: {current_time.strftime('%d/%m/%Y')}{member_info}
-
-REQUIREMENTS:
-1. Start with 🚨 EMERGENCIA ACTIVADA 🚨
-2. Use appropriate emojis for the incident type
-3. Include specific safety instructions based on the emergency type
-4. Keep it under 350 words
-5. Use urgent but professional tone
-6. Include all provided details
-7. End with community safety reminder
-8. Format for WhatsApp readability
-9. If member has medical conditions or special needs, highlight this prominently
-10. If evacuation assistance is needed, emphasize this critically
+- Time: {current_time:%H:%M:%S}
+- Date: {current_time:%d/%m/%Y}{member_info}"""
 
-INCIDENT-SPECIFIC INSTRUCTIONS:
-- INCENDIO: Fire safety, evacuation routes, smoke precautions
-- EMERGENCIA MÉDICA: Medical emergency protocols, space for ambulances, mention medical history if available
-- ACCIDENTE: Traffic safety, avoid area, help emergency services
-- TERREMOTO: Earthquake safety, aftershock warnings, safe areas
-- EMERGENCIA GENERAL: General emergency protocols
-
-SPECIAL INSTRUCTIONS:
-- If member has medical conditions, include "🩺 ATENCIÓN MÉDICA: [conditions]"
-- If evacuation assistance needed, include "🚨 REQUIERE ASISTENCIA PARA EVACUACIÓN"  
-- If high priority member, emphasize urgency
-- Include emergency contact if available and different from reporter
-- ALWAYS include all emergency services: SAMU, BOMBEROS, CARABINEROS with their numbers
-- Include group emergency contact and coordinator if configured
-- Format emergency numbers clearly with emojis (🚑 🚒 👮 📞)
-
-Generate the complete message now:"""
+async def generate_intelligent_emergency_message(
+    incident_type: str,
+    street_address: str,
+    sender_name: str,
+    sender_phone: str,
+    emergency_number: str,
+    group_name: str,
+    member: Optional[MemberView] = None,
+    current_time: Optional[datetime] = None
+) -> str:
+    """
+    Generate intelligent, context-aware emergency message using OpenAI
+    Repeat alerts with the same inputs within _MSG_CACHE_TTL reuse the cached message
+    """
+    
+    cache_key = (
+        incident_type, street_address, sender_name, sender_phone, emergency_number, group_name,
+        member.name if member else None
+    )
+    cached_message = _cache_get(_text_msg_cache, cache_key)
+    if cached_message is not None:
+        logger.info(f"♻️ Reusing cached emergency message ({len(cached_message)} characters)")
+        return cached_message
+    
+    # Get OpenAI API key
+    openai_api_key = os.getenv("OPENAI_API_KEY")
+    if not openai_api_key:
+        raise Exception("OpenAI API key not configured")
+    
+    prompt = _emergency_details_prompt(
+        incident_type, street_address, sender_name, sender_phone, emergency_number, group_name, member,
+        current_time
+    ) + "\n\nGenerate the complete message now:"
 
     try:
-        async with aiohttp.ClientSession() as session:
-            headers = {
-                "Authorization": f"Bearer {openai_api_key}",
-                "Content-Type": "application/json"
-            }
-            
-            payload = {
-                "model": "gpt-4o-mini",
-                "messages": [
-                    {
-                        "role": "system", 
-                        "content": "You are a professional emergency response AI assistant for community safety alerts in Chile. Generate urgent, helpful, and appropriately formatted emergency messages in Spanish."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                "max_tokens": 500,
-                "temperature": 0.3  # Lower temperature for consistency and professionalism
-            }
-            
-            async with session.post(
-                "https://api.openai.com/v1/chat/completions", 
-                headers=headers, 
-                json=payload,
-                timeout=10
-            ) as response:
-                if response.status == 200:
-                    result = await response.json()
-                    message = result['choices'][0]['message']['content'].strip()
-                    print(f"🤖 OpenAI generated {len(message)} character emergency message")
-                    return message
-                else:
-                    error_text = await response.text()
-                    raise Exception(f"OpenAI API error {response.status}: {error_text}")
-                    
+        headers = {
+            "Authorization": f"Bearer {openai_api_key}",
+            "Content-Type": "application/json"
+        }
+        
+        payload = {
+            "model": "gpt-4o-mini",
+            "messages": [
+                {
+                    "role": "system", 
+                    "content": _TEXT_SYSTEM_PROMPT
+                },
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            "max_tokens": 500,
+            "temperature": 0.3  # Lower temperature for consistency and professionalism
+        }
+        
+        result = await _post_openai_chat(headers, payload)
+        message = result['choices'][0]['message']['content'].strip()
+        logger.info(f"🤖 OpenAI generated {len(message)} character emergency message")
+        _cache_put(_text_msg_cache, cache_key, message)
+        return message
+                
     except Exception as e:
-        print(f"❌ OpenAI message generation error: {str(e)}")
+        logger.error(f"❌ OpenAI message generation error: {str(e)}")
         raise e
 
-async def generate_intelligent_voice_message(
+async def generate_intelligent_emergency_bundle(
     incident_type: str,
     street_address: str,
     sender_name: str,
-    emergency_number: str
-) -> str:
+    sender_phone: str,
+    emergency_number: str,
+    group_name: str,
+    member: Optional[MemberView] = None,
+    current_time: Optional[datetime] = None,
+    on_text: Optional[Callable[[str], None]] = None
+) -> dict[str, str]:
     """
-    Generate intelligent voice message for TTS using OpenAI
+    Generate the WhatsApp text message and the TTS voice message in one OpenAI call
+    The reply is streamed and on_text is called as soon as the text part is
+    complete, so the text summary doesn't wait for the voice script.
+    Returns {"text_message": ..., "voice_message": ...}; repeat alerts with the
+    same inputs within _MSG_CACHE_TTL reuse the cached pair
     """
     
+    cache_key = (
+        incident_type, street_address, sender_name, sender_phone, emergency_number, group_name,
+        member.name if member else None
+    )
+    cached_bundle = _cache_get(_bundle_cache, cache_key)
+    if cached_bundle is not None:
+        logger.info(f"♻️ Reusing cached emergency text and voice messages")
+        if on_text is not None:
+            on_text(cached_bundle["text_message"])
+        return cached_bundle
+    
     # Get OpenAI API key
     openai_api_key = os.getenv("OPENAI_API_KEY")
     if not openai_api_key:
         raise Exception("OpenAI API key not configured")
     
-    prompt = f"""Generate a clear, urgent voice message in Spanish for emergency text-to-speech audio broadcast. This will be spoken aloud to the community.
-
-EMERGENCY DETAILS:
-- Incident Type: {incident_type}
-- Location: {street_address}
-- Reported by: {sender_name}
-- Emergency Contact: {emergency_number}
-
-VOICE MESSAGE REQUIREMENTS:
-1. Clear, calm but urgent tone suitable for TTS
-2. 30-60 seconds when spoken (around 100-200 words)
-3. Include specific safety instructions for the incident type
-4. Easy to understand when spoken aloud
-5. Include emergency contact number clearly
-6. End with safety reminder
-7. Use simple, clear Spanish suitable for audio
-
-INCIDENT-SPECIFIC VOICE INSTRUCTIONS:
-- INCENDIO: Clear evacuation instructions, avoid smoke
-- EMERGENCIA MÉDICA: Make space for ambulances, CPR if needed
-- ACCIDENTE: Traffic warnings, alternative routes
-- TERREMOTO: Drop-cover-hold, aftershock warnings
-- EMERGENCIA GENERAL: General safety protocols
-
-Generate ONLY the voice message text (no formatting, no emojis):"""
+    prompt = _emergency_details_prompt(
+        incident_type, street_address, sender_name, sender_phone, emergency_number, group_name, member,
+        current_time
+    ) + f"\n\nGenerate the text message, the {_BUNDLE_SEPARATOR} line and the voice message now:"
 
     try:
-        async with aiohttp.ClientSession() as session:
-            headers = {
-                "Authorization": f"Bearer {openai_api_key}",
-                "Content-Type": "application/json"
-            }
-            
-            payload = {
-                "model": "gpt-4o-mini",
-                "messages": [
-                    {
-                        "role": "system", 
-                        "content": "You are a professional emergency voice system. Generate clear, urgent voice messages in Spanish for text-to-speech emergency broadcasts."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                "max_tokens": 300,
-                "temperature": 0.2  # Very low temperature for consistency in emergency situations
-            }
-            
-            async with session.post(
-                "https://api.openai.com/v1/chat/completions", 
-                headers=headers, 
-                json=payload,
-                timeout=10
-            ) as response:
-                if response.status == 200:
-                    result = await response.json()
-                    voice_message = result['choices'][0]['message']['content'].strip()
-                    print(f"🤖 OpenAI generated {len(voice_message)} character voice message")
-                    return voice_message
-                else:
-                    error_text = await response.text()
-                    raise Exception(f"OpenAI API error {response.status}: {error_text}")
-                    
+        headers = {
+            "Authorization": f"Bearer {openai_api_key}",
+            "Content-Type": "application/json"
+        }
+        
+        payload = {
+            "model": "gpt-4o-mini",
+            "messages": [
+                {
+                    "role": "system", 
+                    "content": _BUNDLE_SYSTEM_PROMPT
+                },
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            "max_tokens": 800,  # Text (500) + voice (300) budgets
+            "temperature": 0.3
+        }
+        
+        # Only the new delta plus the end of what came before can complete the
+        # separator, so the reply is joined once when it shows up, not per delta
+        chunks: list[str] = []
+        tail = ""
+        text_message: Optional[str] = None
+        async for delta in _stream_openai_chat(headers, payload):
+            chunks.append(delta)
+            if text_message is not None:
+                continue
+            window = tail + delta
+            if _BUNDLE_SEPARATOR not in window:
+                tail = window[-(len(_BUNDLE_SEPARATOR) - 1):]
+                continue
+            text_part, voice_part = "".join(chunks).split(_BUNDLE_SEPARATOR, 1)
+            chunks = [voice_part]
+            text_message = text_part.strip()
+            logger.info(f"🤖 OpenAI generated {len(text_message)} character emergency message")
+            if on_text is not None:
+                on_text(text_message)
+        
+        if text_message is None:
+            raise Exception("OpenAI reply is missing the voice message section")
+        voice_message = "".join(chunks).strip()
+        if not voice_message:
+            raise Exception("OpenAI reply has an empty voice message")
+        logger.info(f"🤖 OpenAI generated {len(voice_message)} character voice message")
+        
+        bundle = {"text_message": text_message, "voice_message": voice_message}
+        _cache_put(_bundle_cache, cache_key, bundle)
+        return bundle
+                
     except Exception as e:
-        print(f"❌ OpenAI voice generation error: {str(e)}")
+        logger.error(f"❌ OpenAI message generation error: {str(e)}")
         raise e
 
 if __name__ == "__main__":
     print("🚨 Emergency Pipeline - Basic Version")
-    result = asyncio.run(execute_full_emergency_pipeline(
+    result = asyncio.run(execute_full_emergency_pipeline(EmergencyContext(
         incident_type="EMERGENCIA GENERAL",
         sender_name="Test User",
         sender_phone="123456789"
-    ))
+    )))
     print(f"Result: {result}")
\ No newline at end of file
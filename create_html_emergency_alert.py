@@ -6,33 +6,87 @@ then convert to image for WhatsApp sending
 
 import os
 import asyncio
+import base64
+import functools
+import hashlib
+import io
+import math
+import string
+import sys
+import tempfile
+from collections import OrderedDict
 from datetime import datetime
-from playwright.async_api import async_playwright
+from typing import Dict, List, Optional, Tuple
+from playwright.async_api import async_playwright, Browser, BrowserContext, Page, Playwright
 
-def create_emergency_alert_html(street_address: str, phone_number: str, contact_name: str = "Vecino", incident_type: str = "ALERTA GENERAL"):
-    """
-    Generate HTML template for emergency alert with perfect CSS layout
-    """
-    
-    timestamp = datetime.now().strftime("%H:%M hrs • %d/%m/%Y")
-    
-    html_template = f"""
-<!DOCTYPE html>
-<html lang="es">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Alerta de Emergencia</title>
-    <style>
-        @import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;600;700;800;900&display=swap');
-        
-        * {{
+try:
+    from PIL import Image, ImageDraw, ImageFont
+except ImportError:
+    Image = ImageDraw = ImageFont = None
+
+try:
+    import imgkit  # wkhtmltoimage wrapper, optional HTML renderer without a browser
+except ImportError:
+    imgkit = None
+
+# One Chromium instance serves every alert: launching a browser per alert costs
+# far more than the screenshot itself. Each render checks out a pre-created
+# BrowserContext from the pool and returns it afterwards; contexts are replaced
+# after _CONTEXT_MAX_USES renders so per-context state can't pile up
+_CONTEXT_POOL_SIZE = 4
+_CONTEXT_MAX_USES = 50
+# Chromium frees a closed context's memory lazily, so in a long-running bot the
+# whole browser is also relaunched every _BROWSER_MAX_RENDERS renders to keep
+# its memory bounded
+_BROWSER_MAX_RENDERS = 200
+# Headless Chromium on macOS is a hidden headful window, so WebKit renders this
+# static card faster there; Linux keeps Chromium. ALERT_BROWSER overrides
+_BROWSER_ENGINE = os.getenv("ALERT_BROWSER", "webkit" if sys.platform == "darwin" else "chromium").lower()
+# The card is static trusted markup: no GPU raster, sandbox, extensions or
+# background services are needed
+_CHROMIUM_ARGS = [
+    '--disable-gpu',
+    '--no-sandbox',
+    '--disable-setuid-sandbox',
+    '--disable-dev-shm-usage',
+    '--disable-extensions',
+    '--disable-background-networking',
+    '--disable-default-apps',
+    '--disable-sync',
+    '--no-first-run',
+    '--disable-features=Translate,site-per-process',
+    '--font-render-hinting=none',
+]
+# The card is a fixed 600px wide (plus the 20px body padding), so the viewport
+# is sized to it and only the card's own box is captured
+_VIEWPORT = {'width': 640, 'height': 900}
+_CARD_SELECTOR = '.alert-container'
+# Cards are captured as PNG (Chromium's cheapest encode) and turned into an
+# optimized JPEG by Pillow off the event loop; every saved card uses this quality
+_JPEG_QUALITY = 80
+
+_playwright: Optional[Playwright] = None
+_browser: Optional[Browser] = None
+_context_pool: Optional["asyncio.Queue[Tuple[BrowserContext, Page, int]]"] = None
+_pool_members = 0  # Contexts of the current browser, idle or checked out
+_render_count = 0  # Renders on the current browser
+_browser_lock = asyncio.Lock()
+
+# Each pooled context keeps one page with the card shell already loaded; an
+# alert only rewrites the five text fields (ids in the template) in place
+_PATCH_FIELDS_JS = "(fields) => { for (const [id, text] of Object.entries(fields)) document.getElementById(id).textContent = text; }"
+
+# Stylesheet and card markup are kept apart so the pooled pages can load the
+# CSS once (add_style_tag) under a bare card skeleton; _HTML_TEMPLATE joins
+# them into the standalone page used for one-off renders
+_STATIC_CSS = """
+        * {
             margin: 0;
             padding: 0;
             box-sizing: border-box;
-        }}
+        }
         
-        body {{
+        body {
             font-family: 'Inter', -apple-system, BlinkMacSystemFont, 'Segoe UI', sans-serif;
             background: linear-gradient(135deg, #7f1d1d 0%, #dc2626 25%, #ef4444 50%, #dc2626 75%, #991b1b 100%);
             min-height: 100vh;
@@ -40,9 +94,9 @@ def create_emergency_alert_html(street_address: str, phone_number: str, contact_
             align-items: center;
             justify-content: center;
             padding: 20px;
-        }}
+        }
         
-        .alert-container {{
+        .alert-container {
             width: 600px;
             background: linear-gradient(145deg, #7f1d1d 0%, #dc2626 30%, #ef4444 60%, #dc2626 90%, #991b1b 100%);
             border: 6px solid #ffffff;
@@ -50,9 +104,9 @@ def create_emergency_alert_html(street_address: str, phone_number: str, contact_
             box-shadow: 0 20px 60px rgba(0, 0, 0, 0.4);
             overflow: hidden;
             position: relative;
-        }}
+        }
         
-        .alert-container::before {{
+        .alert-container::before {
             content: '';
             position: absolute;
             top: 6px;
@@ -62,15 +116,15 @@ def create_emergency_alert_html(street_address: str, phone_number: str, contact_
             border: 2px solid #ffd700;
             border-radius: 14px;
             pointer-events: none;
-        }}
+        }
         
-        .header-section {{
+        .header-section {
             text-align: center;
             padding: 40px 30px 30px;
             position: relative;
-        }}
+        }
         
-        .warning-badge {{
+        .warning-badge {
             width: 80px;
             height: 80px;
             background: #ffd700;
@@ -81,113 +135,113 @@ def create_emergency_alert_html(street_address: str, phone_number: str, contact_
             justify-content: center;
             margin: 0 auto 30px;
             box-shadow: 0 8px 20px rgba(0, 0, 0, 0.3);
-        }}
+        }
         
-        .warning-badge::before {{
+        .warning-badge::before {
             content: '!';
             font-size: 36px;
             font-weight: 900;
             color: #000000;
-        }}
+        }
         
-        .main-title {{
+        .main-title {
             font-size: 48px;
             font-weight: 900;
             color: #ffffff;
             margin-bottom: 20px;
             text-shadow: 3px 3px 6px rgba(0, 0, 0, 0.7);
             letter-spacing: 2px;
-        }}
+        }
         
-        .incident-badge {{
+        .incident-badge {
             background: #dc2626;
             border: 3px solid #ffd700;
             border-radius: 25px;
             padding: 15px 30px;
             margin: 0 auto 25px;
             display: inline-block;
-        }}
+        }
         
-        .incident-type {{
+        .incident-type {
             font-size: 28px;
             font-weight: 700;
             color: #ffffff;
             text-shadow: 2px 2px 4px rgba(0, 0, 0, 0.8);
-        }}
+        }
         
-        .system-title {{
+        .system-title {
             font-size: 32px;
             font-weight: 700;
             color: #ffd700;
             margin-bottom: 20px;
             text-shadow: 2px 2px 4px rgba(0, 0, 0, 0.6);
-        }}
+        }
         
-        .status-badge {{
+        .status-badge {
             background: #16a34a;
             border: 3px solid #ffffff;
             border-radius: 20px;
             padding: 12px 40px;
             display: inline-block;
             margin-bottom: 30px;
-        }}
+        }
         
-        .status-text {{
+        .status-text {
             font-size: 20px;
             font-weight: 700;
             color: #ffffff;
             text-shadow: 1px 1px 2px rgba(0, 0, 0, 0.8);
-        }}
+        }
         
-        .info-section {{
+        .info-section {
             padding: 0 30px 20px;
-        }}
+        }
         
-        .info-card {{
+        .info-card {
             background: linear-gradient(145deg, rgba(0, 0, 0, 0.4), rgba(0, 0, 0, 0.2));
             border: 2px solid;
             border-radius: 15px;
             padding: 20px;
             margin-bottom: 15px;
             backdrop-filter: blur(10px);
-        }}
+        }
         
-        .info-card.location {{
+        .info-card.location {
             border-color: #87ceeb;
-        }}
+        }
         
-        .info-card.contact {{
+        .info-card.contact {
             border-color: #00ffff;
-        }}
+        }
         
-        .info-card.phone {{
+        .info-card.phone {
             border-color: #ffa500;
-        }}
+        }
         
-        .card-title {{
+        .card-title {
             font-size: 18px;
             font-weight: 600;
             margin-bottom: 8px;
             text-shadow: 1px 1px 2px rgba(0, 0, 0, 0.8);
-        }}
+        }
         
-        .card-content {{
+        .card-content {
             font-size: 22px;
             font-weight: 700;
             color: #ffffff;
             text-shadow: 1px 1px 2px rgba(0, 0, 0, 0.8);
-        }}
+        }
         
-        .location .card-title {{ color: #87ceeb; }}
-        .contact .card-title {{ color: #00ffff; }}
-        .phone .card-title {{ color: #ffa500; }}
+        .location .card-title { color: #87ceeb; }
+        .contact .card-title { color: #00ffff; }
+        .phone .card-title { color: #ffa500; }
         
-        .emergency-section {{
+        .emergency-section {
             padding: 30px;
             text-align: center;
-        }}
+        }
         
-        .emergency-button {{
+        .emergency-button {
             background: #dc2626;
             border: 4px solid #ffd700;
             border-radius: 20px;
@@ -196,9 +250,9 @@ def create_emergency_alert_html(street_address: str, phone_number: str, contact_
             margin: 0 auto 30px;
             position: relative;
             overflow: hidden;
-        }}
+        }
         
-        .emergency-button::before {{
+        .emergency-button::before {
             content: '';
             position: absolute;
             top: -2px;
@@ -208,41 +262,40 @@ def create_emergency_alert_html(street_address: str, phone_number: str, contact_
             background: linear-gradient(45deg, #ffd700, #ffffff, #ffd700, #ffffff);
             z-index: -1;
             border-radius: 20px;
-            animation: pulse 2s infinite;
-        }}
+        }
         
-        @keyframes pulse {{
-            0%, 100% {{ opacity: 0.8; }}
-            50% {{ opacity: 1; }}
-        }}
-        
-        .emergency-text {{
+        .emergency-text {
             font-size: 36px;
             font-weight: 900;
             color: #ffffff;
             text-shadow: 2px 2px 4px rgba(0, 0, 0, 0.8);
             letter-spacing: 1px;
-        }}
+        }
         
-        .footer-section {{
+        .footer-section {
             text-align: center;
             padding: 0 30px 30px;
-        }}
+        }
         
-        .timestamp {{
+        /* Fixed line boxes: the timestamp is stamped onto cached images at a
+           known offset from the bottom (see _TIMESTAMP_CENTER_FROM_BOTTOM) */
+        .timestamp {
             font-size: 16px;
+            line-height: 20px;
+            height: 20px;
             color: #d1d5db;
             margin-bottom: 8px;
             font-weight: 500;
-        }}
+        }
         
-        .verification {{
+        .verification {
             font-size: 14px;
+            line-height: 18px;
             color: #9ca3af;
             font-weight: 500;
-        }}
+        }
         
-        .texture-overlay {{
+        .texture-overlay {
             position: absolute;
             top: 0;
             left: 0;
@@ -257,10 +310,13 @@ def create_emergency_alert_html(street_address: str, phone_number: str, contact_
                     rgba(255, 255, 255, 0.02) 4px
                 );
             pointer-events: none;
-        }}
-    </style>
-</head>
-<body>
+        }
+"""
+
+# The card markup is static apart from five text fields, so it is parsed once
+# here and each alert only substitutes $incident, $street, $contact, $phone and
+# $timestamp
+_CARD_MARKUP = """
     <div class="alert-container">
         <div class="texture-overlay"></div>
         
@@ -269,7 +325,7 @@ def create_emergency_alert_html(street_address: str, phone_number: str, contact_
             <h1 class="main-title">🚨 EMERGENCIA 🚨</h1>
             
             <div class="incident-badge">
-                <div class="incident-type">{incident_type}</div>
+                <div class="incident-type" id="f-incident">$incident</div>
             </div>
             
             <h2 class="system-title">SISTEMA DE ALARMA COMUNITARIA</h2>
@@ -282,17 +338,17 @@ def create_emergency_alert_html(street_address: str, phone_number: str, contact_
         <div class="info-section">
             <div class="info-card location">
                 <div class="card-title">📍 UBICACIÓN</div>
-                <div class="card-content">{street_address.upper()}</div>
+                <div class="card-content" id="f-loc">$street</div>
             </div>
             
             <div class="info-card contact">
                 <div class="card-title">👤 REPORTADO POR</div>
-                <div class="card-content">{contact_name.upper()}</div>
+                <div class="card-content" id="f-contact">$contact</div>
             </div>
             
             <div class="info-card phone">
                 <div class="card-title">📞 CONTACTO DIRECTO</div>
-                <div class="card-content">{phone_number}</div>
+                <div class="card-content" id="f-phone">$phone</div>
             </div>
         </div>
         
@@ -303,74 +359,674 @@ def create_emergency_alert_html(street_address: str, phone_number: str, contact_
         </div>
         
         <div class="footer-section">
-            <div class="timestamp">⏰ {timestamp}</div>
+            <div class="timestamp" id="f-ts">$timestamp</div>
             <div class="verification">🔒 SISTEMA VERIFICADO</div>
         </div>
     </div>
-</body>
+"""
+
+# Same stops as the .alert-container CSS gradient
+_CARD_GRADIENT = [(0.0, (127, 29, 29)), (0.3, (220, 38, 38)), (0.6, (239, 68, 68)),
+                  (0.9, (220, 38, 38)), (1.0, (153, 27, 27))]
+
+# Page background behind the card (the body's 135deg CSS gradient)
+_PAGE_GRADIENT = [(0.0, (127, 29, 29)), (0.25, (220, 38, 38)), (0.5, (239, 68, 68)),
+                  (0.75, (220, 38, 38)), (1.0, (153, 27, 27))]
+
+def _gradient_color(t: float, stops=_CARD_GRADIENT) -> Tuple[int, int, int]:
+    """Gradient color at position t (0-1), card gradient by default"""
+    for (t0, c0), (t1, c1) in zip(stops, stops[1:]):
+        if t <= t1:
+            f = (t - t0) / (t1 - t0)
+            return tuple(int(a + (b - a) * f) for a, b in zip(c0, c1))
+    return stops[-1][1]
+
+def _bake_linear_gradient(angle: float, stops, width: int, height: int, scale: int = 10):
+    """
+    CSS linear-gradient(angle, stops) over a width x height box, baked at
+    1/scale size: t follows the CSS gradient line, whose length depends on
+    the box's aspect ratio, so the bitmap only matches at that aspect
+    """
+    w, h = max(width // scale, 1), max(height // scale, 1)
+    dx, dy = math.sin(math.radians(angle)), -math.cos(math.radians(angle))
+    length = abs(w * dx) + abs(h * dy)
+    image = Image.new('RGB', (w, h))
+    for y in range(h):
+        for x in range(w):
+            t = ((x + 0.5 - w / 2) * dx + (y + 0.5 - h / 2) * dy) / length + 0.5
+            image.putpixel((x, y), _gradient_color(min(max(t, 0.0), 1.0), stops))
+    return image
+
+def _png_data_uri(image) -> str:
+    buffer = io.BytesIO()
+    image.save(buffer, 'PNG', optimize=True)
+    return "data:image/png;base64," + base64.b64encode(buffer.getvalue()).decode('ascii')
+
+def _baked_background_css() -> str:
+    """
+    CSS overrides that swap the page/card gradients and the stripe texture for
+    small pre-rendered PNGs, so Chromium scales a bitmap instead of evaluating
+    gradients on every screenshot (empty without Pillow: the CSS gradients stay)
+    """
+    if Image is None:
+        return ""
+    
+    # Card: the card's height depends on its content, and an angled gradient
+    # only matches the CSS at the aspect it was baked for, so the card gets
+    # the vertical gradient the Pillow renderer draws (a 1px strip, exact at
+    # any height once stretched)
+    card_gradient = _bake_linear_gradient(180, _CARD_GRADIENT, 1, 256, scale=1)
+    
+    # Page: the body's own 135deg gradient, baked for the render viewport
+    page_gradient = _bake_linear_gradient(135, _PAGE_GRADIENT, _VIEWPORT['width'], _VIEWPORT['height'])
+    
+    # 45deg stripes: 2px clear, 2px white at 2% opacity
+    texture = Image.new('RGBA', (4, 4), (0, 0, 0, 0))
+    for y in range(4):
+        for x in range(4):
+            if (x + y) % 4 >= 2:
+                texture.putpixel((x, y), (255, 255, 255, 5))
+    
+    card_uri, page_uri, texture_uri = (_png_data_uri(card_gradient), _png_data_uri(page_gradient),
+                                       _png_data_uri(texture))
+    return f"""
+        body {{ background: url({page_uri}) 0 0 / 100% 100% no-repeat; }}
+        .alert-container {{ background: url({card_uri}) 0 0 / 100% 100% no-repeat; }}
+        .texture-overlay {{ background: url({texture_uri}) repeat; }}
+"""
+
+_STATIC_CSS += _baked_background_css()
+
+_HTML_TEMPLATE = string.Template(f"""
+<!DOCTYPE html>
+<html lang="es">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Alerta de Emergencia</title>
+    <style>{_STATIC_CSS}    </style>
+</head>
+<body>{_CARD_MARKUP}</body>
 </html>
+    """)
+
+# Skeleton loaded into the pooled pages before their stylesheet is attached
+_CARD_SHELL = ('<!DOCTYPE html><html lang="es"><head><meta charset="UTF-8"></head><body>'
+               + string.Template(_CARD_MARKUP).substitute(incident="", street="", contact="", phone="", timestamp="")
+               + '</body></html>')
+
+def create_emergency_alert_html(street_address: str, phone_number: str, contact_name: str = "Vecino", incident_type: str = "ALERTA GENERAL",
+                                timestamp: Optional[str] = None):
+    """
+    Generate HTML template for emergency alert with perfect CSS layout
+    (timestamp="" leaves the footer line empty for the cached base image)
+    """
+    
+    if timestamp is None:
+        timestamp = datetime.now().strftime("⏰ %H:%M hrs • %d/%m/%Y")
+    
+    return _HTML_TEMPLATE.substitute(
+        incident=incident_type,
+        street=street_address.upper(),
+        contact=contact_name.upper(),
+        phone=phone_number,
+        timestamp=timestamp,
+    )
+
+async def _new_context() -> Tuple[BrowserContext, Page]:
+    """New pooled context with its card page loaded (empty fields)"""
+    context = await _browser.new_context(viewport=_VIEWPORT)
+    page = await context.new_page()
+    await page.set_content(_CARD_SHELL)
+    await page.add_style_tag(content=_STATIC_CSS)
+    return context, page
+
+async def _get_playwright() -> Playwright:
+    """
+    Playwright driver, started once and kept for the process lifetime (starting
+    it costs hundreds of ms); browser relaunches reuse it. Call under _browser_lock
+    """
+    global _playwright
+    
+    if _playwright is None:
+        _playwright = await async_playwright().start()
+    return _playwright
+
+async def _launch_browser():
+    """Launch the browser and fill a fresh context pool. Call under _browser_lock"""
+    global _browser, _context_pool, _pool_members, _render_count
+    
+    print(f"🌐 Launching shared {_BROWSER_ENGINE} for emergency alerts...")
+    playwright = await _get_playwright()
+    if _BROWSER_ENGINE == "chromium":
+        _browser = await playwright.chromium.launch(headless=True, args=_CHROMIUM_ARGS, chromium_sandbox=False)
+    else:
+        _browser = await getattr(playwright, _BROWSER_ENGINE).launch(headless=True)
+    _context_pool = asyncio.Queue()
+    for _ in range(_CONTEXT_POOL_SIZE):
+        _context_pool.put_nowait((*await _new_context(), 0))
+    _pool_members = _CONTEXT_POOL_SIZE
+    _render_count = 0
+
+async def _recycle_browser():
     """
+    Close the browser once every pooled context is back (renders already in
+    progress finish first) and launch a fresh one. Call under _browser_lock
+    """
+    print(f"♻️ Recycling shared browser after {_render_count} renders...")
+    for _ in range(_pool_members):
+        await _context_pool.get()
+    await _browser.close()
+    await _launch_browser()
+
+async def get_browser() -> Browser:
+    """
+    Get the shared browser, launching it (and the context pool) on first use,
+    again if the previous one crashed, or fresh after _BROWSER_MAX_RENDERS
+    """
+    if _browser is None or not _browser.is_connected() or _render_count >= _BROWSER_MAX_RENDERS:
+        async with _browser_lock:
+            if _browser is None or not _browser.is_connected():
+                await _launch_browser()
+            elif _render_count >= _BROWSER_MAX_RENDERS:
+                await _recycle_browser()
+    return _browser
+
+async def _release_context(context: BrowserContext, page: Page, uses: int):
+    """Return a context to the pool, swapping it for a fresh one once it is worn out"""
+    global _pool_members, _render_count
     
-    return html_template
+    if context.browser is not _browser:
+        return  # Belongs to a browser that has since been replaced
+    _render_count += 1
+    if uses >= _CONTEXT_MAX_USES:
+        try:
+            await context.close()
+            (context, page), uses = await _new_context(), 0
+        except Exception as e:
+            print(f"⚠️ Could not recycle browser context: {str(e)}")
+            _pool_members -= 1
+            return
+    _context_pool.put_nowait((context, page, uses))
 
-async def html_to_image(html_content: str, output_path: str):
+async def close_browser():
     """
-    Convert HTML to high-quality image using Playwright
+    Close the pooled contexts, the shared browser and the Playwright driver
+    """
+    global _playwright, _browser, _context_pool, _pool_members
+    
+    async with _browser_lock:
+        if _context_pool is not None:
+            while not _context_pool.empty():
+                context, _, _ = _context_pool.get_nowait()
+                await context.close()
+        if _browser is not None:
+            await _browser.close()
+        if _playwright is not None:
+            await _playwright.stop()
+        _playwright = _browser = _context_pool = None
+        _pool_members = 0
+
+def _encode_jpeg(image) -> bytes:
+    buffer = io.BytesIO()
+    image.convert('RGB').save(buffer, 'JPEG', quality=_JPEG_QUALITY, optimize=True)
+    return buffer.getvalue()
+
+def _reencode_jpeg(png_bytes: bytes) -> bytes:
+    with Image.open(io.BytesIO(png_bytes)) as image:
+        return _encode_jpeg(image)
+
+def _write_file(path: str, data: bytes):
+    with open(path, 'wb') as f:
+        f.write(data)
+
+async def _screenshot_card(page: Page) -> bytes:
+    """The card element as JPEG bytes (Chromium's own encoder only when Pillow is missing)"""
+    card = page.locator(_CARD_SELECTOR)
+    if Image is None:
+        return await card.screenshot(quality=_JPEG_QUALITY, type='jpeg')
+    png_bytes = await card.screenshot(type='png')
+    return await asyncio.to_thread(_reencode_jpeg, png_bytes)
+
+async def html_to_image(html_content: str, output_path: Optional[str] = None) -> Optional[bytes]:
+    """
+    Convert HTML to a JPEG using the shared Playwright browser
+    Returns the image bytes (None on failure), also saved to output_path if given
     """
     try:
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=True)
-            page = await browser.new_page(viewport={{'width': 800, 'height': 1200}})
-            
-            await page.set_content(html_content)
-            await page.wait_for_load_state('networkidle')
-            
-            # Take screenshot with high quality
-            await page.screenshot(
-                path=output_path,
-                full_page=True,
-                quality=95,
-                type='jpeg'
-            )
-            
-            await browser.close()
-            return True
+        await get_browser()
+        context, card_page, uses = await _context_pool.get()
+        try:
+            page = await context.new_page()
+            try:
+                # Self-contained HTML (no external fonts): return as soon as the
+                # content is committed; the locator screenshot below waits for
+                # the card to be laid out and stable
+                await page.set_content(html_content, wait_until='commit')
+                
+                # Screenshot just the card instead of laying out the full page
+                image_data = await _screenshot_card(page)
+            finally:
+                await page.close()
+        finally:
+            await _release_context(context, card_page, uses + 1)
+        if output_path:
+            await asyncio.to_thread(_write_file, output_path, image_data)
+        return image_data
+    except Exception as e:
+        print(f"❌ Error converting HTML to image: {str(e)}")
+        return None
+
+async def render_alert_card(street_address: str, phone_number: str, contact_name: str, incident_type: str,
+                            timestamp: str) -> Optional[bytes]:
+    """
+    Render the card to JPEG bytes by patching the fields of an already loaded
+    pooled page (no HTML parsing or new page per alert)
+    """
+    try:
+        await get_browser()
+        context, page, uses = await _context_pool.get()
+        try:
+            await page.evaluate(_PATCH_FIELDS_JS, {
+                'f-incident': incident_type,
+                'f-loc': street_address.upper(),
+                'f-contact': contact_name.upper(),
+                'f-phone': phone_number,
+                'f-ts': timestamp,
+            })
+            return await _screenshot_card(page)
+        finally:
+            await _release_context(context, page, uses + 1)
     except Exception as e:
-        print(f"❌ Error converting HTML to image: {{str(e)}}")
-        return False
+        print(f"❌ Error rendering alert card: {str(e)}")
+        return None
+
+# ---------------------------------------------------------------------------
+# Direct Pillow renderer: the card is a fixed layout with no scripting, so it
+# can be drawn straight to pixels instead of going through a browser. This is
+# the default; HTML_ALERT_RENDERER (or the renderer argument) selects
+# "playwright" or "wkhtmltoimage" to render the HTML template instead
+# ---------------------------------------------------------------------------
+
+_RENDERERS = ("pil", "playwright", "wkhtmltoimage")
+_RENDERER = os.getenv("HTML_ALERT_RENDERER", "pil").lower()
+_OUTPUT_DIR = os.getenv("ALERT_OUTPUT_DIR", tempfile.gettempdir())
+# Set DEBUG_SAVE_HTML=1 to keep a copy of the rendered HTML next to the image
+_DEBUG_SAVE_HTML = bool(os.getenv("DEBUG_SAVE_HTML"))
+_debug_writes: set = set()  # Strong refs so pending writes aren't garbage collected
+
+# Browser-rendered cards only differ by their four text fields plus the
+# timestamp, so a base image without the timestamp is cached per field
+# combination and the time is stamped on top. The cards carry personal data,
+# so the cache is a bounded in-memory LRU rather than files on disk. Both
+# renderers keep the footer lines at fixed heights
+# (timestamp 20px, 8px gap, verification 18px, 30px padding, 6px border)
+_BASE_CACHE_MAX = 64
+_base_image_cache: "OrderedDict[str, bytes]" = OrderedDict()
+# Part of the cache key, so a card rendered from an older template is never reused
+_TEMPLATE_VERSION = hashlib.blake2b(_HTML_TEMPLATE.template.encode(), digest_size=8).hexdigest()
+_TIMESTAMP_CENTER_FROM_BOTTOM = 6 + 30 + 18 + 8 + 10
+_VERIFICATION_CENTER_FROM_BOTTOM = 6 + 30 + 9
+_FOOTER_HEIGHT = 20 + 8 + 18 + 30 + 6
+_INFO_CARD_HEIGHT = 96
+_INFO_CARD_GAP = 15
+
+_CARD_WIDTH = 600
+_CARD_PADDING = 30
+_WHITE = (255, 255, 255)
+_GOLD = (255, 215, 0)
+_RED = (220, 38, 38)
+_GREEN = (22, 163, 74)
+_SHADOW = (0, 0, 0, 170)
+_INFO_CARDS = [
+    ("UBICACIÓN", (135, 206, 235)),
+    ("REPORTADO POR", (0, 255, 255)),
+    ("CONTACTO DIRECTO", (255, 165, 0)),
+]
+_BOLD_FONT_PATHS = [
+    "/System/Library/Fonts/Supplemental/Arial Bold.ttf",
+    "/System/Library/Fonts/Helvetica.ttc",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "C:/Windows/Fonts/arialbd.ttf",
+]
+
+@functools.lru_cache(maxsize=None)
+def _font(size: int):
+    """Bold UI font at the given size (loaded once per size)"""
+    for font_path in _BOLD_FONT_PATHS:
+        if os.path.exists(font_path):
+            try:
+                return ImageFont.truetype(font_path, size)
+            except Exception:
+                continue
+    return ImageFont.load_default()
+
+def _fit_font(draw, text: str, size: int, max_width: int, min_size: int = 14):
+    """Largest font up to `size` that fits `text` in `max_width` (long addresses shrink instead of overflowing)"""
+    while size > min_size and draw.textlength(text, font=_font(size)) > max_width:
+        size -= 2
+    return _font(size)
+
+def _fit_text(draw, text: str, size: int, max_width: int, min_size: int = 14):
+    """
+    `_fit_font` for a single-line value: once the font is down to `min_size`,
+    text that still doesn't fit is cut and ends in an ellipsis; returns (text, font)
+    """
+    font = _fit_font(draw, text, size, max_width, min_size)
+    if draw.textlength(text, font=font) <= max_width:
+        return text, font
+    while text and draw.textlength(text + "…", font=font) > max_width:
+        text = text[:-1]
+    return text.rstrip() + "…", font
+
+@functools.lru_cache(maxsize=8)
+def _gradient_background(width: int, height: int):
+    """Vertical card gradient, built from a 1px strip and stretched"""
+    strip = Image.new('RGB', (1, 256))
+    for i in range(256):
+        strip.putpixel((0, i), _gradient_color(i / 255))
+    return strip.resize((width, height), Image.BILINEAR)
 
-async def create_html_emergency_alert(street_address: str, phone_number: str, contact_name: str = "Vecino", incident_type: str = "ALERTA GENERAL"):
+def _centered_text(draw, y: int, text: str, font, fill, width: int = _CARD_WIDTH, shadow: int = 2):
+    """Draw horizontally centered text with a drop shadow; returns the text height"""
+    left, top, right, bottom = draw.textbbox((0, 0), text, font=font)
+    x = (width - (right - left)) // 2 - left
+    if shadow:
+        draw.text((x + shadow, y - top + shadow), text, font=font, fill=_SHADOW)
+    draw.text((x, y - top), text, font=font, fill=fill)
+    return bottom - top
+
+def _pill(draw, y: int, text: str, font, fill, outline, border: int, pad_x: int, pad_y: int, radius: int):
+    """Centered badge with text, as in the .incident-badge/.status-badge CSS; returns its height"""
+    left, top, right, bottom = draw.textbbox((0, 0), text, font=font)
+    w, h = right - left + 2 * pad_x, bottom - top + 2 * pad_y
+    x = (_CARD_WIDTH - w) // 2
+    draw.rounded_rectangle([x, y, x + w, y + h], radius=radius, fill=fill, outline=outline, width=border)
+    _centered_text(draw, y + pad_y, text, font, _WHITE)
+    return h
+
+def _draw_timestamp(draw, height: int, text: str):
+    """Draw the footer timestamp on a card of the given height"""
+    draw.text((_CARD_WIDTH // 2, height - _TIMESTAMP_CENTER_FROM_BOTTOM), text,
+              font=_font(16), fill=(209, 213, 219), anchor="mm")
+
+def _stamp_timestamp(base_data: bytes, text: str) -> bytes:
+    """JPEG of a cached base card with the timestamp drawn in"""
+    with Image.open(io.BytesIO(base_data)) as base:
+        image = base.convert('RGB')
+    _draw_timestamp(ImageDraw.Draw(image), image.height, text)
+    return _encode_jpeg(image)
+
+def _draw_base_card(incident_type: str) -> Tuple["Image.Image", int]:
     """
-    Create professional emergency alert using HTML/CSS approach
+    Draw everything but the three contact fields and the timestamp; returns
+    the card and the y of the first info card
     """
+    # Content is drawn on a transparent layer (cropped to its final height
+    # afterwards) so the shadows and the translucent info cards blend with
+    # the gradient underneath
+    layer = Image.new('RGBA', (_CARD_WIDTH, 1400), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(layer)
     
-    print("🎨 Creating HTML-based emergency alert...")
+    # Warning badge
+    y = 40
+    cx = _CARD_WIDTH // 2
+    draw.ellipse([cx - 40, y, cx + 40, y + 80], fill=_GOLD, outline=_WHITE, width=4)
+    _centered_text(draw, y + 20, "!", _font(36), (0, 0, 0), shadow=0)
+    y += 80 + 30
     
-    # Generate HTML
-    html_content = create_emergency_alert_html(street_address, phone_number, contact_name, incident_type)
+    y += _centered_text(draw, y, "EMERGENCIA", _font(48), _WHITE, shadow=3) + 24
+    y += _pill(draw, y, incident_type, _fit_font(draw, incident_type, 28, _CARD_WIDTH - 120),
+               _RED, _GOLD, 3, 30, 15, 25) + 25
+    y += _centered_text(draw, y, "SISTEMA DE ALARMA COMUNITARIA",
+                        _fit_font(draw, "SISTEMA DE ALARMA COMUNITARIA", 32, _CARD_WIDTH - 2 * _CARD_PADDING), _GOLD) + 24
+    y += _pill(draw, y, "ACTIVO", _font(20), _GREEN, _WHITE, 3, 40, 12, 20) + 30 + _CARD_PADDING
     
-    # Save HTML file for debugging
-    timestamp_file = datetime.now().strftime("%Y%m%d_%H%M%S")
-    html_path = f"/Users/bmac/Library/CloudStorage/OneDrive-TheUniversityofMemphis/Other/TT/Alarm_system/emergency_alert_{timestamp_file}.html"
+    # Info cards (values are filled in per alert by _overlay_fields)
+    info_top = y
+    card_left, card_right = _CARD_PADDING, _CARD_WIDTH - _CARD_PADDING
+    for title, color in _INFO_CARDS:
+        draw.rounded_rectangle([card_left, y, card_right, y + _INFO_CARD_HEIGHT], radius=15, fill=(0, 0, 0, 80), outline=color, width=2)
+        draw.text((card_left + 20, y + 20), title, font=_font(18), fill=color)
+        y += _INFO_CARD_HEIGHT + _INFO_CARD_GAP
+    y += 5 + _CARD_PADDING
     
-    with open(html_path, 'w', encoding='utf-8') as f:
-        f.write(html_content)
+    # Emergency number button
+    text = "EMERGENCIAS: 911"
+    left, top, right, bottom = draw.textbbox((0, 0), text, font=_font(36))
+    h = bottom - top + 40
+    draw.rounded_rectangle([card_left - 2, y - 2, card_right + 2, y + h + 2], radius=20, fill=_WHITE)
+    draw.rounded_rectangle([card_left, y, card_right, y + h], radius=20, fill=_RED, outline=_GOLD, width=4)
+    _centered_text(draw, y + 20, text, _font(36), _WHITE)
+    y += h + 30
     
-    print(f"📄 HTML saved: {{os.path.basename(html_path)}}")
+    height = y + _FOOTER_HEIGHT
+    layer = layer.crop((0, 0, _CARD_WIDTH, height))
+    image = _gradient_background(_CARD_WIDTH, height).convert('RGBA')
+    draw = ImageDraw.Draw(layer)
     
-    # Convert to image
-    image_path = f"/Users/bmac/Library/CloudStorage/OneDrive-TheUniversityofMemphis/Other/TT/Alarm_system/html_emergency_alert_{timestamp_file}.jpg"
+    # Footer
+    draw.text((_CARD_WIDTH // 2, height - _VERIFICATION_CENTER_FROM_BOTTOM), "SISTEMA VERIFICADO",
+              font=_font(14), fill=(156, 163, 175), anchor="mm")
     
-    success = await html_to_image(html_content, image_path)
+    # Frame: white border with the inner gold line
+    draw.rounded_rectangle([0, 0, _CARD_WIDTH - 1, height - 1], radius=20, outline=_WHITE, width=6)
+    draw.rounded_rectangle([6, 6, _CARD_WIDTH - 7, height - 7], radius=14, outline=_GOLD, width=2)
     
-    if success and os.path.exists(image_path):
-        file_size = os.path.getsize(image_path)
-        print(f"✅ Image created: {{os.path.basename(image_path)}}")
-        print(f"📊 Size: {{file_size}} bytes")
-        return image_path
-    else:
-        print("❌ Failed to create image from HTML")
+    image.alpha_composite(layer)
+    return image.convert('RGB'), info_top
+
+def _base_card(incident_type: str) -> Tuple["Image.Image", int]:
+    """Pre-drawn card for a known incident type, drawn on the spot for any other"""
+    base = _BASE_CARDS.get(incident_type)
+    return base if base is not None else _draw_base_card(incident_type)
+
+def _overlay_fields(base, info_top: int, street_address: str, phone_number: str, contact_name: str,
+                    timestamp: str):
+    """Copy of a base card with the contact fields and the timestamp drawn in"""
+    image = base.copy()
+    draw = ImageDraw.Draw(image)
+    card_left, card_right = _CARD_PADDING, _CARD_WIDTH - _CARD_PADDING
+    y = info_top
+    for value in (street_address.upper(), contact_name.upper(), phone_number):
+        value, font = _fit_text(draw, value, 22, card_right - card_left - 40)
+        draw.text((card_left + 20, y + 50), value, font=font, fill=_WHITE)
+        y += _INFO_CARD_HEIGHT + _INFO_CARD_GAP
+    if timestamp:
+        _draw_timestamp(draw, image.height, timestamp)
+    return image
+
+def create_emergency_alert_pil(street_address: str, phone_number: str, contact_name: str = "Vecino",
+                               incident_type: str = "ALERTA GENERAL", output_path: Optional[str] = None,
+                               timestamp: Optional[str] = None) -> Optional[str]:
+    """
+    Draw the emergency alert card directly with Pillow and save it as JPEG
+    """
+    now = datetime.now()
+    if output_path is None:
+        output_path = os.path.join(_OUTPUT_DIR, f"html_emergency_alert_{now:%Y%m%d_%H%M%S}.jpg")
+    if timestamp is None:
+        timestamp = f"{now:%H:%M hrs • %d/%m/%Y}"
+    
+    try:
+        _write_file(output_path, render_emergency_alert_pil_bytes(street_address, phone_number, contact_name, incident_type, timestamp))
+    except Exception as e:
+        print(f"❌ Error saving alert image: {str(e)}")
+        return None
+    return output_path
+
+def render_emergency_alert_pil_bytes(street_address: str, phone_number: str, contact_name: str,
+                                     incident_type: str, timestamp: str) -> bytes:
+    """
+    Draw the emergency alert card with Pillow (same layout as the HTML template)
+    and return it as JPEG bytes; timestamp="" leaves the footer line empty
+    """
+    base, info_top = _base_card(incident_type)
+    return _encode_jpeg(_overlay_fields(base, info_top, street_address, phone_number, contact_name, timestamp))
+
+# The incident types the pipeline sends; their cards are drawn once here so an
+# alert only costs the three field overlays and the JPEG encode
+_KNOWN_INCIDENTS = (
+    "ALERTA GENERAL",
+    "EMERGENCIA GENERAL",
+    "EMERGENCIA MÉDICA",
+    "INCENDIO",
+    "ACCIDENTE",
+    "TERREMOTO",
+)
+_BASE_CARDS = {incident: _draw_base_card(incident) for incident in _KNOWN_INCIDENTS} if Image is not None else {}
+
+def _write_debug_html(html_path: str, html_content: str):
+    try:
+        with open(html_path, 'w', encoding='utf-8') as f:
+            f.write(html_content)
+        print(f"📄 HTML saved: {os.path.basename(html_path)}")
+    except Exception as e:
+        print(f"⚠️ Could not save debug HTML: {str(e)}")
+
+async def _render_html_card(street_address: str, phone_number: str, contact_name: str, incident_type: str,
+                            timestamp: str) -> Optional[bytes]:
+    """Render the card through the HTML template and Playwright"""
+    if _DEBUG_SAVE_HTML:
+        # Save HTML file for debugging, in the background so it never delays the screenshot
+        html_content = create_emergency_alert_html(street_address, phone_number, contact_name, incident_type, timestamp)
+        html_path = os.path.join(_OUTPUT_DIR, f"emergency_alert_{datetime.now():%Y%m%d_%H%M%S}.html")
+        write_task = asyncio.create_task(asyncio.to_thread(_write_debug_html, html_path, html_content))
+        _debug_writes.add(write_task)
+        write_task.add_done_callback(_debug_writes.discard)
+    
+    return await render_alert_card(street_address, phone_number, contact_name, incident_type, timestamp)
+
+def _wkhtml_to_image(html_content: str) -> Optional[bytes]:
+    """Render the HTML to JPEG bytes with wkhtmltoimage (WebKit, no browser process or driver)"""
+    try:
+        return imgkit.from_string(html_content, False, options={
+            'format': 'jpg',
+            'quality': _JPEG_QUALITY,
+            'width': _VIEWPORT['width'],
+            'quiet': '',
+        })
+    except Exception as e:
+        print(f"❌ Error converting HTML with wkhtmltoimage: {str(e)}")
+        return None
+
+async def _cached_base_image(street_address: str, phone_number: str, contact_name: str, incident_type: str,
+                             renderer: str) -> Optional[bytes]:
+    """
+    Timestamp-free browser-rendered card for these fields, from the in-memory
+    cache or rendered on a miss
+    """
+    key = hashlib.blake2b(f"{_TEMPLATE_VERSION}|{renderer}|{street_address}|{phone_number}|{contact_name}|{incident_type}".encode(),
+                          digest_size=8).hexdigest()
+    base_data = _base_image_cache.get(key)
+    if base_data is not None:
+        print(f"♻️ Using cached alert card {key}")
+        _base_image_cache.move_to_end(key)
+        return base_data
+    
+    print("🎨 Creating HTML-based emergency alert...")
+    base_data = await _render_html_card(street_address, phone_number, contact_name, incident_type, "")
+    if base_data is None:
+        return None
+    
+    _base_image_cache[key] = base_data
+    while len(_base_image_cache) > _BASE_CACHE_MAX:
+        _base_image_cache.popitem(last=False)
+    return base_data
+
+async def _create_alert_bytes(street_address: str, phone_number: str, contact_name: str, incident_type: str,
+                              ts_display: str, renderer: Optional[str]) -> Optional[bytes]:
+    renderer = (renderer or _RENDERER).lower()
+    if renderer not in _RENDERERS:
+        raise ValueError(f"Unknown alert renderer: {renderer}")
+    if renderer == "pil" and Image is None:
+        renderer = "playwright"
+    if renderer == "wkhtmltoimage" and imgkit is None:
+        print("⚠️ imgkit not installed, using Playwright")
+        renderer = "playwright"
+    
+    if renderer == "wkhtmltoimage":
+        # Renders the whole page, not just the card, so the timestamp can't be
+        # stamped at the card's footer offset: render each alert in full
+        print("🎨 Creating HTML-based emergency alert with wkhtmltoimage...")
+        html_content = create_emergency_alert_html(street_address, phone_number, contact_name, incident_type, f"⏰ {ts_display}")
+        return await asyncio.to_thread(_wkhtml_to_image, html_content)
+    if Image is None:
+        # Without Pillow the timestamp can't be stamped on: render it all in the browser
+        print("🎨 Creating HTML-based emergency alert...")
+        return await _render_html_card(street_address, phone_number, contact_name, incident_type, f"⏰ {ts_display}")
+    
+    if renderer == "pil":
+        print("🎨 Creating emergency alert with Pillow...")
+        return await asyncio.to_thread(
+            render_emergency_alert_pil_bytes, street_address, phone_number, contact_name, incident_type, ts_display
+        )
+    
+    base_data = await _cached_base_image(street_address, phone_number, contact_name, incident_type, renderer)
+    if base_data is None:
         return None
+    return await asyncio.to_thread(_stamp_timestamp, base_data, ts_display)
+
+async def create_html_emergency_alert_bytes(street_address: str, phone_number: str, contact_name: str = "Vecino",
+                                            incident_type: str = "ALERTA GENERAL", renderer: Optional[str] = None) -> Optional[bytes]:
+    """
+    Create the emergency alert as in-memory JPEG bytes (None on failure), ready
+    for WhatsAppService.send_image_message_from_bytes without touching the disk
+    """
+    image_data = await _create_alert_bytes(
+        street_address, phone_number, contact_name, incident_type,
+        datetime.now().strftime("%H:%M hrs • %d/%m/%Y"), renderer
+    )
+    if image_data is None:
+        print("❌ Failed to create emergency alert image")
+    return image_data
+
+async def create_html_emergency_alert(street_address: str, phone_number: str, contact_name: str = "Vecino", incident_type: str = "ALERTA GENERAL",
+                                      renderer: Optional[str] = None):
+    """
+    Create professional emergency alert and save it under ALERT_OUTPUT_DIR.
+    renderer is "pil" (draw directly, the default), "playwright" or
+    "wkhtmltoimage" (render the HTML/CSS template); None uses
+    HTML_ALERT_RENDERER. Pillow alerts start from a card pre-drawn per
+    incident type; browser-rendered repeats for the same fields reuse the
+    cached card and only get a new timestamp
+    """
+    
+    # One clock read for the file name and the footer text
+    now = datetime.now()
+    image_path = os.path.join(_OUTPUT_DIR, f"html_emergency_alert_{now:%Y%m%d_%H%M%S_%f}.jpg")  # Unique per alert, even within a batch
+    
+    image_data = await _create_alert_bytes(
+        street_address, phone_number, contact_name, incident_type, now.strftime("%H:%M hrs • %d/%m/%Y"), renderer
+    )
+    if image_data is None:
+        print("❌ Failed to create emergency alert image")
+        return None
+    
+    await asyncio.to_thread(_write_file, image_path, image_data)
+    print(f"✅ Image created: {os.path.basename(image_path)}")
+    print(f"📊 Size: {len(image_data)} bytes")
+    return image_path
+
+async def create_html_emergency_alerts_batch(cases: List[Dict[str, str]]) -> List[Optional[str]]:
+    """
+    Create several alerts concurrently (e.g. a neighborhood-wide event)
+    Each case holds the create_html_emergency_alert keyword arguments; results
+    come back in the same order, None for the ones that failed
+    """
+    # At most one render per pooled context (or Pillow worker) at a time
+    semaphore = asyncio.Semaphore(_CONTEXT_POOL_SIZE)
+    
+    async def _one(case: Dict[str, str]) -> Optional[str]:
+        async with semaphore:
+            try:
+                return await create_html_emergency_alert(**case)
+            except Exception as e:
+                print(f"❌ Error creating alert for {case.get('street_address')}: {str(e)}")
+                return None
+    
+    return await asyncio.gather(*(_one(case) for case in cases))
 
 async def test_html_design():
     """Test the HTML-based design"""
@@ -417,8 +1073,14 @@ async def test_html_design():
         print(f"❌ Error: {{str(e)}}")
         return None
 
+async def _run_test():
+    try:
+        return await test_html_design()
+    finally:
+        await close_browser()
+
 if __name__ == "__main__":
-    result = asyncio.run(test_html_design())
+    result = asyncio.run(_run_test())
     if result:
         print(f"\\n🏆 HTML-based design test completed!")
         print(f"📱 Perfect layout with web-grade precision!")
@@ -3,12 +3,159 @@
 Create an enhanced emergency alert with night sky (stars + moon) and city above location fields
 """
 
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageColor, ImageDraw
+import numpy as np
+import functools
 import os
 from datetime import datetime
 import random
 import math
 
+from _alert_common import get_font, night_gradient, save_alert_jpeg
+
+def _blend(color_a, color_b):
+    """Midpoint of two colors, for a single outline standing in for a glow plus border"""
+    a, b = ImageColor.getrgb(color_a), ImageColor.getrgb(color_b)
+    return tuple((x + y) // 2 for x, y in zip(a[:3], b[:3]))
+
+# Stars keep the same positions on every alert
+_STAR_SEED = 42
+_STAR_COUNT = 15
+
+def _make_star_sprite(star_size):
+    """Star dot with its sparkle cross on a transparent tile, pasted once per star"""
+    sparkle_length = star_size + 2
+    offset = sparkle_length // 2
+    tile_size = star_size + 2 * offset + 1
+    sprite = Image.new('RGBA', (tile_size, tile_size), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(sprite)
+    draw.ellipse([offset, offset, offset + star_size, offset + star_size], fill=(255, 255, 255))
+    draw.line([(offset + star_size//2, 0), (offset + star_size//2, tile_size - 1)], fill=(255, 255, 255), width=1)
+    draw.line([(0, offset + star_size//2), (tile_size - 1, offset + star_size//2)], fill=(255, 255, 255), width=1)
+    return sprite
+
+_STAR_SPRITES = {star_size: _make_star_sprite(star_size) for star_size in (2, 3, 4)}
+
+def _make_cloud_sprite():
+    """Simple cloud shape (three overlapping circles) in translucent white"""
+    sprite = Image.new('RGBA', (32, 12), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(sprite)
+    for j in range(3):
+        circle_x = j * 8
+        circle_y = (j % 2) * 3
+        draw.ellipse([circle_x, circle_y, circle_x + 15, circle_y + 8], 
+                     fill=(255, 255, 255, 30))
+    return sprite
+
+# Pasted with its own alpha, so the clouds really are faint (drawn straight on
+# the RGB canvas they came out solid white)
+_CLOUD_SPRITE = _make_cloud_sprite()
+
+@functools.lru_cache(maxsize=4)
+def _night_sky_layout(width, sky_height, seed=_STAR_SEED):
+    """
+    Moon and star geometry for a sky of this size, computed once: returns the
+    moon box, the crescent cut-out box and per star (sprite, paste position)
+    """
+    moon_x = width - 80
+    moon_y = 30
+    moon_size = 25
+    moon_box = (moon_x, moon_y, moon_x + moon_size, moon_y + moon_size)
+    crescent_x = moon_x + 6
+    crescent_box = (crescent_x, moon_y, crescent_x + moon_size, moon_y + moon_size)
+    
+    # Own generator so the global random state is left alone
+    rng = random.Random(seed)
+    stars = []
+    for _ in range(_STAR_COUNT):
+        star_x = rng.randint(20, width - 100)  # Avoid moon area
+        star_y = rng.randint(15, sky_height - 20)
+        star_size = rng.choice([2, 3, 4])  # Different star sizes
+        offset = (star_size + 2) // 2  # Sparkle overhang around the dot
+        stars.append((_STAR_SPRITES[star_size], (star_x - offset, star_y - offset)))
+    return moon_box, crescent_box, tuple(stars)
+
+@functools.lru_cache(maxsize=32)
+def _card_sprite(accent_color, card_width, card_height):
+    """
+    Empty information card (glow outline, dark fill, accent line) on a
+    transparent tile; the card's own top-left corner sits at (1, 1)
+    """
+    sprite = Image.new('RGBA', (card_width + 3, card_height + 3), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(sprite)
+    draw.rounded_rectangle([0, 0, card_width + 2, card_height + 2],
+                          radius=16, outline=accent_color, width=1)
+    draw.rounded_rectangle([1, 1, card_width + 1, card_height + 1],
+                          radius=15, fill=(30, 41, 59), outline=accent_color, width=2)
+    
+    # Accent line
+    draw.rounded_rectangle([16, 16, 19, card_height - 14],
+                          radius=2, fill=accent_color)
+    return sprite
+
+@functools.lru_cache(maxsize=64)
+def _badge_sprite(badge_width, badge_height, radius, fill, outline, outline_width):
+    """
+    Rounded badge on a transparent tile, drawn once per size and colors: the
+    status badge and emergency button repeat across alerts, so their corner
+    rasterization is only paid the first time
+    """
+    sprite = Image.new('RGBA', (badge_width + 1, badge_height + 1), (0, 0, 0, 0))
+    ImageDraw.Draw(sprite).rounded_rectangle([0, 0, badge_width, badge_height],
+                                             radius=radius, fill=fill, outline=outline, width=outline_width)
+    return sprite
+
+def _paste_badge(image, x, y, badge_width, badge_height, radius, fill, outline, outline_width):
+    sprite = _badge_sprite(badge_width, badge_height, radius, fill, outline, outline_width)
+    image.paste(sprite, (x, y), sprite)
+
+# Skyline windows: 40% lit, with a fixed pattern so every alert shows the same city
+_SKYLINE_SEED = 42
+_WINDOW_LIT = np.array([255, 255, 150], dtype=np.uint8)
+_WINDOW_DARK = np.array([100, 150, 255], dtype=np.uint8)
+
+# The header rows above the skyline (icon, title, incident badge,
+# neighborhood, system name, status badge) all have fixed heights, so the
+# icon and the skyline always land at the same y and belong to the template
+_ICON_TOP = 60
+_ICON_SIZE = 60
+_SKYLINE_TOP = 400
+_SKYLINE_HEIGHT = 40
+
+@functools.lru_cache(maxsize=16)
+def _static_template(width, height, accent_color, danger_color, white_color, border_style,
+                     show_night_sky, show_city_above_location):
+    """
+    Everything that doesn't depend on the alert's text (gradient, night sky,
+    border, warning icon, skyline), drawn once per look; callers draw on a copy
+    """
+    # === DARK BLUISH GRADIENT ===
+    image = night_gradient(width, height)
+    draw = ImageDraw.Draw(image)
+    
+    # === CUTE NIGHT SKY AT THE TOP ===
+    if show_night_sky:
+        draw_cute_night_sky(image, width, 150)  # Night sky in top 150px
+    
+    # === ELEGANT BORDER ===
+    if border_style == "elegant":
+        draw.rounded_rectangle([6, 6, width-7, height-7], radius=25, outline=accent_color, width=2)
+    
+    # === WARNING ICON ===
+    icon_x = (width - _ICON_SIZE) // 2
+    draw.ellipse([icon_x, _ICON_TOP, icon_x + _ICON_SIZE, _ICON_TOP + _ICON_SIZE], 
+                 fill=danger_color, outline=accent_color, width=3)
+    
+    mark_x = icon_x + _ICON_SIZE // 2
+    mark_y = _ICON_TOP + _ICON_SIZE // 2
+    draw.line([(mark_x, mark_y - 12), (mark_x, mark_y + 4)], fill=white_color, width=4)
+    draw.ellipse([mark_x - 2, mark_y + 8, mark_x + 2, mark_y + 12], fill=white_color)
+    
+    # === CITY SKYLINE ABOVE LOCATION CARDS ===
+    if show_city_above_location:
+        draw_city_above_location(image, width, _SKYLINE_TOP, _SKYLINE_HEIGHT)
+    return image
+
 def create_night_city_emergency_alert(
     # === REQUIRED DYNAMIC PARAMETERS ===
     street_address: str,
@@ -36,7 +183,12 @@ def create_night_city_emergency_alert(
     card_style: str = "modern",          
     border_style: str = "elegant",
     show_night_sky: bool = True,         # Stars and moon at top
-    show_city_above_location: bool = True # City skyline above location info
+    show_city_above_location: bool = True, # City skyline above location info
+    
+    # === OUTPUT PARAMETERS ===
+    output_dir: str = None,              # Defaults to ALERT_OUTPUT_DIR / the temp dir
+    output_path: str = None,             # Exact file to write (overrides output_dir)
+    as_bytes: bool = False               # Return the JPEG bytes instead of writing a file
 ):
     """
     Create a night-themed emergency alert with stars, moon, and city above location
@@ -45,81 +197,21 @@ def create_night_city_emergency_alert(
     - Stars and moon at the very top for night atmosphere
     - City skyline positioned above the location cards for context
     - Better visual storytelling and hierarchy
+    
+    Returns the saved file's path, or the encoded JPEG itself with as_bytes=True
+    (e.g. for WhatsAppService.send_image_message_from_bytes, no disk round-trip)
     """
     
     # Dimensions
     width = 600
     height = 750 if not show_timestamp and not show_verification else 800
     
-    # Create image with dark background
-    image = Image.new('RGB', (width, height), color='#0F172A')
-    draw = ImageDraw.Draw(image)
-    
-    # === DARK BLUISH GRADIENT ===
-    for y in range(height):
-        ratio = y / height
-        if ratio < 0.3:
-            r = int(15 + (30 - 15) * (ratio / 0.3))
-            g = int(23 + (58 - 23) * (ratio / 0.3))  
-            b = int(42 + (138 - 42) * (ratio / 0.3))
-        elif ratio < 0.7:
-            mid_ratio = (ratio - 0.3) / 0.4
-            r = int(30 + (45 - 30) * mid_ratio)
-            g = int(58 + (78 - 58) * mid_ratio)
-            b = int(138 + (158 - 138) * mid_ratio)
-        else:
-            bottom_ratio = (ratio - 0.7) / 0.3
-            r = int(45 + (20 - 45) * bottom_ratio)
-            g = int(78 + (35 - 78) * bottom_ratio)
-            b = int(158 + (65 - 158) * bottom_ratio)
-        
-        draw.line([(0, y), (width, y)], fill=(r, g, b))
-    
-    # === CUTE NIGHT SKY AT THE TOP ===
-    if show_night_sky:
-        draw_cute_night_sky(draw, width, 150)  # Night sky in top 150px
-    
-    # Load fonts
-    try:
-        font_paths = [
-            "/System/Library/Fonts/SF-Pro-Display-Bold.otf",
-            "/System/Library/Fonts/Helvetica.ttc",
-            "/System/Library/Fonts/Arial.ttf",
-            "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
-            "C:/Windows/Fonts/segoeui.ttf",
-        ]
-        
-        title_font = None
-        subtitle_font = None
-        header_font = None
-        text_font = None
-        small_font = None
-        
-        for font_path in font_paths:
-            if os.path.exists(font_path):
-                try:
-                    title_font = ImageFont.truetype(font_path, 42)
-                    subtitle_font = ImageFont.truetype(font_path, 28)
-                    header_font = ImageFont.truetype(font_path, 18)
-                    text_font = ImageFont.truetype(font_path, 16)
-                    small_font = ImageFont.truetype(font_path, 12)
-                    break
-                except Exception:
-                    continue
-        
-        if not title_font:
-            title_font = ImageFont.load_default()
-            subtitle_font = ImageFont.load_default()
-            header_font = ImageFont.load_default()
-            text_font = ImageFont.load_default()
-            small_font = ImageFont.load_default()
-            
-    except Exception:
-        title_font = ImageFont.load_default()
-        subtitle_font = ImageFont.load_default()
-        header_font = ImageFont.load_default()
-        text_font = ImageFont.load_default()
-        small_font = ImageFont.load_default()
+    # Fonts (loaded once per process)
+    title_font = get_font(42)
+    subtitle_font = get_font(28)
+    header_font = get_font(18)
+    text_font = get_font(16)
+    small_font = get_font(12)
     
     # Color palette
     colors = {
@@ -135,79 +227,59 @@ def create_night_city_emergency_alert(
         'text_secondary': '#94A3B8'     
     }
     
+    # Background, night sky, border, warning icon and skyline come pre-drawn
+    image = _static_template(width, height, colors['accent'], colors['danger'], colors['white'],
+                             border_style, show_night_sky, show_city_above_location).copy()
+    draw = ImageDraw.Draw(image)
+    
     # Layout
     PADDING = 40
     ELEMENT_SPACING = 25
-    y = PADDING + 20
-    
-    # === ELEGANT BORDER ===
-    if border_style == "elegant":
-        draw.rounded_rectangle([6, 6, width-7, height-7], radius=25, outline=colors['accent'], width=2)
-        draw.rounded_rectangle([2, 2, width-3, height-3], radius=28, outline=colors['gray_dark'], width=1)
-    
-    # === WARNING ICON ===
-    icon_size = 60
-    icon_x = (width - icon_size) // 2
-    
-    draw.ellipse([icon_x, y, icon_x + icon_size, y + icon_size], 
-                 fill=colors['danger'], outline=colors['accent'], width=3)
-    
-    mark_x = icon_x + icon_size // 2
-    mark_y = y + icon_size // 2
-    draw.line([(mark_x, mark_y - 12), (mark_x, mark_y + 4)], fill=colors['white'], width=4)
-    draw.ellipse([mark_x - 2, mark_y + 8, mark_x + 2, mark_y + 12], fill=colors['white'])
-    
-    y += icon_size + ELEMENT_SPACING + 10
+    y = _ICON_TOP + _ICON_SIZE + ELEMENT_SPACING + 10
     
     # === TITLE HIERARCHY ===
-    draw_elegant_text(draw, alert_title, width//2, y, title_font, colors['text_primary'], center=True)
+    _draw_text_centered(draw, alert_title, width//2, y, title_font, colors['text_primary'], shadow=True)
     y += 50
     
     # === INCIDENT BADGE ===
-    incident_bbox = draw.textbbox((0, 0), incident_type, font=subtitle_font)
-    incident_width = incident_bbox[2] - incident_bbox[0]
+    incident_width = int(subtitle_font.getlength(incident_type))
     badge_width = incident_width + 50
     badge_height = 45
     badge_x = (width - badge_width) // 2
     
-    draw.rounded_rectangle([badge_x - 2, y - 2, badge_x + badge_width + 2, y + badge_height + 2],
-                          radius=25, outline=colors['accent'], width=2)
-    draw.rounded_rectangle([badge_x, y, badge_x + badge_width, y + badge_height],
-                          radius=22, fill=colors['danger'], outline=colors['white'], width=1)
+    _paste_badge(image, badge_x, y, badge_width, badge_height,
+                 22, colors['danger'], _blend(colors['accent'], colors['white']), 3)
     
     text_x = (width - incident_width) // 2
-    draw_elegant_text(draw, incident_type, text_x, y + 12, subtitle_font, colors['white'])
+    _draw_text(draw, incident_type, text_x, y + 12, subtitle_font, colors['white'], shadow=True)
     y += badge_height + ELEMENT_SPACING + 5
     
     # === NEIGHBORHOOD SECTION ===
     neighborhood_text = f"📍 {neighborhood_name}"
-    draw_elegant_text(draw, neighborhood_text, width//2, y, header_font, colors['accent'], center=True)
+    _draw_text_centered(draw, neighborhood_text, width//2, y, header_font, colors['accent'])
     y += 25
     
     # === SYSTEM NAME ===
-    draw_elegant_text(draw, system_name, width//2, y, small_font, colors['text_secondary'], center=True)
+    _draw_text_centered(draw, system_name, width//2, y, small_font, colors['text_secondary'])
     y += 25
     
     # === STATUS ===
-    status_bbox = draw.textbbox((0, 0), status_text, font=text_font)
-    status_width = status_bbox[2] - status_bbox[0]
+    status_width = int(text_font.getlength(status_text))
     status_badge_width = status_width + 30
     status_badge_height = 30
     status_x = (width - status_badge_width) // 2
     
-    draw.rounded_rectangle([status_x, y, status_x + status_badge_width, y + status_badge_height],
-                          radius=15, fill=colors['success'], outline=colors['accent'], width=1)
+    _paste_badge(image, status_x, y, status_badge_width, status_badge_height,
+                 15, colors['success'], colors['accent'], 1)
     
     text_x = (width - status_width) // 2
-    draw_elegant_text(draw, status_text, text_x, y + 7, text_font, colors['white'])
+    _draw_text(draw, status_text, text_x, y + 7, text_font, colors['white'])
     y += status_badge_height + ELEMENT_SPACING + 15
     
     # === CITY SKYLINE ABOVE LOCATION CARDS ===
+    # (part of the template, at _SKYLINE_TOP == y here)
     if show_city_above_location:
-        city_y_start = y
-        city_height = 40
-        draw_city_above_location(draw, width, city_y_start, city_height, colors)
-        y += city_height + 10
+        y += _SKYLINE_HEIGHT + 10
     
     # === INFORMATION CARDS ===
     card_data = [
@@ -224,19 +296,13 @@ def create_night_city_emergency_alert(
         card_x = card_margin
         card_width = width - (2 * card_margin)
         
-        # Modern dark cards with subtle glow
-        draw.rounded_rectangle([card_x - 1, y - 1, card_x + card_width + 1, y + card_height + 1],
-                              radius=16, outline=accent_color, width=1)
-        draw.rounded_rectangle([card_x, y, card_x + card_width, y + card_height],
-                              radius=15, fill=(30, 41, 59, 200), outline=accent_color, width=2)
-        
-        # Accent line
-        draw.rounded_rectangle([card_x + 15, y + 15, card_x + 18, y + card_height - 15],
-                              radius=2, fill=accent_color)
+        # Modern dark card with subtle glow, pre-drawn per accent color
+        sprite = _card_sprite(accent_color, card_width, card_height)
+        image.paste(sprite, (card_x - 1, y - 1), sprite)
         
         # Card text
-        draw_elegant_text(draw, label.upper(), card_x + 30, y + 15, small_font, colors['text_secondary'])
-        draw_elegant_text(draw, content, card_x + 30, y + 40, text_font, colors['text_primary'])
+        _draw_text(draw, label.upper(), card_x + 30, y + 15, small_font, colors['text_secondary'])
+        _draw_text(draw, content, card_x + 30, y + 40, text_font, colors['text_primary'])
         
         y += card_height + card_spacing
     
@@ -244,19 +310,16 @@ def create_night_city_emergency_alert(
     
     # === EMERGENCY CONTACT ===
     emergency_text = f"🚨 {emergency_number}"
-    emergency_bbox = draw.textbbox((0, 0), emergency_text, font=subtitle_font)
-    emergency_width = emergency_bbox[2] - emergency_bbox[0]
+    emergency_width = int(subtitle_font.getlength(emergency_text))
     emergency_button_width = emergency_width + 60
     emergency_button_height = 50
     emergency_x = (width - emergency_button_width) // 2
     
-    draw.rounded_rectangle([emergency_x - 3, y - 3, emergency_x + emergency_button_width + 3, y + emergency_button_height + 3],
-                          radius=28, outline=colors['danger'], width=2)
-    draw.rounded_rectangle([emergency_x, y, emergency_x + emergency_button_width, y + emergency_button_height],
-                          radius=25, fill=colors['danger'], outline=colors['accent'], width=2)
+    _paste_badge(image, emergency_x, y, emergency_button_width, emergency_button_height,
+                 25, colors['danger'], _blend(colors['danger'], colors['accent']), 3)
     
     text_x = (width - emergency_width) // 2
-    draw_elegant_text(draw, emergency_text, text_x, y + 15, subtitle_font, colors['white'])
+    _draw_text(draw, emergency_text, text_x, y + 15, subtitle_font, colors['white'], shadow=True)
     y += emergency_button_height + 30
     
     # === OPTIONAL FOOTER ===
@@ -264,64 +327,33 @@ def create_night_city_emergency_alert(
         y += 20
         if show_timestamp:
             timestamp = datetime.now().strftime("%H:%M • %d %B %Y")
-            draw_elegant_text(draw, timestamp, width//2, y, small_font, colors['text_secondary'], center=True)
+            _draw_text_centered(draw, timestamp, width//2, y, small_font, colors['text_secondary'])
             y += 20
         
         if show_verification:
             verification = "Sistema Verificado"
-            draw_elegant_text(draw, verification, width//2, y, small_font, colors['text_secondary'], center=True)
-    
-    # Save image
-    timestamp_file = datetime.now().strftime("%Y%m%d_%H%M%S")
-    output_path = f"/Users/bmac/Library/CloudStorage/OneDrive-TheUniversityofMemphis/Other/TT/Alarm_system/night_city_alert_{timestamp_file}.jpg"
-    
-    image.save(output_path, format='JPEG', quality=98, optimize=True)
+            _draw_text_centered(draw, verification, width//2, y, small_font, colors['text_secondary'])
     
-    return output_path
+    return save_alert_jpeg(image, "night_city_alert", output_dir, output_path, as_bytes)
 
-def draw_cute_night_sky(draw, width, sky_height):
+def draw_cute_night_sky(image, width, sky_height):
     """
     Draw a cute night sky with stars and moon at the top
     """
-    # === CUTE CRESCENT MOON ===
-    moon_x = width - 80
-    moon_y = 30
-    moon_size = 25
+    draw = ImageDraw.Draw(image)
+    moon_box, crescent_box, stars = _night_sky_layout(width, sky_height)
     
+    # === CUTE CRESCENT MOON ===
     # Outer moon circle (full moon)
-    draw.ellipse([moon_x, moon_y, moon_x + moon_size, moon_y + moon_size], 
-                 fill=(255, 255, 220, 200))  # Soft yellow moon
+    draw.ellipse(moon_box, fill=(255, 255, 220))  # Soft yellow moon
     
     # Inner circle to create crescent effect
-    crescent_x = moon_x + 6
-    draw.ellipse([crescent_x, moon_y, crescent_x + moon_size, moon_y + moon_size], 
-                 fill=(30, 58, 138))  # Same as background to create crescent
+    draw.ellipse(crescent_box, fill=(30, 58, 138))  # Same as background to create crescent
     
     # === TWINKLING STARS ===
-    # Seed for consistent star positions
-    random.seed(42)
-    
-    star_positions = []
-    for i in range(15):  # 15 cute stars
-        star_x = random.randint(20, width - 100)  # Avoid moon area
-        star_y = random.randint(15, sky_height - 20)
-        star_size = random.choice([2, 3, 4])  # Different star sizes
-        star_positions.append((star_x, star_y, star_size))
-    
-    # Draw stars with twinkling effect
-    for star_x, star_y, star_size in star_positions:
-        # Main star
-        draw.ellipse([star_x, star_y, star_x + star_size, star_y + star_size], 
-                     fill=(255, 255, 255, 180))
-        
-        # Star sparkle effect (cross shape)
-        sparkle_length = star_size + 2
-        draw.line([(star_x + star_size//2, star_y - sparkle_length//2), 
-                   (star_x + star_size//2, star_y + star_size + sparkle_length//2)], 
-                  fill=(255, 255, 255, 120), width=1)
-        draw.line([(star_x - sparkle_length//2, star_y + star_size//2), 
-                   (star_x + star_size + sparkle_length//2, star_y + star_size//2)], 
-                  fill=(255, 255, 255, 120), width=1)
+    # Dot plus sparkle cross, pre-drawn per size
+    for sprite, position in stars:
+        image.paste(sprite, position, sprite)
     
     # === SUBTLE CLOUDS ===
     # Add a few very subtle cloud shapes
@@ -329,17 +361,17 @@ def draw_cute_night_sky(draw, width, sky_height):
         cloud_x = 50 + (i * 200)
         cloud_y = 40 + (i * 20)
         
-        # Simple cloud shape with multiple circles
-        for j in range(3):
-            circle_x = cloud_x + (j * 8)
-            circle_y = cloud_y + (j % 2) * 3
-            draw.ellipse([circle_x, circle_y, circle_x + 15, circle_y + 8], 
-                         fill=(255, 255, 255, 30))
+        image.paste(_CLOUD_SPRITE, (cloud_x, cloud_y), _CLOUD_SPRITE)
 
-def draw_city_above_location(draw, width, y_start, height, colors):
+def draw_city_above_location(image, width, y_start, height, seed=_SKYLINE_SEED):
     """
     Draw a minimalistic city skyline above the location information
+    
+    The lit windows come from a generator local to this call (seeded with
+    `seed`), so concurrent alerts in a thread pool never share RNG state
     """
+    draw = ImageDraw.Draw(image)
+    window_ys, window_xs = [], []
     # City buildings positioned above location cards
     building_widths = [35, 45, 30, 40, 25, 35, 30]
     building_heights = [25, 35, 20, 30, 15, 25, 20]
@@ -354,39 +386,52 @@ def draw_city_above_location(draw, width, y_start, height, colors):
         
         # Draw building outline - subtle but visible
         draw.rectangle([x_pos, building_top, x_pos + w, y_start + height], 
-                      outline=(59, 130, 246, 100), width=1)
+                      outline=(59, 130, 246), width=1)
         
         # Fill building with very subtle color
         draw.rectangle([x_pos + 1, building_top + 1, x_pos + w - 1, y_start + height - 1], 
-                      fill=(30, 41, 59, 80))
+                      fill=(30, 41, 59))
         
-        # Add tiny windows
-        for window_y in range(building_top + 4, y_start + height - 4, 6):
-            for window_x in range(x_pos + 4, x_pos + w - 4, 7):
-                # Randomly light some windows
-                if random.random() > 0.6:  # 40% chance of lit window
-                    draw.point((window_x, window_y), fill=(255, 255, 150, 150))
-                else:
-                    draw.point((window_x, window_y), fill=(100, 150, 255, 80))
+        # Tiny window grid (row by row), filled in for all buildings at once below
+        grid_ys, grid_xs = np.meshgrid(np.arange(building_top + 4, y_start + height - 4, 6) - y_start,
+                                       np.arange(x_pos + 4, x_pos + w - 4, 7), indexing='ij')
+        window_ys.append(grid_ys.ravel())
+        window_xs.append(grid_xs.ravel())
         
         x_pos += w + 3
     
+    # Every window of the skyline is written into the strip's pixels in one
+    # indexed assignment
+    window_ys, window_xs = np.concatenate(window_ys), np.concatenate(window_xs)
+    lit = np.random.default_rng(seed).random(len(window_ys)) > 0.6
+    strip = np.array(image.crop((0, y_start, width, y_start + height)))
+    strip[window_ys, window_xs] = np.where(lit[:, None], _WINDOW_LIT, _WINDOW_DARK)
+    image.paste(Image.fromarray(strip), (0, y_start))
+    
     # Add some connecting lines to represent streets
     street_y = y_start + height
     draw.line([(start_x - 20, street_y), (start_x + total_city_width + 20, street_y)], 
-              fill=(70, 140, 250, 60), width=1)
+              fill=(70, 140, 250), width=1)
 
-def draw_elegant_text(draw, text, x, y, font, color, center=False):
-    """Draw text with elegant styling"""
-    if center:
-        bbox = draw.textbbox((0, 0), text, font=font)
-        text_width = bbox[2] - bbox[0]
-        x = x - text_width // 2
-    
+def _draw_text(draw, text, x, y, font, color, shadow=False):
+    """Draw text at (x, y); shadow adds the 1px drop shadow used for the large headline text"""
     # Subtle glow for dark theme
-    draw.text((x + 1, y + 1), text, font=font, fill=(0, 0, 0, 30))
+    if shadow:
+        draw.text((x + 1, y + 1), text, font=font, fill=(0, 0, 0))
     draw.text((x, y), text, font=font, fill=color)
 
+def _draw_text_centered(draw, text, center_x, y, font, color, shadow=False):
+    """Draw text horizontally centered on center_x"""
+    # Advance width is enough for horizontal centering (no glyph trace)
+    _draw_text(draw, text, center_x - int(font.getlength(text)) // 2, y, font, color, shadow)
+
+def draw_elegant_text(draw, text, x, y, font, color, center=False, shadow=False):
+    """Draw text with elegant styling"""
+    if center:
+        _draw_text_centered(draw, text, x, y, font, color, shadow)
+    else:
+        _draw_text(draw, text, x, y, font, color, shadow)
+
 def test_night_city_design():
     """Test the night city design with stars and moon"""
     
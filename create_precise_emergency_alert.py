@@ -3,457 +3,271 @@
 Create emergency alert with CSS-like precision using PIL but with exact measurements
 """
 
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageDraw
+import numpy as np
+import functools
 import os
 from datetime import datetime
 
-def create_precise_emergency_alert(street_address: str, phone_number: str, contact_name: str = "Vecino", incident_type: str = "ALERTA GENERAL"):
+from _alert_common import get_font, save_alert_jpeg, text_width, vertical_gradient
+from emergency_alert_html_debug import create_html_template
+
+# Red gradient stops (dark red -> red -> light red -> darker red)
+_GRADIENT_STOPS = (
+    (0.0, (127, 29, 29)),
+    (0.3, (220, 38, 38)),
+    (0.7, (239, 68, 68)),
+    (1.0, (153, 27, 27)),
+)
+
+@functools.lru_cache(maxsize=4)
+def _card_background(card_w, card_h):
     """
-    Create emergency alert with CSS-like precision and exact spacing
+    Info card fill, dark gray fading slightly toward the bottom, built once
+    and pasted for each card (the line spans card_w + 1 pixels, like draw.line)
     """
-    
-    # Exact dimensions (like CSS container)
-    width = 600
-    height = 800
-    
-    # CSS-like spacing constants
-    PADDING = 30        # Like CSS padding: 30px
-    MARGIN = 20         # Like CSS margin: 20px  
-    CARD_HEIGHT = 60    # Exact card height
-    CARD_SPACING = 15   # Space between cards
-    BORDER_WIDTH = 6    # Border width
-    
-    # Create image with clean background
-    image = Image.new('RGB', (width, height), color='#7f1d1d')
-    draw = ImageDraw.Draw(image)
+    alpha = 0.8 - (np.arange(card_h) / card_h) * 0.3
+    gray = (40 + (20 * alpha)).astype(np.uint8)
+    return Image.fromarray(np.ascontiguousarray(np.broadcast_to(gray[:, None, None], (card_h, card_w + 1, 3))))
+
+# Exact dimensions (like CSS container)
+_WIDTH = 600
+_HEIGHT = 800
+
+# CSS-like spacing constants
+_PADDING = 30        # Like CSS padding: 30px
+_MARGIN = 20         # Like CSS margin: 20px
+_CARD_HEIGHT = 60    # Exact card height
+_CARD_SPACING = 15   # Space between cards
+_BORDER_WIDTH = 6    # Border width
+_INCIDENT_BADGE_HEIGHT = 45
+
+# Colors (CSS-like hex values)
+_WHITE = '#FFFFFF'
+_GOLD = '#FFD700'
+_RED = '#DC2626'
+_GREEN = '#16A34A'
+_LIGHT_BLUE = '#87CEEB'
+_CYAN = '#00FFFF'
+_ORANGE = '#FFA500'
+_GRAY = '#9CA3AF'
+
+# Information cards: fixed titles and accent colors, content comes from the alert
+_CARDS = (
+    ("📍 UBICACIÓN", _LIGHT_BLUE),
+    ("👤 REPORTADO POR", _CYAN),
+    ("📞 CONTACTO DIRECTO", _ORANGE),
+)
+
+@functools.lru_cache(maxsize=1)
+def _static_template():
+    """
+    Everything that doesn't depend on the alert's arguments (gradient, borders,
+    warning badge, titles, status badge, card frames, 911 button, verification
+    line), drawn once; returns the image plus the y of the incident badge, the
+    first card and the timestamp, and callers draw on a copy
+    """
+    width, height = _WIDTH, _HEIGHT
     
     # Create professional gradient
-    for y in range(height):
-        ratio = y / height
-        if ratio < 0.3:
-            r = int(127 + (220 - 127) * (ratio / 0.3))
-            g = int(29 + (38 - 29) * (ratio / 0.3))
-            b = int(29 + (38 - 29) * (ratio / 0.3))
-        elif ratio < 0.7:
-            mid_ratio = (ratio - 0.3) / 0.4
-            r = int(220 + (239 - 220) * mid_ratio)
-            g = int(38 + (68 - 38) * mid_ratio)
-            b = int(38 + (68 - 38) * mid_ratio)
-        else:
-            bottom_ratio = (ratio - 0.7) / 0.3
-            r = int(239 + (153 - 239) * bottom_ratio)
-            g = int(68 + (27 - 68) * bottom_ratio)
-            b = int(68 + (27 - 68) * bottom_ratio)
-        
-        draw.line([(0, y), (width, y)], fill=(r, g, b))
+    image = vertical_gradient(width, height, _GRADIENT_STOPS)
+    draw = ImageDraw.Draw(image)
     
-    # Load fonts with exact sizes
-    try:
-        font_paths = [
-            "/System/Library/Fonts/Helvetica.ttc",
-            "/System/Library/Fonts/Arial.ttf",
-            "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
-            "C:/Windows/Fonts/arial.ttf",
-        ]
-        
-        title_font = None      # 36px equivalent
-        subtitle_font = None   # 24px equivalent  
-        header_font = None     # 18px equivalent
-        text_font = None       # 16px equivalent
-        small_font = None      # 12px equivalent
-        
-        for font_path in font_paths:
-            if os.path.exists(font_path):
-                try:
-                    title_font = ImageFont.truetype(font_path, 48)
-                    subtitle_font = ImageFont.truetype(font_path, 32)
-                    header_font = ImageFont.truetype(font_path, 24)
-                    text_font = ImageFont.truetype(font_path, 20)
-                    small_font = ImageFont.truetype(font_path, 16)
-                    break
-                except Exception:
-                    continue
-        
-        if not title_font:
-            title_font = ImageFont.load_default()
-            subtitle_font = ImageFont.load_default()
-            header_font = ImageFont.load_default()
-            text_font = ImageFont.load_default()
-            small_font = ImageFont.load_default()
-            
-    except Exception:
-        title_font = ImageFont.load_default()
-        subtitle_font = ImageFont.load_default()
-        header_font = ImageFont.load_default()
-        text_font = ImageFont.load_default()
-        small_font = ImageFont.load_default()
-    
-    # Colors (CSS-like hex values)
-    WHITE = '#FFFFFF'
-    GOLD = '#FFD700'
-    RED = '#DC2626'
-    GREEN = '#16A34A'
-    LIGHT_BLUE = '#87CEEB'
-    CYAN = '#00FFFF'
-    ORANGE = '#FFA500'
-    GRAY = '#9CA3AF'
+    title_font = get_font(48)      # 36px equivalent
+    subtitle_font = get_font(32)   # 24px equivalent
+    header_font = get_font(24)     # 18px equivalent
+    text_font = get_font(20)       # 16px equivalent
+    small_font = get_font(16)      # 12px equivalent
     
     # === MAIN BORDER (CSS-like) ===
-    draw.rectangle([0, 0, width-1, height-1], outline=WHITE, width=BORDER_WIDTH)
-    draw.rectangle([BORDER_WIDTH + 2, BORDER_WIDTH + 2, width - BORDER_WIDTH - 3, height - BORDER_WIDTH - 3], 
-                   outline=GOLD, width=2)
+    draw.rectangle([0, 0, width-1, height-1], outline=_WHITE, width=_BORDER_WIDTH)
+    draw.rectangle([_BORDER_WIDTH + 2, _BORDER_WIDTH + 2, width - _BORDER_WIDTH - 3, height - _BORDER_WIDTH - 3], 
+                   outline=_GOLD, width=2)
     
     # === LAYOUT CALCULATION (CSS-like positioning) ===
-    content_width = width - (2 * PADDING)
-    content_x = PADDING
+    content_width = width - (2 * _PADDING)
+    content_x = _PADDING
     
     # Current Y position (like CSS flow)
-    y = PADDING + 20
+    y = _PADDING + 20
     
     # === WARNING BADGE ===
     badge_size = 60
     badge_x = (width - badge_size) // 2
     draw.ellipse([badge_x, y, badge_x + badge_size, y + badge_size], 
-                 fill=GOLD, outline=WHITE, width=3)
+                 fill=_GOLD, outline=_WHITE, width=3)
     
     # Exclamation mark in badge
     mark_x = badge_x + badge_size // 2
     mark_y = y + badge_size // 2
     draw.line([(mark_x, mark_y - 15), (mark_x, mark_y + 5)], fill='#000000', width=4)
-    draw.ellipse([mark_x - 2, mark_y + 10, mark_x + 2, mark_y + 14], fill='#000000')
+    draw.rectangle([mark_x - 2, mark_y + 10, mark_x + 2, mark_y + 14], fill='#000000')
     
-    y += badge_size + MARGIN
+    y += badge_size + _MARGIN
     
     # === TITLE ===
     title_text = "🚨 EMERGENCIA 🚨"
-    title_bbox = draw.textbbox((0, 0), title_text, font=title_font)
-    title_width = title_bbox[2] - title_bbox[0]
+    title_width = text_width(title_text, title_font)
     title_x = (width - title_width) // 2
     
     # Shadow
     draw.text((title_x + 2, y + 2), title_text, font=title_font, fill='#000000')
     # Main text
-    draw.text((title_x, y), title_text, font=title_font, fill=WHITE)
+    draw.text((title_x, y), title_text, font=title_font, fill=_WHITE)
     
     y += 55  # Title height + margin
     
-    # === INCIDENT TYPE BADGE ===
-    incident_bbox = draw.textbbox((0, 0), incident_type, font=subtitle_font)
-    incident_width = incident_bbox[2] - incident_bbox[0]
-    badge_width = incident_width + 40
-    badge_height = 45
-    badge_x = (width - badge_width) // 2
-    
-    # Badge background
-    draw.rounded_rectangle([badge_x, y, badge_x + badge_width, y + badge_height], 
-                          radius=20, fill=RED, outline=GOLD, width=3)
-    
-    # Badge text
-    text_x = (width - incident_width) // 2
-    draw.text((text_x, y + 12), incident_type, font=subtitle_font, fill=WHITE)
-    
-    y += badge_height + MARGIN
+    # === INCIDENT TYPE BADGE (drawn per alert) ===
+    incident_y = y
+    y += _INCIDENT_BADGE_HEIGHT + _MARGIN
     
     # === SYSTEM TITLE ===
     system_text = "SISTEMA DE ALARMA COMUNITARIA"
-    system_bbox = draw.textbbox((0, 0), system_text, font=subtitle_font)
-    system_width = system_bbox[2] - system_bbox[0]
+    system_width = text_width(system_text, subtitle_font)
     system_x = (width - system_width) // 2
     
     draw.text((system_x + 1, y + 1), system_text, font=subtitle_font, fill='#000000')
-    draw.text((system_x, y), system_text, font=subtitle_font, fill=GOLD)
+    draw.text((system_x, y), system_text, font=subtitle_font, fill=_GOLD)
     
     y += 40  # System title height + margin
     
     # === STATUS BADGE ===
     status_text = "⚡ ACTIVO ⚡"
-    status_bbox = draw.textbbox((0, 0), status_text, font=text_font)
-    status_width = status_bbox[2] - status_bbox[0]
+    status_width = text_width(status_text, text_font)
     status_badge_width = status_width + 30
     status_badge_height = 35
     status_x = (width - status_badge_width) // 2
     
     draw.rounded_rectangle([status_x, y, status_x + status_badge_width, y + status_badge_height],
-                          radius=15, fill=GREEN, outline=WHITE, width=2)
+                          radius=15, fill=_GREEN, outline=_WHITE, width=2)
     
     text_x = (width - status_width) // 2
-    draw.text((text_x, y + 8), status_text, font=text_font, fill=WHITE)
+    draw.text((text_x, y + 8), status_text, font=text_font, fill=_WHITE)
     
-    y += status_badge_height + MARGIN + 10
+    y += status_badge_height + _MARGIN + 10
     
-    # === INFORMATION CARDS ===
-    card_data = [
-        ("📍 UBICACIÓN", street_address.upper(), LIGHT_BLUE),
-        ("👤 REPORTADO POR", contact_name.upper(), CYAN),
-        ("📞 CONTACTO DIRECTO", phone_number, ORANGE)
-    ]
-    
-    for title, content, color in card_data:
-        # Card background
+    # === INFORMATION CARDS (content drawn per alert) ===
+    cards_y = y
+    for title, color in _CARDS:
         card_x = content_x
         card_y = y
         card_w = content_width
-        card_h = CARD_HEIGHT
+        card_h = _CARD_HEIGHT
         
         # Background with slight transparency effect
-        for i in range(card_h):
-            alpha = 0.8 - (i / card_h) * 0.3
-            gray_val = int(40 + (20 * alpha))
-            draw.line([(card_x, card_y + i), (card_x + card_w, card_y + i)], 
-                     fill=(gray_val, gray_val, gray_val))
+        image.paste(_card_background(card_w, card_h), (card_x, card_y))
         
         # Card border
         draw.rounded_rectangle([card_x, card_y, card_x + card_w, card_y + card_h],
                               radius=10, outline=color, width=2)
         
-        # Card text
+        # Card title
         draw.text((card_x + 15, card_y + 8), title, font=header_font, fill=color)
-        draw.text((card_x + 15, card_y + 32), content, font=text_font, fill=WHITE)
         
-        y += CARD_HEIGHT + CARD_SPACING
+        y += _CARD_HEIGHT + _CARD_SPACING
     
     y += 15  # Extra space before emergency
     
     # === EMERGENCY SECTION ===
     emergency_text = "🚨 EMERGENCIAS: 911 🚨"
-    emergency_bbox = draw.textbbox((0, 0), emergency_text, font=subtitle_font)
-    emergency_width = emergency_bbox[2] - emergency_bbox[0]
+    emergency_width = text_width(emergency_text, subtitle_font)
     emergency_button_width = emergency_width + 40
     emergency_button_height = 50
     emergency_x = (width - emergency_button_width) // 2
     
     # Emergency button
     draw.rounded_rectangle([emergency_x, y, emergency_x + emergency_button_width, y + emergency_button_height],
-                          radius=20, fill=RED, outline=GOLD, width=4)
+                          radius=20, fill=_RED, outline=_GOLD, width=4)
     
     # Emergency text
     text_x = (width - emergency_width) // 2
     draw.text((text_x + 1, y + 13 + 1), emergency_text, font=subtitle_font, fill='#000000')
-    draw.text((text_x, y + 13), emergency_text, font=subtitle_font, fill=WHITE)
-    
-    y += emergency_button_height + MARGIN + 15
-    
-    # === FOOTER ===
-    timestamp = datetime.now().strftime("%H:%M hrs • %d/%m/%Y")
+    draw.text((text_x, y + 13), emergency_text, font=subtitle_font, fill=_WHITE)
     
-    # Timestamp
-    timestamp_bbox = draw.textbbox((0, 0), timestamp, font=small_font)
-    timestamp_width = timestamp_bbox[2] - timestamp_bbox[0]
-    timestamp_x = (width - timestamp_width) // 2
-    draw.text((timestamp_x, y), f"⏰ {timestamp}", font=small_font, fill=GRAY)
+    y += emergency_button_height + _MARGIN + 15
     
+    # === FOOTER (timestamp drawn per alert) ===
+    footer_y = y
     y += 25
     
     # Verification
     verification = "🔒 SISTEMA VERIFICADO"
-    verification_bbox = draw.textbbox((0, 0), verification, font=small_font)
-    verification_width = verification_bbox[2] - verification_bbox[0]
+    verification_width = text_width(verification, small_font)
     verification_x = (width - verification_width) // 2
-    draw.text((verification_x, y), verification, font=small_font, fill=GRAY)
-    
-    # Save image
-    timestamp_file = datetime.now().strftime("%Y%m%d_%H%M%S")
-    output_path = f"/Users/bmac/Library/CloudStorage/OneDrive-TheUniversityofMemphis/Other/TT/Alarm_system/precise_emergency_alert_{timestamp_file}.jpg"
-    
-    image.save(output_path, format='JPEG', quality=95, optimize=True)
+    draw.text((verification_x, y), verification, font=small_font, fill=_GRAY)
     
-    return output_path
+    return image, incident_y, cards_y, footer_y
 
-def create_html_template(street_address: str, phone_number: str, contact_name: str = "Vecino", incident_type: str = "ALERTA GENERAL"):
+def _incident_layout(incident_type):
+    """Incident badge geometry for a type: (badge_x, badge_width, text_x)"""
+    incident_width = text_width(incident_type, get_font(32))
+    badge_width = incident_width + 40
+    return (_WIDTH - badge_width) // 2, badge_width, (_WIDTH - incident_width) // 2
+
+# The incident types the pipeline sends; their badge geometry is measured once
+# here, any other type is measured on the spot
+_KNOWN_INCIDENTS = (
+    "ALERTA GENERAL",
+    "EMERGENCIA GENERAL",
+    "EMERGENCIA MÉDICA",
+    "INCENDIO",
+    "ACCIDENTE",
+    "TERREMOTO",
+    "ROBO EN PROGRESO",
+)
+_INCIDENT_LAYOUTS = {incident: _incident_layout(incident) for incident in _KNOWN_INCIDENTS}
+
+def create_precise_emergency_alert(street_address: str, phone_number: str, contact_name: str = "Vecino", incident_type: str = "ALERTA GENERAL",
+                                   output_dir: str = None, output_path: str = None, as_bytes: bool = False):
     """
-    Also create an HTML version for reference
+    Create emergency alert with CSS-like precision and exact spacing
+    
+    Writes the JPEG to output_path, or to a timestamped file in output_dir
+    (default: ALERT_OUTPUT_DIR / the temp dir), and returns its path; with
+    as_bytes the encoded JPEG is returned and nothing touches the disk
     """
+    
+    width = _WIDTH
+    
+    # Start from the pre-rendered chrome; only the alert's own fields are drawn here
+    template, incident_y, cards_y, footer_y = _static_template()
+    image = template.copy()
+    draw = ImageDraw.Draw(image)
+    
+    # Load fonts with exact sizes (cached across calls)
+    subtitle_font = get_font(32)   # 24px equivalent
+    text_font = get_font(20)       # 16px equivalent
+    small_font = get_font(16)      # 12px equivalent
+    
+    # === INCIDENT TYPE BADGE ===
+    y = incident_y
+    badge_x, badge_width, text_x = _INCIDENT_LAYOUTS.get(incident_type) or _incident_layout(incident_type)
+    badge_height = _INCIDENT_BADGE_HEIGHT
+    
+    # Badge background
+    draw.rounded_rectangle([badge_x, y, badge_x + badge_width, y + badge_height], 
+                          radius=20, fill=_RED, outline=_GOLD, width=3)
+    
+    # Badge text
+    draw.text((text_x, y + 12), incident_type, font=subtitle_font, fill=_WHITE)
+    
+    # === INFORMATION CARDS ===
+    card_contents = (street_address.upper(), contact_name.upper(), phone_number)
+    
+    y = cards_y
+    for content in card_contents:
+        draw.text((_PADDING + 15, y + 32), content, font=text_font, fill=_WHITE)
+        y += _CARD_HEIGHT + _CARD_SPACING
+    
+    # === FOOTER ===
     timestamp = datetime.now().strftime("%H:%M hrs • %d/%m/%Y")
     
-    html_content = f"""<!DOCTYPE html>
-<html lang="es">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Alerta de Emergencia</title>
-    <style>
-        body {{
-            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Arial, sans-serif;
-            margin: 0;
-            padding: 20px;
-            background: #f0f0f0;
-            display: flex;
-            justify-content: center;
-            min-height: 100vh;
-        }}
-        
-        .alert-container {{
-            width: 600px;
-            height: 800px;
-            background: linear-gradient(to bottom, #7f1d1d 0%, #dc2626 30%, #ef4444 60%, #dc2626 90%, #991b1b 100%);
-            border: 6px solid #ffffff;
-            position: relative;
-            overflow: hidden;
-        }}
-        
-        .alert-container::after {{
-            content: '';
-            position: absolute;
-            top: 6px;
-            left: 6px;
-            right: 6px;
-            bottom: 6px;
-            border: 2px solid #ffd700;
-            pointer-events: none;
-        }}
-        
-        .content {{
-            padding: 30px;
-            color: white;
-            text-align: center;
-        }}
-        
-        .warning-badge {{
-            width: 60px;
-            height: 60px;
-            background: #ffd700;
-            border: 3px solid white;
-            border-radius: 50%;
-            margin: 20px auto;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            font-size: 24px;
-            font-weight: 900;
-            color: black;
-        }}
-        
-        .main-title {{
-            font-size: 48px;
-            font-weight: 900;
-            margin: 20px 0;
-            text-shadow: 2px 2px 4px rgba(0,0,0,0.8);
-        }}
-        
-        .incident-badge {{
-            background: #dc2626;
-            border: 3px solid #ffd700;
-            border-radius: 20px;
-            padding: 12px 20px;
-            margin: 20px auto;
-            display: inline-block;
-            font-size: 32px;
-            font-weight: 700;
-        }}
-        
-        .system-title {{
-            font-size: 32px;
-            font-weight: 700;
-            color: #ffd700;
-            margin: 20px 0;
-            text-shadow: 1px 1px 2px rgba(0,0,0,0.8);
-        }}
-        
-        .status-badge {{
-            background: #16a34a;
-            border: 2px solid white;
-            border-radius: 15px;
-            padding: 8px 15px;
-            margin: 10px auto 30px;
-            display: inline-block;
-            font-size: 20px;
-            font-weight: 700;
-        }}
-        
-        .info-card {{
-            background: rgba(0,0,0,0.3);
-            border: 2px solid;
-            border-radius: 10px;
-            padding: 15px;
-            margin: 15px 0;
-            text-align: left;
-            height: 60px;
-            display: flex;
-            flex-direction: column;
-            justify-content: center;
-        }}
-        
-        .info-card.location {{ border-color: #87ceeb; }}
-        .info-card.contact {{ border-color: #00ffff; }}
-        .info-card.phone {{ border-color: #ffa500; }}
-        
-        .card-title {{
-            font-size: 18px;
-            font-weight: 600;
-            margin-bottom: 5px;
-        }}
-        
-        .location .card-title {{ color: #87ceeb; }}
-        .contact .card-title {{ color: #00ffff; }}
-        .phone .card-title {{ color: #ffa500; }}
-        
-        .card-content {{
-            font-size: 20px;
-            font-weight: 700;
-        }}
-        
-        .emergency-button {{
-            background: #dc2626;
-            border: 4px solid #ffd700;
-            border-radius: 20px;
-            padding: 13px 20px;
-            margin: 25px auto;
-            font-size: 32px;
-            font-weight: 900;
-            color: white;
-            text-shadow: 1px 1px 2px rgba(0,0,0,0.8);
-        }}
-        
-        .footer {{
-            margin-top: 25px;
-            font-size: 16px;
-            color: #9ca3af;
-        }}
-    </style>
-</head>
-<body>
-    <div class="alert-container">
-        <div class="content">
-            <div class="warning-badge">!</div>
-            <div class="main-title">🚨 EMERGENCIA 🚨</div>
-            <div class="incident-badge">{incident_type}</div>
-            <div class="system-title">SISTEMA DE ALARMA COMUNITARIA</div>
-            <div class="status-badge">⚡ ACTIVO ⚡</div>
-            
-            <div class="info-card location">
-                <div class="card-title">📍 UBICACIÓN</div>
-                <div class="card-content">{street_address.upper()}</div>
-            </div>
-            
-            <div class="info-card contact">
-                <div class="card-title">👤 REPORTADO POR</div>
-                <div class="card-content">{contact_name.upper()}</div>
-            </div>
-            
-            <div class="info-card phone">
-                <div class="card-title">📞 CONTACTO DIRECTO</div>
-                <div class="card-content">{phone_number}</div>
-            </div>
-            
-            <div class="emergency-button">🚨 EMERGENCIAS: 911 🚨</div>
-            
-            <div class="footer">
-                ⏰ {timestamp}<br>
-                🔒 SISTEMA VERIFICADO
-            </div>
-        </div>
-    </div>
-</body>
-</html>"""
-    
-    # Save HTML file
-    timestamp_file = datetime.now().strftime("%Y%m%d_%H%M%S")
-    html_path = f"/Users/bmac/Library/CloudStorage/OneDrive-TheUniversityofMemphis/Other/TT/Alarm_system/emergency_alert_{timestamp_file}.html"
-    
-    with open(html_path, 'w', encoding='utf-8') as f:
-        f.write(html_content)
-    
-    return html_path
+    # Timestamp
+    timestamp_width = text_width(timestamp, small_font)
+    timestamp_x = (width - timestamp_width) // 2
+    draw.text((timestamp_x, footer_y), f"⏰ {timestamp}", font=small_font, fill=_GRAY)
+    
+    return save_alert_jpeg(image, "precise_emergency_alert", output_dir, output_path, as_bytes)
 
 def test_precise_design():
     """Test the precise CSS-like design"""
@@ -485,19 +299,22 @@ def test_precise_design():
             test_case['incident_type']
         )
         
-        # Create HTML version for reference
-        html_path = create_html_template(
-            test_case['street_address'],
-            test_case['phone_number'],
-            test_case['contact_name'],
-            test_case['incident_type']
-        )
+        # Create HTML version for reference (debug only)
+        html_path = None
+        if os.getenv("DEBUG_SAVE_HTML"):
+            html_path = create_html_template(
+                test_case['street_address'],
+                test_case['phone_number'],
+                test_case['contact_name'],
+                test_case['incident_type']
+            )
         
         if os.path.exists(image_path):
             file_size = os.path.getsize(image_path)
             print(f"✅ Image created: {os.path.basename(image_path)}")
             print(f"📊 Size: {file_size} bytes")
-            print(f"📄 HTML reference: {os.path.basename(html_path)}")
+            if html_path:
+                print(f"📄 HTML reference: {os.path.basename(html_path)}")
             
             print(f"\n🎯 Precise Design Features:")
             print(f"   ✅ CSS-like exact measurements")
@@ -506,7 +323,6 @@ def test_precise_design():
             print(f"   ✅ Proper spacing between elements")
             print(f"   ✅ Professional layout flow")
             print(f"   ✅ No overlapping or cramped elements")
-            print(f"   ✅ HTML reference for comparison")
             
             return image_path
         else:
@@ -522,6 +338,6 @@ if __name__ == "__main__":
     if result:
         print(f"\n🏆 PRECISE design test completed!")
         print(f"📱 Perfect CSS-like layout with exact measurements!")
-        print(f"💡 Open the HTML file in your browser to see the reference design")
+        print(f"💡 Set DEBUG_SAVE_HTML=1 to also write the HTML reference design")
     else:
         print(f"\n❌ Test failed!")
\ No newline at end of file
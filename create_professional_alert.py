@@ -3,11 +3,36 @@
 Create a professional-looking emergency alert image with modern design
 """
 
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageDraw, ImageOps
+import numpy as np
+import functools
 import os
 from datetime import datetime
 
-def create_professional_emergency_alert(street_address: str, phone_number: str, contact_name: str = "Vecino"):
+from _alert_common import get_font, save_alert_jpeg, text_width
+
+@functools.lru_cache(maxsize=1)
+def _gradient_background(width, height):
+    """
+    Dark red to bright red vertical gradient with a faint diagonal line every
+    40px, built with whole-image ops (no draw.line per row or per stripe);
+    cached, so callers draw on a copy
+    """
+    # From dark red to bright red, with a slight red tint: a two-stop ramp, so
+    # Pillow's own 0-255 ramp (as a 1px column) colorized and stretched
+    ramp = Image.linear_gradient('L').resize((1, height))
+    gradient = ImageOps.colorize(ramp, black=(139, 0, 0), white=(255, 69, 0)).resize((width, height), Image.NEAREST)
+    pixels = np.array(gradient)
+    
+    # Diagonal pattern overlay for texture: white at alpha 20 on the x + y = 40k
+    # lines (draw.line on an RGB image used to drop the alpha and paint them opaque)
+    stripes = np.add.outer(np.arange(height), np.arange(width)) % 40 == 0
+    under = pixels[stripes].astype(np.uint16)
+    pixels[stripes] = under + (255 - under) * 20 // 255
+    return Image.fromarray(pixels)
+
+def create_professional_emergency_alert(street_address: str, phone_number: str, contact_name: str = "Vecino",
+                                        output_dir: str = None, output_path: str = None, as_bytes: bool = False):
     """
     Create a professional, modern emergency alert image
     
@@ -15,74 +40,28 @@ def create_professional_emergency_alert(street_address: str, phone_number: str,
         street_address: Street address to display
         phone_number: Phone number to display  
         contact_name: Name of the person reporting
+        output_dir: Directory for the generated file (defaults to ALERT_OUTPUT_DIR / the temp dir)
+        output_path: Exact file to write (overrides output_dir)
+        as_bytes: Return the JPEG bytes instead of writing a file
     
     Returns:
-        str: Path to the generated image
+        str: Path to the generated image (bytes when as_bytes is set)
     """
     
     # Modern dimensions (16:9 aspect ratio, Instagram-friendly)
     width, height = 1080, 1080
     
-    # Create base image with gradient background
-    image = Image.new('RGB', (width, height), color='#000000')
+    # Create base image with gradient background (dark red to red)
+    # (diagonal texture overlay included; the cached image is never drawn on)
+    image = _gradient_background(width, height).copy()
     draw = ImageDraw.Draw(image)
     
-    # Create gradient background (dark red to red)
-    for y in range(height):
-        # Calculate gradient from dark red to bright red
-        ratio = y / height
-        r = int(139 + (255 - 139) * ratio)  # From dark red to bright red
-        g = int(0 + (69 - 0) * ratio)       # Dark to slight red tint
-        b = int(0 + (0 - 0) * ratio)        # Stay at 0
-        color = (r, g, b)
-        draw.line([(0, y), (width, y)], fill=color)
-    
-    # Add diagonal pattern overlay for texture
-    for i in range(0, width + height, 40):
-        draw.line([(i, 0), (i - height, height)], fill=(255, 255, 255, 20), width=1)
-    
-    # Load fonts
-    try:
-        # Try to load system fonts
-        font_paths = [
-            "/System/Library/Fonts/Helvetica.ttc",  # macOS
-            "/System/Library/Fonts/Arial.ttf",      # macOS fallback
-            "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",  # Linux
-            "C:/Windows/Fonts/arial.ttf",           # Windows
-        ]
-        
-        title_font = None
-        header_font = None
-        main_font = None
-        detail_font = None
-        small_font = None
-        
-        for font_path in font_paths:
-            if os.path.exists(font_path):
-                try:
-                    title_font = ImageFont.truetype(font_path, 85)   # Large title
-                    header_font = ImageFont.truetype(font_path, 65)  # Headers
-                    main_font = ImageFont.truetype(font_path, 45)    # Main text
-                    detail_font = ImageFont.truetype(font_path, 38)  # Details
-                    small_font = ImageFont.truetype(font_path, 28)   # Small text
-                    break
-                except Exception:
-                    continue
-        
-        # Fallback to default font
-        if not title_font:
-            title_font = ImageFont.load_default()
-            header_font = ImageFont.load_default()
-            main_font = ImageFont.load_default()
-            detail_font = ImageFont.load_default()
-            small_font = ImageFont.load_default()
-            
-    except Exception:
-        title_font = ImageFont.load_default()
-        header_font = ImageFont.load_default()
-        main_font = ImageFont.load_default()
-        detail_font = ImageFont.load_default()
-        small_font = ImageFont.load_default()
+    # Load fonts (cached across calls)
+    title_font = get_font(85)   # Large title
+    header_font = get_font(65)  # Headers
+    main_font = get_font(45)    # Main text
+    detail_font = get_font(38)  # Details
+    small_font = get_font(28)   # Small text
     
     # Define colors
     white = '#FFFFFF'
@@ -127,7 +106,7 @@ def create_professional_emergency_alert(street_address: str, phone_number: str,
     
     # Draw exclamation mark in triangle
     draw.line([(triangle_x, triangle_y - 15), (triangle_x, triangle_y + 5)], fill='#000000', width=6)
-    draw.ellipse([(triangle_x-3, triangle_y + 12), (triangle_x+3, triangle_y + 18)], fill='#000000')
+    draw.rectangle([(triangle_x-3, triangle_y + 12), (triangle_x+3, triangle_y + 18)], fill='#000000')
     
     # Generate timestamp
     timestamp = datetime.now().strftime("%H:%M hrs - %d/%m/%Y")
@@ -144,8 +123,8 @@ def create_professional_emergency_alert(street_address: str, phone_number: str,
     y_pos += 100
     
     # Status indicator
-    draw_rounded_rectangle(draw, (width//2 - 180, y_pos - 10), (width//2 + 180, y_pos + 50), 
-                          fill='#FF4444', outline=white, corner_radius=25, width=3)
+    draw.rounded_rectangle([width//2 - 180, y_pos - 10, width//2 + 180, y_pos + 50],
+                           radius=25, fill='#FF4444', outline=white, width=3)
     draw_text_with_shadow(draw, "🚨 ACTIVADO", width//2, y_pos + 20, main_font, white, center=True)
     y_pos += 120
     
@@ -168,49 +147,37 @@ def create_professional_emergency_alert(street_address: str, phone_number: str,
     y_pos += 80
     
     # Emergency contact
-    draw_rounded_rectangle(draw, (80, y_pos), (width - 80, y_pos + 70), 
-                          fill='#CC0000', outline=white, corner_radius=15, width=2)
+    draw.rounded_rectangle([80, y_pos, width - 80, y_pos + 70],
+                           radius=15, fill='#CC0000', outline=white, width=2)
     draw_text_with_shadow(draw, "🚨 EMERGENCIAS: 911", width//2, y_pos + 35, main_font, white, center=True)
     y_pos += 100
     
     # Timestamp at bottom
     draw_text_with_shadow(draw, f"⏰ {timestamp}", width//2, height - 60, small_font, '#CCCCCC', center=True)
     
-    # Generate unique filename
-    timestamp_file = datetime.now().strftime("%Y%m%d_%H%M%S")
-    output_path = f"/Users/bmac/Library/CloudStorage/OneDrive-TheUniversityofMemphis/Other/TT/Alarm_system/professional_alert_{timestamp_file}.jpg"
-    
-    # Save with high quality
-    image.save(output_path, format='JPEG', quality=95, optimize=True)
-    
-    return output_path
+    return save_alert_jpeg(image, "professional_alert", output_dir, output_path, as_bytes)
+
+@functools.lru_cache(maxsize=256)
+def _text_mask(text, font):
+    """
+    Text rasterized once into an L mask cropped to its bbox, plus the bbox
+    offset from the draw position; the shadow and the fill both stamp it
+    """
+    left, top, right, bottom = font.getbbox(text)
+    mask = Image.new('L', (max(right - left, 1), max(bottom - top, 1)), 0)
+    ImageDraw.Draw(mask).text((-left, -top), text, font=font, fill=255)
+    return mask, (left, top)
 
 def draw_text_with_shadow(draw, text, x, y, font, color, center=False, shadow_color='#000000', shadow_offset=2):
     """Draw text with drop shadow for better readability"""
     if center:
-        bbox = draw.textbbox((0, 0), text, font=font)
-        text_width = bbox[2] - bbox[0]
-        x = x - text_width // 2
+        x = x - text_width(text, font) // 2
     
+    mask, (left, top) = _text_mask(text, font)
     # Draw shadow
-    draw.text((x + shadow_offset, y + shadow_offset), text, font=font, fill=shadow_color)
+    draw.bitmap((x + left + shadow_offset, y + top + shadow_offset), mask, fill=shadow_color)
     # Draw main text
-    draw.text((x, y), text, font=font, fill=color)
-
-def draw_rounded_rectangle(draw, top_left, bottom_right, fill=None, outline=None, corner_radius=10, width=1):
-    """Draw a rounded rectangle"""
-    x1, y1 = top_left
-    x2, y2 = bottom_right
-    
-    # Draw main rectangle
-    draw.rectangle([x1, y1 + corner_radius, x2, y2 - corner_radius], fill=fill, outline=outline, width=width)
-    draw.rectangle([x1 + corner_radius, y1, x2 - corner_radius, y2], fill=fill, outline=outline, width=width)
-    
-    # Draw corners
-    draw.ellipse([x1, y1, x1 + 2*corner_radius, y1 + 2*corner_radius], fill=fill, outline=outline, width=width)
-    draw.ellipse([x2 - 2*corner_radius, y1, x2, y1 + 2*corner_radius], fill=fill, outline=outline, width=width)
-    draw.ellipse([x1, y2 - 2*corner_radius, x1 + 2*corner_radius, y2], fill=fill, outline=outline, width=width)
-    draw.ellipse([x2 - 2*corner_radius, y2 - 2*corner_radius, x2, y2], fill=fill, outline=outline, width=width)
+    draw.bitmap((x + left, y + top), mask, fill=color)
 
 def test_professional_design():
     """Test the new professional design"""
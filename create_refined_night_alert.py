@@ -9,6 +9,8 @@ from datetime import datetime
 import random
 import math
 
+from _alert_common import night_gradient
+
 def create_refined_night_emergency_alert(
     # === REQUIRED DYNAMIC PARAMETERS ===
     street_address: str,
@@ -51,29 +53,9 @@ def create_refined_night_emergency_alert(
     width = 600
     height = 820  # Increased height to prevent cutoff
     
-    # Create image with dark background
-    image = Image.new('RGB', (width, height), color='#0F172A')
-    draw = ImageDraw.Draw(image)
-    
     # === DARK BLUISH GRADIENT ===
-    for y in range(height):
-        ratio = y / height
-        if ratio < 0.3:
-            r = int(15 + (30 - 15) * (ratio / 0.3))
-            g = int(23 + (58 - 23) * (ratio / 0.3))  
-            b = int(42 + (138 - 42) * (ratio / 0.3))
-        elif ratio < 0.7:
-            mid_ratio = (ratio - 0.3) / 0.4
-            r = int(30 + (45 - 30) * mid_ratio)
-            g = int(58 + (78 - 58) * mid_ratio)
-            b = int(138 + (158 - 138) * mid_ratio)
-        else:
-            bottom_ratio = (ratio - 0.7) / 0.3
-            r = int(45 + (20 - 45) * bottom_ratio)
-            g = int(78 + (35 - 78) * bottom_ratio)
-            b = int(158 + (65 - 158) * bottom_ratio)
-        
-        draw.line([(0, y), (width, y)], fill=(r, g, b))
+    image = night_gradient(width, height)
+    draw = ImageDraw.Draw(image)
     
     # === MINIMALISTIC CITY BACKGROUND LINES ===
     # Removed city lines as requested
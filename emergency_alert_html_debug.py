@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+HTML version of the precise emergency alert, written next to the images as a
+layout reference when debugging (not part of alert generation)
+"""
+
+import os
+from datetime import datetime
+
+from _alert_common import OUTPUT_DIR
+
+def create_html_template(street_address: str, phone_number: str, contact_name: str = "Vecino", incident_type: str = "ALERTA GENERAL"):
+    """
+    Write an HTML version of the precise alert for reference; returns its path
+    """
+    timestamp = datetime.now().strftime("%H:%M hrs • %d/%m/%Y")
+    
+    html_content = f"""<!DOCTYPE html>
+<html lang="es">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Alerta de Emergencia</title>
+    <style>
+        body {{
+            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Arial, sans-serif;
+            margin: 0;
+            padding: 20px;
+            background: #f0f0f0;
+            display: flex;
+            justify-content: center;
+            min-height: 100vh;
+        }}
+        
+        .alert-container {{
+            width: 600px;
+            height: 800px;
+            background: linear-gradient(to bottom, #7f1d1d 0%, #dc2626 30%, #ef4444 60%, #dc2626 90%, #991b1b 100%);
+            border: 6px solid #ffffff;
+            position: relative;
+            overflow: hidden;
+        }}
+        
+        .alert-container::after {{
+            content: '';
+            position: absolute;
+            top: 6px;
+            left: 6px;
+            right: 6px;
+            bottom: 6px;
+            border: 2px solid #ffd700;
+            pointer-events: none;
+        }}
+        
+        .content {{
+            padding: 30px;
+            color: white;
+            text-align: center;
+        }}
+        
+        .warning-badge {{
+            width: 60px;
+            height: 60px;
+            background: #ffd700;
+            border: 3px solid white;
+            border-radius: 50%;
+            margin: 20px auto;
+            display: flex;
+            align-items: center;
+            justify-content: center;
+            font-size: 24px;
+            font-weight: 900;
+            color: black;
+        }}
+        
+        .main-title {{
+            font-size: 48px;
+            font-weight: 900;
+            margin: 20px 0;
+            text-shadow: 2px 2px 4px rgba(0,0,0,0.8);
+        }}
+        
+        .incident-badge {{
+            background: #dc2626;
+            border: 3px solid #ffd700;
+            border-radius: 20px;
+            padding: 12px 20px;
+            margin: 20px auto;
+            display: inline-block;
+            font-size: 32px;
+            font-weight: 700;
+        }}
+        
+        .system-title {{
+            font-size: 32px;
+            font-weight: 700;
+            color: #ffd700;
+            margin: 20px 0;
+            text-shadow: 1px 1px 2px rgba(0,0,0,0.8);
+        }}
+        
+        .status-badge {{
+            background: #16a34a;
+            border: 2px solid white;
+            border-radius: 15px;
+            padding: 8px 15px;
+            margin: 10px auto 30px;
+            display: inline-block;
+            font-size: 20px;
+            font-weight: 700;
+        }}
+        
+        .info-card {{
+            background: rgba(0,0,0,0.3);
+            border: 2px solid;
+            border-radius: 10px;
+            padding: 15px;
+            margin: 15px 0;
+            text-align: left;
+            height: 60px;
+            display: flex;
+            flex-direction: column;
+            justify-content: center;
+        }}
+        
+        .info-card.location {{ border-color: #87ceeb; }}
+        .info-card.contact {{ border-color: #00ffff; }}
+        .info-card.phone {{ border-color: #ffa500; }}
+        
+        .card-title {{
+            font-size: 18px;
+            font-weight: 600;
+            margin-bottom: 5px;
+        }}
+        
+        .location .card-title {{ color: #87ceeb; }}
+        .contact .card-title {{ color: #00ffff; }}
+        .phone .card-title {{ color: #ffa500; }}
+        
+        .card-content {{
+            font-size: 20px;
+            font-weight: 700;
+        }}
+        
+        .emergency-button {{
+            background: #dc2626;
+            border: 4px solid #ffd700;
+            border-radius: 20px;
+            padding: 13px 20px;
+            margin: 25px auto;
+            font-size: 32px;
+            font-weight: 900;
+            color: white;
+            text-shadow: 1px 1px 2px rgba(0,0,0,0.8);
+        }}
+        
+        .footer {{
+            margin-top: 25px;
+            font-size: 16px;
+            color: #9ca3af;
+        }}
+    </style>
+</head>
+<body>
+    <div class="alert-container">
+        <div class="content">
+            <div class="warning-badge">!</div>
+            <div class="main-title">🚨 EMERGENCIA 🚨</div>
+            <div class="incident-badge">{incident_type}</div>
+            <div class="system-title">SISTEMA DE ALARMA COMUNITARIA</div>
+            <div class="status-badge">⚡ ACTIVO ⚡</div>
+            
+            <div class="info-card location">
+                <div class="card-title">📍 UBICACIÓN</div>
+                <div class="card-content">{street_address.upper()}</div>
+            </div>
+            
+            <div class="info-card contact">
+                <div class="card-title">👤 REPORTADO POR</div>
+                <div class="card-content">{contact_name.upper()}</div>
+            </div>
+            
+            <div class="info-card phone">
+                <div class="card-title">📞 CONTACTO DIRECTO</div>
+                <div class="card-content">{phone_number}</div>
+            </div>
+            
+            <div class="emergency-button">🚨 EMERGENCIAS: 911 🚨</div>
+            
+            <div class="footer">
+                ⏰ {timestamp}<br>
+                🔒 SISTEMA VERIFICADO
+            </div>
+        </div>
+    </div>
+</body>
+</html>"""
+    
+    # Save HTML file
+    timestamp_file = datetime.now().strftime("%Y%m%d_%H%M%S")
+    html_path = os.path.join(OUTPUT_DIR, f"emergency_alert_{timestamp_file}.html")
+    
+    with open(html_path, 'w', encoding='utf-8') as f:
+        f.write(html_content)
+    
+    return html_path
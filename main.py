@@ -1,4 +1,6 @@
 import os
+import asyncio
+import importlib
 import uvicorn
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.responses import JSONResponse
@@ -595,7 +597,9 @@ async def send_animated_siren():
         if not os.path.exists(gif_path):
             try:
                 from create_animated_siren import create_animated_siren_gif
-                create_animated_siren_gif()
+                # Multi-frame PIL render: run it in a worker thread so the
+                # event loop keeps serving webhooks meanwhile
+                await asyncio.to_thread(create_animated_siren_gif)
                 print(f"✅ Created animated siren GIF: {gif_path}")
             except Exception as e:
                 return JSONResponse(content={
@@ -751,6 +755,39 @@ async def device_register(request: Request):
         print(f"Device registration error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Registration failed: {str(e)}")
 
+_pipeline_warmup_task = None
+
+@app.on_event("startup")
+async def warm_emergency_pipeline():
+    """Import the emergency pipeline (PIL, renderer, services) and start its render workers in the background"""
+    global _pipeline_warmup_task
+    
+    async def _warm():
+        try:
+            pipeline = await asyncio.to_thread(importlib.import_module, "create_full_emergency_pipeline")
+            await pipeline.warm_render_pool()
+            print("🔥 Emergency pipeline pre-loaded (renderer and workers ready)")
+        except Exception as e:
+            print(f"⚠️ Emergency pipeline warm-up warning: {str(e)}")
+    
+    _pipeline_warmup_task = asyncio.create_task(_warm())
+
+@app.on_event("shutdown")
+async def close_shared_http_client():
+    """Finish pending audit writes, then close the pooled HTTP clients shared by the emergency pipeline"""
+    try:
+        from create_full_emergency_pipeline import close_openai_session, drain_pending_audits
+        await drain_pending_audits()
+        await close_openai_session()
+    except Exception as e:
+        print(f"⚠️ Emergency pipeline shutdown warning: {str(e)}")
+    
+    try:
+        from app.services.http_client import close_http_client
+        await close_http_client()
+    except Exception as e:
+        print(f"⚠️ HTTP client shutdown warning: {str(e)}")
+
 if __name__ == "__main__":
     uvicorn.run(
         "main:app",
@@ -8,7 +8,7 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from create_full_emergency_pipeline import execute_full_emergency_pipeline
+from create_full_emergency_pipeline import EmergencyContext, execute_full_emergency_pipeline
 
 async def test_simple_sos():
     """Test SOS INCENDIO emergency pipeline"""
@@ -17,7 +17,7 @@ async def test_simple_sos():
     print("=" * 50)
     
     # Test SOS INCENDIO
-    success = await execute_full_emergency_pipeline(
+    success = await execute_full_emergency_pipeline(EmergencyContext(
         incident_type="INCENDIO",
         street_address="Calle de Prueba 123",
         emergency_number="BOMBEROS 132",
@@ -28,7 +28,7 @@ async def test_simple_sos():
         device_id="10011eafd1",
         blink_cycles=2,  # Shorter for testing
         voice_text="Emergencia de incendio reportada en Calle de Prueba ciento veintitrés. Contacto de emergencia: Bomberos uno tres dos. Reportado por Waldo. Evacúen el área inmediatamente."
-    )
+    ))
     
     if success:
         print(f"\n✅ SOS INCENDIO test successful!")
@@ -0,0 +1,156 @@
+import pytest
+from collections import OrderedDict
+from unittest.mock import Mock, patch
+
+aiohttp = pytest.importorskip("aiohttp")
+
+import create_full_emergency_pipeline as pipeline
+
+BUNDLE_ARGS = ("ROBO", "Calle 1", "Ana", "56912345678", "133", "Vecinos Centro")
+
+@pytest.fixture(autouse=True)
+def openai_key(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test_key")
+    pipeline._bundle_cache.clear()
+    yield
+    pipeline._bundle_cache.clear()
+
+def fake_stream(deltas, events=None):
+    """Stand-in for _stream_openai_chat that yields the given deltas"""
+    async def stream(headers, payload, attempts=3):
+        for delta in deltas:
+            if events is not None:
+                events.append(delta)
+            yield delta
+    return stream
+
+@pytest.mark.asyncio
+async def test_bundle_splits_text_and_voice_at_separator():
+    """Test that the streamed reply is split into the text and voice messages"""
+    deltas = ["🚨 EMERGENCIA", " ACTIVADA 🚨\n", "===VOZ===\n", "Atención vecinos, ", "robo en Calle 1."]
+    on_text = Mock()
+    
+    with patch.object(pipeline, '_stream_openai_chat', fake_stream(deltas)):
+        bundle = await pipeline.generate_intelligent_emergency_bundle(*BUNDLE_ARGS, on_text=on_text)
+    
+    assert bundle == {"text_message": "🚨 EMERGENCIA ACTIVADA 🚨", "voice_message": "Atención vecinos, robo en Calle 1."}
+    on_text.assert_called_once_with("🚨 EMERGENCIA ACTIVADA 🚨")
+
+@pytest.mark.asyncio
+async def test_bundle_finds_separator_split_across_deltas():
+    """Test that a separator arriving in pieces is found, and the text is handed over before the voice part ends"""
+    events = []
+    deltas = ["Texto de alerta\n==", "=V", "OZ", "=", "==\nVoz", " de alerta"]
+    
+    with patch.object(pipeline, '_stream_openai_chat', fake_stream(deltas, events)):
+        bundle = await pipeline.generate_intelligent_emergency_bundle(
+            *BUNDLE_ARGS, on_text=lambda text: events.append(("text", text))
+        )
+    
+    assert bundle == {"text_message": "Texto de alerta", "voice_message": "Voz de alerta"}
+    assert events.index(("text", "Texto de alerta")) == deltas.index("==\nVoz") + 1
+
+@pytest.mark.asyncio
+async def test_bundle_without_separator_raises():
+    """Test that a reply without the separator line is rejected and not cached"""
+    on_text = Mock()
+    
+    with patch.object(pipeline, '_stream_openai_chat', fake_stream(["Solo texto, ", "sin mensaje de voz"])):
+        with pytest.raises(Exception, match="missing the voice message"):
+            await pipeline.generate_intelligent_emergency_bundle(*BUNDLE_ARGS, on_text=on_text)
+    
+    on_text.assert_not_called()
+    assert len(pipeline._bundle_cache) == 0
+
+@pytest.mark.asyncio
+async def test_bundle_reuses_cached_pair():
+    """Test that a repeat alert with the same inputs skips OpenAI"""
+    with patch.object(pipeline, '_stream_openai_chat', fake_stream(["Texto\n===VOZ===\nVoz"])):
+        first = await pipeline.generate_intelligent_emergency_bundle(*BUNDLE_ARGS)
+    
+    with patch.object(pipeline, '_stream_openai_chat', Mock(side_effect=AssertionError("OpenAI called"))):
+        second = await pipeline.generate_intelligent_emergency_bundle(*BUNDLE_ARGS)
+    
+    assert second == first
+
+def test_cache_entries_expire_after_ttl():
+    """Test that cached values are dropped once their TTL has passed"""
+    cache = OrderedDict()
+    clock = [1000.0]
+    
+    with patch('time.monotonic', lambda: clock[0]):
+        pipeline._cache_put(cache, ("key",), "value")
+        clock[0] += pipeline._MSG_CACHE_TTL - 1
+        assert pipeline._cache_get(cache, ("key",)) == "value"
+        
+        clock[0] += 1
+        assert pipeline._cache_get(cache, ("key",)) is None
+        assert ("key",) not in cache
+
+def test_cache_evicts_least_recently_used():
+    """Test that the cache keeps at most max_size entries, dropping the least recently used"""
+    cache = OrderedDict()
+    pipeline._cache_put(cache, ("a",), 1, max_size=2)
+    pipeline._cache_put(cache, ("b",), 2, max_size=2)
+    pipeline._cache_get(cache, ("a",))
+    pipeline._cache_put(cache, ("c",), 3, max_size=2)
+    
+    assert list(cache) == [("a",), ("c",)]
+
+class FakeResponse:
+    """aiohttp response stand-in with a streamed body of SSE lines"""
+    
+    def __init__(self, status, lines=(), error=None):
+        self.status = status
+        self.content = self._content(lines, error)
+    
+    async def _content(self, lines, error):
+        for line in lines:
+            yield line
+        if error is not None:
+            raise error
+    
+    async def text(self):
+        return "error"
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        return False
+
+def sse(content):
+    return b'data: {"choices": [{"delta": {"content": "%s"}}]}\n' % content.encode()
+
+async def collect_stream(session):
+    async def get_session():
+        return session
+    
+    with patch.object(pipeline, '_get_openai_session', get_session), \
+         patch.object(pipeline.random, 'random', return_value=0.0):
+        return [delta async for delta in pipeline._stream_openai_chat({}, {})]
+
+@pytest.mark.asyncio
+async def test_stream_retries_transient_errors_before_first_chunk():
+    """Test that a 503 before any content is retried on the same session"""
+    session = Mock()
+    session.post = Mock(side_effect=[
+        FakeResponse(503),
+        FakeResponse(200, [sse("Hola"), sse(" vecinos"), b"data: [DONE]\n"]),
+    ])
+    
+    assert await collect_stream(session) == ["Hola", " vecinos"]
+    assert session.post.call_count == 2
+
+@pytest.mark.asyncio
+async def test_stream_does_not_retry_after_content():
+    """Test that a connection drop after content was yielded is raised instead of repeating the reply"""
+    session = Mock()
+    session.post = Mock(side_effect=[
+        FakeResponse(200, [sse("Hola")], error=aiohttp.ClientPayloadError("connection lost")),
+        FakeResponse(200, [sse("Hola"), b"data: [DONE]\n"]),
+    ])
+    
+    with pytest.raises(aiohttp.ClientPayloadError):
+        await collect_stream(session)
+    assert session.post.call_count == 1
@@ -1,6 +1,7 @@
 import pytest
 from unittest.mock import Mock, patch, AsyncMock
 from app.services.ewelink_service import EWeLinkService
+from app.services.http_client import DEFAULT_TIMEOUT
 from app.models import EWeLinkDevice, DeviceStatus
 
 @pytest.fixture
@@ -180,6 +181,44 @@ async def test_control_device_blink_command(ewelink_service):
         payload = call_args[1]['json']
         assert 'pulse' in payload['params'] or 'switch' in payload['params']
 
+@pytest.mark.asyncio
+async def test_control_device_sequence_reuses_one_client(ewelink_service):
+    """Test that a blink sequence sends every command over a single client"""
+    mock_response_data = {"error": 0}
+    
+    with patch('httpx.AsyncClient') as mock_client, \
+         patch('asyncio.sleep', new=AsyncMock()):
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = mock_response_data
+        mock_post = AsyncMock(return_value=mock_response)
+        mock_client.return_value.__aenter__.return_value.post = mock_post
+        
+        results = await ewelink_service.control_device_sequence(
+            "device123", [("ON", 0.0), ("OFF", 0.5), ("ON", 0.5), ("OFF", 0.5)]
+        )
+        
+        assert results == [True, True, True, True]
+        assert mock_client.call_count == 1
+        switches = [call[1]['json']['params']['switch'] for call in mock_post.call_args_list]
+        assert switches == ['on', 'off', 'on', 'off']
+
+@pytest.mark.asyncio
+async def test_control_device_keeps_default_timeout_on_shared_client():
+    """Test that device commands over the shared client keep httpx's default timeout, not the client's 60s"""
+    mock_response = Mock()
+    mock_response.status_code = 200
+    mock_response.json.return_value = {"error": 0}
+    shared_client = Mock()
+    shared_client.post = AsyncMock(return_value=mock_response)
+    service = EWeLinkService(http_client=shared_client)
+    
+    with patch.object(service, 'access_token', 'test_token'):
+        result = await service.control_device("device123", "ON")
+        
+        assert result is True
+        assert shared_client.post.call_args.kwargs['timeout'] == DEFAULT_TIMEOUT
+
 @pytest.mark.asyncio
 async def test_get_device_status_success(ewelink_service):
     """Test successful device status retrieval"""
@@ -0,0 +1,44 @@
+import io
+import pytest
+
+pytest.importorskip("PIL")
+pytest.importorskip("playwright")
+
+from PIL import Image, ImageDraw
+import create_html_emergency_alert as alert
+
+LONG_STREET = "AVENIDA LIBERTADOR BERNARDO O'HIGGINS 3456 DEPARTAMENTO 1203"
+
+@pytest.fixture
+def draw():
+    return ImageDraw.Draw(Image.new('RGB', (alert._CARD_WIDTH, 100)))
+
+def test_fit_text_keeps_short_values(draw):
+    """Test that values that fit are drawn unchanged"""
+    text, font = alert._fit_text(draw, "CALLE 1", 22, 400)
+
+    assert text == "CALLE 1"
+    assert font.size == 22
+
+def test_fit_text_truncates_long_values(draw):
+    """Test that a value too wide at the minimum size ends in an ellipsis"""
+    max_width = alert._CARD_WIDTH - 2 * alert._CARD_PADDING - 40
+    text, font = alert._fit_text(draw, LONG_STREET, 22, max_width)
+
+    assert text.endswith("…")
+    assert LONG_STREET.startswith(text[:-1])
+    assert font.size == 14
+    assert draw.textlength(text, font=font) <= max_width
+
+def test_long_address_stays_inside_location_card():
+    """Test that a long street address is not drawn past the UBICACIÓN card edge"""
+    jpeg = alert.render_emergency_alert_pil_bytes(LONG_STREET, "56912345678", "Vecino",
+                                                   "ALERTA GENERAL", "")
+    image = Image.open(io.BytesIO(jpeg)).convert('L')
+    _, info_top = alert._base_card("ALERTA GENERAL")
+
+    # Strip between the end of the value area and the card's right border
+    card_right = alert._CARD_WIDTH - alert._CARD_PADDING
+    strip = image.crop((card_right - 18, info_top + 45, card_right - 4, info_top + 80))
+
+    assert strip.getextrema()[1] < 200  # no white text pixels
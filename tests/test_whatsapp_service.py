@@ -1,6 +1,8 @@
+import asyncio
+import time
 import pytest
 from unittest.mock import Mock, patch, AsyncMock
-from app.services.whatsapp_service import WhatsAppService
+from app.services.whatsapp_service import WhatsAppService, WhatsAppCircuitBreaker, _send_locks, _last_send_at
 from app.models import WhatsAppMessage
 
 @pytest.fixture
@@ -140,6 +142,89 @@ async def test_send_voice_message_with_file_upload_success(whatsapp_service):
         
         assert result is True
 
+@pytest.mark.asyncio
+async def test_send_image_message_from_bytes_success(whatsapp_service):
+    """Test sending an in-memory image without touching disk"""
+    with patch('httpx.AsyncClient') as mock_client:
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_post = AsyncMock(return_value=mock_response)
+        mock_client.return_value.__aenter__.return_value.post = mock_post
+        
+        result = await whatsapp_service.send_image_message_from_bytes("+1234567890", b"fake_webp_data", "Alerta", mime_type="image/webp")
+        
+        assert result is True
+        payload = mock_post.call_args.kwargs["json"]
+        assert payload["media"].startswith("data:image/webp;base64,")
+        assert payload["caption"] == "Alerta"
+
+@pytest.mark.asyncio
+async def test_send_text_message_uses_injected_client():
+    """Test that an injected shared client is reused and not closed per call"""
+    mock_response = Mock()
+    mock_response.status_code = 200
+    shared_client = Mock()
+    shared_client.post = AsyncMock(return_value=mock_response)
+    service = WhatsAppService(http_client=shared_client)
+    
+    with patch('httpx.AsyncClient') as mock_client:
+        result = await service.send_text_message("+1234567890", "Test message")
+        
+        assert result is True
+        shared_client.post.assert_awaited_once()
+        mock_client.assert_not_called()
+        assert shared_client.post.call_args.kwargs["timeout"] == 30.0
+
+@pytest.mark.asyncio
+async def test_send_text_message_circuit_opens_after_auth_failures(whatsapp_service):
+    """Test that repeated 401s short-circuit further sends"""
+    with patch('app.services.whatsapp_service.whatsapp_circuit', WhatsAppCircuitBreaker(failure_threshold=2)), \
+         patch('httpx.AsyncClient') as mock_client:
+        mock_response = Mock()
+        mock_response.status_code = 401
+        mock_response.text = "Unauthorized"
+        mock_post = AsyncMock(return_value=mock_response)
+        mock_client.return_value.__aenter__.return_value.post = mock_post
+        
+        assert await whatsapp_service.send_text_message("+1234567890", "Test message") is False
+        assert await whatsapp_service.send_text_message("+1234567890", "Test message") is False
+        assert await whatsapp_service.send_text_message("+1234567890", "Test message") is False
+        
+        assert mock_post.await_count == 2
+
+@pytest.mark.asyncio
+async def test_send_slots_are_paced_per_chat_and_not_kept(whatsapp_service):
+    """Test that sends to one chat are spaced out and no per-chat state outlives the interval"""
+    with patch('app.services.whatsapp_service.SEND_MIN_INTERVAL', 0.05):
+        start = time.monotonic()
+        await whatsapp_service._wait_for_send_slot("chat-a")
+        await whatsapp_service._wait_for_send_slot("chat-a")
+        assert time.monotonic() - start >= 0.05
+        
+        await asyncio.sleep(0.06)
+        await whatsapp_service._wait_for_send_slot("chat-b")
+    
+    assert "chat-a" not in _last_send_at
+    assert "chat-a" not in _send_locks
+    assert "chat-b" not in _send_locks
+
+@pytest.mark.asyncio
+async def test_send_image_with_fallback_prefers_last_working_method(whatsapp_service):
+    """Test that the image method that worked is tried first on the next send"""
+    with patch('app.services.whatsapp_service._preferred_image_method', 'base64'), \
+         patch.object(whatsapp_service, 'send_image_message_from_bytes', AsyncMock(return_value=False)) as base64_send, \
+         patch.object(whatsapp_service, 'send_image_message_n8n_style_from_bytes', AsyncMock(return_value=True)) as n8n_send, \
+         patch.object(whatsapp_service, 'send_image_message_via_media_endpoint_from_bytes', AsyncMock(return_value=True)) as media_send:
+        
+        assert await whatsapp_service.send_image_message_from_bytes_with_fallback("+1234567890", b"img") is True
+        assert base64_send.await_count == 1
+        assert n8n_send.await_count == 1
+        
+        assert await whatsapp_service.send_image_message_from_bytes_with_fallback("+1234567890", b"img") is True
+        assert base64_send.await_count == 1
+        assert n8n_send.await_count == 2
+        media_send.assert_not_awaited()
+
 @pytest.mark.asyncio
 async def test_get_account_info_success(whatsapp_service):
     """Test successful account info retrieval"""